@@ -0,0 +1,270 @@
+"""
+Batch queries over one loaded grid, and over many map files.
+
+solve_batch() takes a grid and an iterable of (start, goal) pairs, fans them
+out over a process pool and yields the results in query order as they
+become available. The grid is sent to each worker once when the pool starts
+(a compiled map is re-mapped, any other grid is placed in shared memory,
+so neither is copied) and is never modified: every query passes its start
+and goal explicitly.
+
+solve_maps() runs a list of methods on every goal of every map matching a
+set of glob patterns and yields one record per (map, method, goal) as soon
+as it finishes. Maps are read one at a time and at most max_pending queries
+are in flight, so memory stays bounded however many maps there are. Workers
+load maps by path (a compiled map is only memory-mapped) and keep the last
+few loaded for the following queries. Results are taken from and stored in
+the persistent result cache (see resultcache) unless use_cache is False.
+Run as a script it streams the records as NDJSON, one JSON object per line:
+
+    python3 batch.py 'map/*.txt' --methods bfs,as,jps --workers 4 > results.ndjson
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from grid import Grid
+from search import SEARCH_METHODS
+from search.cells import path_to_moves
+from resultcache import process_cache
+
+# error is the message of a query whose search raised; its path is then None
+QueryResult = namedtuple('QueryResult', ['start', 'goal', 'path', 'nodes_expanded', 'error'],
+                         defaults=(None,))
+
+# Grid held by each worker process, set once by the pool initializer
+_worker_grid = None
+
+# Maps each solve_maps worker keeps loaded, most recently used last
+WORKER_MAPS = 4
+_worker_maps = OrderedDict()
+
+
+def _init_worker(grid):
+    global _worker_grid
+    _worker_grid = grid
+
+
+def solve_query(grid, method, start, goal, **options):
+    """Run one query without touching grid.start_position or grid.goal_positions."""
+    path, nodes = SEARCH_METHODS[method](grid, as_generator=False, start=start, goals=[goal], **options)
+    return QueryResult(start, goal, path, nodes)
+
+
+def _try_query(grid, method, start, goal, options):
+    """solve_query, with a failure returned as a QueryResult carrying the error."""
+    try:
+        return solve_query(grid, method, start, goal, **options)
+    except Exception as e:
+        return QueryResult(start, goal, None, 0, str(e))
+
+
+def _solve_chunk(method, queries, options):
+    return [_try_query(_worker_grid, method, start, goal, options) for start, goal in queries]
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def solve_batch(grid, queries, method='as', workers=None, chunk_size=32, max_pending=None, **options):
+    """
+    Solve (start, goal) pairs on one grid and yield a QueryResult per pair,
+    in the order the pairs were given.
+
+    Queries are sent to workers in chunks of chunk_size. At most max_pending
+    chunks (default four per worker) are in flight at once, so long or
+    endless query streams are consumed lazily. workers=1 solves in this
+    process without a pool. Extra keyword options go to the search method.
+    A query whose search raises does not stop the others: its result has
+    path None and the message in error.
+    """
+    if method not in SEARCH_METHODS:
+        raise ValueError(f"Unknown method '{method}'")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1:
+        for start, goal in queries:
+            yield _try_query(grid, method, start, goal, options)
+        return
+
+    if max_pending is None:
+        max_pending = 4 * workers
+
+    with grid.shared(), ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                            initargs=(grid,)) as pool:
+        pending = deque()
+        for chunk in _chunks(queries, chunk_size):
+            pending.append(pool.submit(_solve_chunk, method, chunk, options))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _pattern_files(pattern):
+    """Sorted files matching a glob pattern; a directory stands for its *.txt maps."""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*.txt')
+    return sorted(glob.glob(pattern))
+
+
+def map_files(patterns):
+    """Files matching each glob pattern in turn."""
+    for pattern in patterns:
+        yield from _pattern_files(pattern)
+
+
+def _load_map(map_path):
+    """(grid, seconds spent loading it), reusing one of the last WORKER_MAPS maps."""
+    grid = _worker_maps.pop(map_path, None)
+    started = time.perf_counter()
+    if grid is None:
+        grid = Grid(map_path)
+    _worker_maps[map_path] = grid
+    if len(_worker_maps) > WORKER_MAPS:
+        _worker_maps.popitem(last=False)
+    return grid, time.perf_counter() - started
+
+
+def _solve_map_goal(map_path, method, index, goal, options, use_cache=True):
+    """Record of one (map, method, goal) query; a failure is recorded rather than raised."""
+    record = {'map': map_path, 'method': method, 'goal_index': index, 'goal': goal}
+    try:
+        grid, record['load_time'] = _load_map(map_path)
+        record['start'] = grid.start_position
+        started = time.perf_counter()
+        cache = process_cache() if use_cache else None
+        result = cache.get(grid, method, grid.start_position, goal, options) if cache else None
+        record['cached'] = result is not None
+        if result is None:
+            result = SEARCH_METHODS[method](grid, as_generator=False, start=grid.start_position,
+                                           goals=[goal], **options)
+            if cache:
+                cache.put(grid, method, grid.start_position, goal, options, *result)
+        path, nodes = result
+        record['search_time'] = time.perf_counter() - started
+    except Exception as e:
+        record.update(status='error', error=str(e))
+        return record
+    record.update(status='ok', nodes_expanded=nodes, path_length=len(path) - 1 if path else None,
+                  path=path, moves=path_to_moves(path))
+    return record
+
+
+def _map_queries(patterns, methods):
+    """
+    (map, method, goal index, goal) for every query, one map at a time. A map
+    that cannot be read, or a pattern that matches no file, yields an error
+    record instead.
+    """
+    for pattern in patterns:
+        map_paths = _pattern_files(pattern)
+        if not map_paths:
+            yield {'map': pattern, 'status': 'error', 'error': 'no maps matched'}
+        for map_path in map_paths:
+            try:
+                goals = list(Grid(map_path).goal_positions)
+            except Exception as e:
+                yield {'map': map_path, 'status': 'error', 'error': str(e)}
+                continue
+            for method in methods:
+                for index, goal in enumerate(goals):
+                    yield map_path, method, index, goal
+
+
+def solve_maps(patterns, methods, workers=None, max_pending=None, options=None, use_cache=True):
+    """
+    Solve every goal of every map matching the glob patterns with each of the
+    methods, yielding a record (a dict) per query in the order they finish.
+
+    options maps a method name to its keyword options. At most max_pending
+    queries (default four per worker) are in flight at once. workers=1
+    solves in this process without a pool. use_cache=False bypasses the
+    persistent result cache.
+    """
+    unknown = [method for method in methods if method not in SEARCH_METHODS]
+    if unknown:
+        raise ValueError(f"Unknown method(s): {', '.join(unknown)}")
+    options = options or {}
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1:
+        for query in _map_queries(patterns, methods):
+            if isinstance(query, dict):
+                yield query
+            else:
+                yield _solve_map_goal(*query, options.get(query[1], {}), use_cache)
+        return
+
+    if max_pending is None:
+        max_pending = 4 * workers
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for query in _map_queries(patterns, methods):
+            if isinstance(query, dict):
+                yield query
+                continue
+            pending.add(pool.submit(_solve_map_goal, *query, options.get(query[1], {}), use_cache))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def main():
+    # main.py imports this module for solve_batch, so its helpers are imported here
+    from main import add_method_arguments, method_options
+
+    parser = argparse.ArgumentParser(description="Run search methods on many maps and stream NDJSON records.")
+    parser.add_argument('maps', nargs='+', help="map files, glob patterns or directories of *.txt maps")
+    parser.add_argument('--methods', default='as',
+                        help="comma separated methods to run on every map (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help="queries in flight at once (default: four per worker)")
+    parser.add_argument('--output', help="write the records to this file instead of stdout")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="neither read nor store results in the persistent result cache")
+    add_method_arguments(parser)
+    args = parser.parse_args()
+
+    methods = [m.strip().lower() for m in args.methods.split(',') if m.strip()]
+    unknown = [m for m in methods if m not in SEARCH_METHODS]
+    if unknown:
+        print(f"Unknown method(s): {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(1)
+    options = {method: method_options(method, args) for method in methods}
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for record in solve_maps(args.maps, methods, args.workers, args.max_pending, options,
+                                 not args.no_cache):
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+"""
+Benchmark runner for the search methods.
+
+Runs every method on every map, repeating each run to get stable timings,
+and records wall time statistics, nodes expanded, path lengths and peak
+memory. Results can be written as a JSON baseline and a later run can be
+compared against it to catch regressions.
+
+With --goal-counts the runner instead measures how the informed methods
+scale with the number of goals: each map gets N seeded random open cells as
+goals, and the Manhattan heuristic alone is timed both as a linear scan and
+through the goal index.
+
+With --replan N each map instead gets N cells blocked one at a time on the
+current path, and D* Lite repairing its plan is timed against a fresh A*
+search after every change.
+
+Usage:
+    python3 benchmark.py --output baseline.json
+    python3 benchmark.py --compare baseline.json [--threshold 0.1]
+    python3 benchmark.py --goal-counts 1,10,100,1000 [--methods gbfs,ida_star,jps]
+    python3 benchmark.py --replan 20
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from grid import Grid
+from main import method_options
+from search import SEARCH_METHODS
+from search.dstar_lite import DStarLite
+from search.heuristics import GoalIndex, heuristic_manhattan
+
+DEFAULT_METHODS = ['bfs', 'dfs', 'gbfs', 'as', 'ids', 'ida_star']
+GOAL_SCALING_METHODS = ['gbfs', 'ida_star', 'jps']
+
+# Cells the heuristic is evaluated on per goal count
+HEURISTIC_SAMPLES = 1000
+
+
+def solve_all_goals(grid, method, options=None):
+    """Solve every goal of the map separately, as main.py does for informed methods."""
+    search = SEARCH_METHODS[method]
+    return [search(grid, as_generator=False, start=grid.start_position, goals=[goal], **(options or {}))
+            for goal in grid.goal_positions]
+
+
+def run_case(map_path, method, repeat, options=None):
+    """Time one method on one map. Returns a dict of measurements."""
+    grid = Grid(map_path)
+
+    times = []
+    results = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        results = solve_all_goals(grid, method, options)
+        times.append(time.perf_counter() - started)
+
+    # Memory is measured on a separate run since tracing slows everything down
+    tracemalloc.start()
+    solve_all_goals(grid, method, options)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'status': 'ok',
+        'runs': repeat,
+        'time_min': min(times),
+        'time_median': statistics.median(times),
+        'time_mean': statistics.mean(times),
+        'time_stdev': statistics.stdev(times) if len(times) > 1 else 0.0,
+        'nodes_expanded': [nodes for _, nodes in results],
+        'path_lengths': [len(path) - 1 if path else None for path, _ in results],
+        'peak_memory': peak,
+    }
+
+
+def _case_worker(connection, map_path, method, repeat, options):
+    try:
+        connection.send(run_case(map_path, method, repeat, options))
+    except Exception as e:
+        connection.send({'status': 'error', 'error': str(e)})
+    finally:
+        connection.close()
+
+
+def run_isolated(map_path, method, repeat, timeout, options=None):
+    """Run a case in its own process so slow methods can be cut off and memory is not shared."""
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_case_worker, args=(sender, map_path, method, repeat, options))
+    process.start()
+    sender.close()
+    if receiver.poll(timeout):
+        result = receiver.recv()
+    else:
+        process.terminate()
+        result = {'status': 'timeout', 'timeout': timeout}
+    process.join()
+    return result
+
+
+def run_benchmarks(maps, methods, repeat, timeout, args=None):
+    """Run every method on every map; args supplies method options such as --weight."""
+    results = {}
+    for map_path in maps:
+        for method in methods:
+            key = f"{map_path}:{method}"
+            options = method_options(method, args) if args is not None else None
+            result = run_isolated(map_path, method, repeat, timeout, options)
+            results[key] = result
+            if result['status'] == 'ok':
+                print(f"{key:40} {result['time_median'] * 1000:10.2f} ms  "
+                      f"nodes {sum(result['nodes_expanded']):8}  peak {result['peak_memory'] / 1024:9.1f} KiB")
+            else:
+                print(f"{key:40} {result['status']}")
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'timeout': timeout,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def random_goals(grid, count, seed=0):
+    """count distinct open cells other than the start, picked with a fixed seed."""
+    start = tuple(grid.start_position)
+    open_cells = [(x, y) for y in range(grid.height) for x in range(grid.width)
+                  if not grid.walls[y * grid.width + x] and (x, y) != start]
+    return random.Random(seed).sample(open_cells, min(count, len(open_cells)))
+
+
+def _median_time(function, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times), result
+
+
+def time_heuristic(grid, goals, repeat, seed=0):
+    """Median time per call of the nearest-goal Manhattan distance, linear scan vs GoalIndex."""
+    rng = random.Random(seed)
+    cells = [(rng.randrange(grid.width), rng.randrange(grid.height)) for _ in range(HEURISTIC_SAMPLES)]
+    linear, _ = _median_time(lambda: [heuristic_manhattan(cell, goals) for cell in cells], repeat)
+    index = GoalIndex(goals)
+    indexed, _ = _median_time(lambda: [index.nearest_distance(x, y) for x, y in cells], repeat)
+    return linear / len(cells), indexed / len(cells)
+
+
+def run_goal_scaling(maps, methods, goal_counts, repeat, seed=0):
+    """Time each method searching for N random goals at once, for each N in goal_counts."""
+    results = {}
+    print(f"{'case':40} {'goals':>6} {'time':>12} {'nodes':>8}")
+    for map_path in maps:
+        grid = Grid(map_path)
+        for count in goal_counts:
+            goals = random_goals(grid, count, seed)
+            linear, indexed = time_heuristic(grid, goals, repeat, seed)
+            results[f"{map_path}:heuristic:{count}"] = {
+                'goals': len(goals), 'linear_per_call': linear, 'index_per_call': indexed}
+            print(f"{map_path + ':heuristic':40} {len(goals):6} "
+                  f"linear {linear * 1e6:8.2f} us  index {indexed * 1e6:8.2f} us")
+            for method in methods:
+                search = SEARCH_METHODS[method]
+                elapsed, (path, nodes) = _median_time(
+                    lambda: search(grid, as_generator=False, start=grid.start_position, goals=goals), repeat)
+                results[f"{map_path}:{method}:{count}"] = {
+                    'goals': len(goals), 'time_median': elapsed, 'nodes_expanded': nodes,
+                    'path_length': len(path) - 1 if path else None}
+                print(f"{map_path + ':' + method:40} {len(goals):6} {elapsed * 1000:10.2f}ms {nodes:8}")
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'seed': seed,
+            'goal_counts': goal_counts,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'goal_scaling': results,
+    }
+
+
+def run_replanning(maps, changes, seed=0):
+    """
+    Block cells on the planned path one at a time and time D* Lite's
+    repair against A* from scratch on the changed grid.
+    """
+    rng = random.Random(seed)
+    astar = SEARCH_METHODS['as']
+    results = {}
+    print(f"{'map':40} {'changes':>7} {'initial':>10} {'replan':>10} {'astar':>10} {'nodes':>8} {'astar nodes':>11}")
+    for map_path in maps:
+        grid = Grid(map_path)
+        goal = grid.goal_positions[0]
+        planner = DStarLite(grid, goals=[goal])
+        started = time.perf_counter()
+        path, _ = planner.plan()
+        initial = time.perf_counter() - started
+
+        replan_times, astar_times, replan_nodes, astar_nodes = [], [], [], []
+        for _ in range(changes):
+            if len(path) < 3:
+                break
+            grid.add_wall(rng.choice(path[1:-1]))
+            started = time.perf_counter()
+            path, nodes = planner.plan()
+            replan_times.append(time.perf_counter() - started)
+            replan_nodes.append(nodes)
+            started = time.perf_counter()
+            _, nodes = astar(grid, start=grid.start_position, goals=[goal])
+            astar_times.append(time.perf_counter() - started)
+            astar_nodes.append(nodes)
+
+        if not replan_times:
+            print(f"{map_path:40} {0:7}  no path to block")
+            continue
+        result = {
+            'changes': len(replan_times),
+            'initial_time': initial,
+            'replan_median': statistics.median(replan_times),
+            'astar_median': statistics.median(astar_times),
+            'replan_nodes_median': statistics.median(replan_nodes),
+            'astar_nodes_median': statistics.median(astar_nodes),
+        }
+        results[map_path] = result
+        print(f"{map_path:40} {result['changes']:7} {initial * 1000:8.2f}ms "
+              f"{result['replan_median'] * 1000:8.2f}ms {result['astar_median'] * 1000:8.2f}ms "
+              f"{result['replan_nodes_median']:8} {result['astar_nodes_median']:11}")
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': seed,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'replanning': results,
+    }
+
+
+def compare(baseline, current, threshold, min_delta=0.0005):
+    """
+    Print a regression report. A case regresses when its median time grows
+    by more than threshold (a fraction) and by more than min_delta seconds,
+    when it stops finishing, or when its nodes expanded or path lengths
+    change. Returns the number of regressions.
+    """
+    regressions = 0
+    print()
+    print(f"{'case':40} {'baseline':>12} {'current':>12} {'change':>9}  status")
+    for key, new in current['results'].items():
+        old = baseline['results'].get(key)
+        if old is None:
+            print(f"{key:40} {'-':>12} {'-':>12} {'-':>9}  new")
+            continue
+        if new['status'] != 'ok' or old['status'] != 'ok':
+            status = 'ok' if new['status'] == old['status'] else f"{old['status']} -> {new['status']}"
+            if old['status'] == 'ok':
+                regressions += 1
+                status = f"REGRESSION ({new['status']})"
+            print(f"{key:40} {'-':>12} {'-':>12} {'-':>9}  {status}")
+            continue
+
+        old_time, new_time = old['time_median'], new['time_median']
+        change = (new_time - old_time) / old_time if old_time else 0.0
+        significant = abs(new_time - old_time) > min_delta
+        if (new['nodes_expanded'] != old['nodes_expanded'] or
+                new['path_lengths'] != old['path_lengths']):
+            status = 'RESULTS CHANGED'
+            regressions += 1
+        elif change > threshold and significant:
+            status = 'REGRESSION'
+            regressions += 1
+        elif change < -threshold and significant:
+            status = 'improved'
+        else:
+            status = 'ok'
+        print(f"{key:40} {old_time * 1000:10.2f}ms {new_time * 1000:10.2f}ms {change:+8.1%}  {status}")
+
+    missing = set(baseline['results']) - set(current['results'])
+    for key in sorted(missing):
+        print(f"{key:40} {'-':>12} {'-':>12} {'-':>9}  not run")
+    print()
+    print(f"{regressions} regression(s) at a {threshold:.0%} threshold")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the search methods on map files.")
+    parser.add_argument('--maps', nargs='+', default=None, help="map files (default: map/*.txt)")
+    parser.add_argument('--methods', default=None,
+                        help=f"comma separated methods (default: {','.join(DEFAULT_METHODS)}, "
+                             f"or {','.join(GOAL_SCALING_METHODS)} with --goal-counts)")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per case (default: %(default)s)")
+    parser.add_argument('--timeout', type=float, default=60, help="seconds allowed per case (default: %(default)s)")
+    parser.add_argument('--output', help="write the results as a JSON baseline")
+    parser.add_argument('--compare', help="compare against a JSON baseline")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="allowed median time increase as a fraction (default: %(default)s)")
+    parser.add_argument('--min-delta', type=float, default=0.5,
+                        help="ignore time changes smaller than this many milliseconds (default: %(default)s)")
+    parser.add_argument('--goal-counts',
+                        help="comma separated goal counts; measure scaling with random goals instead")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the random goals (default: %(default)s)")
+    parser.add_argument('--replan', type=int, default=None,
+                        help="block this many path cells one at a time and time D* Lite against A*")
+    parser.add_argument('--weight', type=float, default=None, help="heuristic weight for was and ara")
+    parser.add_argument('--deadline', type=float, default=None, help="milliseconds ara may spend per goal")
+    args = parser.parse_args()
+
+    maps = args.maps or sorted(glob.glob('map/*.txt'))
+    default_methods = GOAL_SCALING_METHODS if args.goal_counts else DEFAULT_METHODS
+    methods = [m.strip() for m in (args.methods or ','.join(default_methods)).split(',') if m.strip()]
+    unknown = [m for m in methods if m not in SEARCH_METHODS]
+    if unknown:
+        print(f"Unknown method(s): {', '.join(unknown)}")
+        sys.exit(1)
+
+    if args.replan:
+        replanning = run_replanning(maps, args.replan, args.seed)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(replanning, f, indent=2)
+            print(f"Results written to {args.output}")
+        return
+
+    if args.goal_counts:
+        goal_counts = [int(count) for count in args.goal_counts.split(',') if count.strip()]
+        scaling = run_goal_scaling(maps, methods, goal_counts, args.repeat, args.seed)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(scaling, f, indent=2)
+            print(f"Results written to {args.output}")
+        return
+
+    current = run_benchmarks(maps, methods, args.repeat, args.timeout, args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, current, args.threshold, args.min_delta / 1000):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,355 @@
+import hashlib
+import os
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import mapfile
+
+# Direction order used throughout the search modules: RIGHT, DOWN, LEFT, UP
+DIRECTIONS = [(1, 0), (0, 1), (-1, 0), (0, -1)]
+RIGHT, DOWN, LEFT, UP = 0, 1, 2, 3
+
+# Maps wall bytes to open-cell bytes (0 -> 1, anything else -> 0)
+OPEN_TABLE = bytes([1] + [0] * 255)
+
+# Wall changes remembered for changes_since(); older ones are dropped
+MAX_CHANGE_LOG = 4096
+
+
 class Grid:
-    def __init__(self, filename):
+    def __init__(self, filename, use_cache=True):
+        """
+        Load a map from a text file or a compiled (.rnav) file. Text maps are
+        compiled into the cache directory on first load and memory-mapped from
+        there afterwards, unless use_cache is False.
+        """
         self.width = 0
         self.height = 0
         self.start_position = None
         self.goal_positions = []
-        self.wall_positions = set()
+        # One byte per cell, indexed by y * width + x (1 = wall)
+        self.walls = bytearray()
+        # Compiled file the cell arrays are memory-mapped from, if any
+        self.compiled_path = None
+        # Shared memory block pickles refer to while shared() is active
+        self._shared_name = None
+        self.reset_changes()
+
+        if mapfile.is_compiled(filename):
+            self.load_compiled(filename)
+            return
+
+        compiled = mapfile.cache_path(filename) if use_cache else None
+        if compiled and mapfile.is_fresh(compiled, filename):
+            try:
+                self.load_compiled(compiled)
+                return
+            except ValueError:
+                pass  # A damaged cache file is rebuilt below
+
         self.load_from_file(filename)
+        self.build_neighbor_table()
+        if compiled:
+            try:
+                mapfile.write_compiled(compiled, self, os.stat(filename))
+                self.compiled_path = compiled
+            except OSError:
+                pass  # Caching is best effort; the parsed grid is still usable
+
+    def load_compiled(self, filename):
+        data = mapfile.load_compiled(filename)
+        self.width = data['width']
+        self.height = data['height']
+        self.start_position = data['start']
+        self.goal_positions = data['goals']
+        self.walls = data['walls']
+        self.neighbor_mask = data['neighbor_mask']
+        self.compiled_path = filename
+        self.init_offsets()
+
+    def __getstate__(self):
+        """
+        Pickle for worker processes. A grid backed by a compiled file sends
+        only the file name and the receiver maps the same pages. Inside
+        shared() only the name of the shared memory block is sent. Otherwise
+        the cell arrays are sent as bytes. Nothing is re-parsed either way.
+        """
+        state = {
+            'width': self.width,
+            'height': self.height,
+            'start_position': self.start_position,
+            'goal_positions': list(self.goal_positions),
+            'compiled_path': self.compiled_path,
+            'shared_memory': None,
+        }
+        if self.compiled_path is None:
+            if self._shared_name is not None:
+                state['shared_memory'] = self._shared_name
+            else:
+                state['walls'] = bytes(self.walls)
+                state['neighbor_mask'] = bytes(self.neighbor_mask)
+        return state
+
+    def __setstate__(self, state):
+        self._shared_name = None
+        if state['compiled_path'] is not None:
+            self.load_compiled(state['compiled_path'])
+        else:
+            self.compiled_path = None
+            self.width = state['width']
+            self.height = state['height']
+            if state.get('shared_memory') is not None:
+                # Views over the sender's block; set_wall() copies before writing.
+                # The views are set before the block so they are released first.
+                cells = self.width * self.height
+                block = shared_memory.SharedMemory(name=state['shared_memory'])
+                self.walls = block.buf[:cells]
+                self.neighbor_mask = block.buf[cells:2 * cells]
+                self._shared_block = block
+            else:
+                self.walls = bytearray(state['walls'])
+                self.neighbor_mask = bytearray(state['neighbor_mask'])
+            self.init_offsets()
+        self.start_position = state['start_position']
+        self.goal_positions = state['goal_positions']
+        self.reset_changes()
+
+    @contextmanager
+    def shared(self):
+        """
+        While active, pickles of a grid that is not backed by a compiled file
+        refer to a shared memory copy of its cell arrays, so worker processes
+        map the same memory instead of each receiving a copy. Walls changed
+        meanwhile are not seen by the workers. Compiled grids are already
+        shared through the file mapping and need nothing.
+        """
+        if self.compiled_path is not None or self._shared_name is not None:
+            yield self
+            return
+        cells = self.width * self.height
+        block = shared_memory.SharedMemory(create=True, size=max(2 * cells, 1))
+        try:
+            block.buf[:cells] = self.walls
+            block.buf[cells:2 * cells] = self.neighbor_mask
+            self._shared_name = block.name
+            yield self
+        finally:
+            self._shared_name = None
+            block.close()
+            block.unlink()
 
     def load_from_file(self, filename):
+        """
+        Parse a text map. After the size, start and goals lines every line
+        describes walls in one of three forms:
+            x,y          a single wall cell
+            x,y,w,h      a w x h block of walls with its top-left at (x, y)
+            y:a,b,c,...  row y as alternating run lengths of open and wall
+                         cells, starting with open cells at column 0
+        """
         with open(filename, 'r') as f:
             size_line = f.readline().strip()
             self.width, self.height = map(int, size_line.split('x'))
+            self.walls = bytearray(self.width * self.height)
 
             self.start_position = tuple(map(int, f.readline().strip().split(',')))
             goals_line = f.readline().strip()
             self.goal_positions = [tuple(map(int, p.split(','))) for p in goals_line.split('; ')]
 
             for line in f:
-                if line.strip():
-                    wall = tuple(map(int, line.strip().split(',')))
-                    self.wall_positions.add(wall)
+                line = line.strip()
+                if not line:
+                    continue
+                if ':' in line:
+                    row, runs = line.split(':')
+                    self.fill_runs(int(row), [int(n) for n in runs.split(',')])
+                    continue
+                values = [int(v) for v in line.split(',')]
+                if len(values) == 2:
+                    x, y = values
+                    if 0 <= x < self.width and 0 <= y < self.height:
+                        self.walls[y * self.width + x] = 1
+                elif len(values) == 4:
+                    self.fill_rect(*values)
+                else:
+                    raise ValueError(f"Invalid wall line: '{line}'")
+
+    def fill_rect(self, x, y, w, h):
+        """Mark a w x h block of cells as walls, clipped to the grid."""
+        x0, x1 = max(x, 0), min(x + w, self.width)
+        y0, y1 = max(y, 0), min(y + h, self.height)
+        if x0 >= x1:
+            return
+        run = b'\x01' * (x1 - x0)
+        for row in range(y0, y1):
+            start = row * self.width
+            self.walls[start + x0:start + x1] = run
+
+    def fill_runs(self, y, runs):
+        """Mark the wall runs of a run-length encoded row (open, wall, open, ...)."""
+        if not 0 <= y < self.height:
+            return
+        x = 0
+        for i, length in enumerate(runs):
+            if i % 2 == 1:
+                self.fill_rect(x, y, length, 1)
+            x += length
+
+    def build_neighbor_table(self):
+        """
+        Precompute a 4-bit mask per cell: bit d is set when the neighbour in
+        DIRECTIONS[d] is inside the grid and not a wall.
+
+        The four shifted copies of the open-cell array are combined as big
+        integers (one byte per cell, so the bit shifts never carry between
+        cells), which keeps the cost off the per-cell Python loop.
+        """
+        width, height = self.width, self.height
+        cells = width * height
+        if cells == 0:
+            self.neighbor_mask = bytearray()
+            self.init_offsets()
+            return
+
+        def as_int(data):
+            return int.from_bytes(data, 'big')
+
+        open_cells = bytes(self.walls).translate(OPEN_TABLE)
+        not_last_column = as_int((b'\x01' * (width - 1) + b'\x00') * height)
+        not_first_column = as_int((b'\x00' + b'\x01' * (width - 1)) * height)
+
+        right = as_int(open_cells[1:] + b'\x00') & not_last_column
+        down = as_int(open_cells[width:] + b'\x00' * width)
+        left = as_int(b'\x00' + open_cells[:-1]) & not_first_column
+        up = as_int(b'\x00' * width + open_cells[:-width])
+
+        mask = (right << RIGHT) | (down << DOWN) | (left << LEFT) | (up << UP)
+        self.neighbor_mask = bytearray(mask.to_bytes(cells, 'big'))
+        self.init_offsets()
+
+    def init_offsets(self):
+        """Cell id offsets per direction and the default neighbour lookup."""
+        self.offsets = (1, self.width, -1, -self.width)
+        self._direction_tables = {}
+        self.neighbor_steps = self.direction_table((RIGHT, DOWN, LEFT, UP))
+
+    def direction_table(self, order):
+        """
+        Lookup from neighbour mask to the (direction, offset) pairs that are
+        open, visiting directions in the given order. Tables are memoised.
+        """
+        order = tuple(order)
+        table = self._direction_tables.get(order)
+        if table is None:
+            table = [tuple((d, self.offsets[d]) for d in order if bits & (1 << d))
+                     for bits in range(16)]
+            self._direction_tables[order] = table
+        return table
+
+    def neighbors(self, cell):
+        """Open neighbour ids of a cell in RIGHT, DOWN, LEFT, UP order."""
+        return [cell + offset for _, offset in self.neighbor_steps[self.neighbor_mask[cell]]]
+
+    def cell_id(self, position):
+        x, y = position
+        return y * self.width + x
+
+    def cell_position(self, cell):
+        return (cell % self.width, cell // self.width)
+
+    def in_bounds(self, position):
+        x, y = position
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def is_wall(self, position):
+        return self.in_bounds(position) and self.walls[self.cell_id(position)] == 1
+
+    def content_hash(self):
+        """Hex digest of the grid size and walls, used to key cached artifacts."""
+        if getattr(self, '_content_hash', None) is None:
+            digest = hashlib.sha256(f"{self.width}x{self.height}\n".encode('ascii'))
+            digest.update(self.walls)
+            self._content_hash = digest.hexdigest()
+        return self._content_hash
+
+    @property
+    def wall_positions(self):
+        """Set of wall (x, y) tuples, built on first use for the GUI."""
+        if getattr(self, '_wall_positions', None) is None:
+            width = self.width
+            self._wall_positions = {(cell % width, cell // width)
+                                    for cell, wall in enumerate(self.walls) if wall}
+        return self._wall_positions
+
+    def reset_changes(self):
+        # Incremented by every wall change; _changes holds the cell ids of the latest ones
+        self.version = 0
+        self._changes = []
+
+    def set_wall(self, position, wall=True):
+        """
+        Make a cell a wall or open it at runtime. The neighbour masks of the
+        cells around it are patched in place and cached values derived from
+        the walls are dropped. A grid mapped from a compiled file is copied
+        into memory first; the file itself is never written. Returns True if
+        the cell changed.
+        """
+        if not self.in_bounds(position):
+            raise ValueError(f"Position {position} is outside the {self.width}x{self.height} grid")
+        cell = self.cell_id(position)
+        if bool(self.walls[cell]) == wall:
+            return False
+
+        if not isinstance(self.walls, bytearray):
+            self.walls = bytearray(self.walls)
+            self.neighbor_mask = bytearray(self.neighbor_mask)
+        # The compiled file no longer matches, so pickles must carry the cells
+        self.compiled_path = None
+        self.walls[cell] = 1 if wall else 0
+
+        # The neighbour in direction d sees this cell in the opposite direction
+        x, y = position
+        for direction, (dx, dy) in enumerate(DIRECTIONS):
+            if self.in_bounds((x + dx, y + dy)):
+                neighbor = cell + self.offsets[direction]
+                bit = 1 << ((direction + 2) % 4)
+                if wall:
+                    self.neighbor_mask[neighbor] &= ~bit & 0xF
+                else:
+                    self.neighbor_mask[neighbor] |= bit
+
+        self._content_hash = None
+        if getattr(self, '_wall_positions', None) is not None:
+            if wall:
+                self._wall_positions.add(tuple(position))
+            else:
+                self._wall_positions.discard(tuple(position))
+
+        self.version += 1
+        self._changes.append(cell)
+        if len(self._changes) > MAX_CHANGE_LOG:
+            del self._changes[:len(self._changes) - MAX_CHANGE_LOG // 2]
+        return True
+
+    def add_wall(self, position):
+        return self.set_wall(position, True)
+
+    def remove_wall(self, position):
+        return self.set_wall(position, False)
+
+    def changes_since(self, version):
+        """
+        Cell ids whose walls changed after the given version, oldest first
+        (a cell may appear more than once), or None if the log no longer
+        reaches back that far and the caller has to start over.
+        """
+        oldest = self.version - len(self._changes)
+        if version < oldest:
+            return None
+        return self._changes[version - oldest:]
 
     def is_valid_position(self, position):
         x, y = position
         return (0 <= x < self.width and
                 0 <= y < self.height and
-                position not in self.wall_positions)
\ No newline at end of file
+                not self.walls[y * self.width + x])
@@ -6,8 +6,12 @@ from search.bfs import bfs
 from search.dfs import dfs
 from search.gbfs import gbfs
 from search.astar import astar
+from search.weighted_astar import weighted_astar, ara_star
 from search.ids import ids
 from search.ida_star import ida_star
+from search.bidirectional import bidirectional_bfs, bidirectional_astar
+from search.jps import jps
+from search.events import EXPAND, PUSH, POP, BOUND, PATH, batched
 
 COLORS = {
     'start': 'red',
@@ -29,6 +33,9 @@ class GridVisualizer:
         self.paused = True
         self.search_active = False
         self.search_gen = None
+        # Cells expanded and on the frontier in the current search, kept up to date from its events
+        self.visited = set()
+        self.frontier = set()
         
         # Multi-goal tracking
         self.current_goal_index = 0
@@ -59,7 +66,8 @@ class GridVisualizer:
 
         # Algorithm selection via radio buttons
         self.method_var = tk.StringVar(value="bfs")
-        methods = [("BFS", "bfs"), ("DFS", "dfs"), ("GBFS", "gbfs"), ("A*", "as"), ("IDS", "ids"), ("IDA*", "ida_star")]
+        methods = [("BFS", "bfs"), ("DFS", "dfs"), ("GBFS", "gbfs"), ("A*", "as"), ("WA*", "was"), ("ARA*", "ara"), ("IDS", "ids"), ("IDA*", "ida_star"),
+                   ("Bi-BFS", "bi_bfs"), ("Bi-A*", "bi_as"), ("JPS", "jps")]
         for text, mode in methods:
             rb = tk.Radiobutton(self.control_frame, text=text, variable=self.method_var, value=mode)
             rb.pack(side=tk.LEFT, padx=5)
@@ -71,6 +79,13 @@ class GridVisualizer:
                                     length=100, value=self.delay,
                                     command=self.update_speed)
         self.speed_scale.pack(side=tk.LEFT, padx=5)
+
+        # Expansions drawn per frame
+        self.steps_label = tk.Label(self.control_frame, text="Steps/frame:")
+        self.steps_label.pack(side=tk.LEFT, padx=5)
+        self.steps_var = tk.IntVar(value=1)
+        self.steps_spin = tk.Spinbox(self.control_frame, from_=1, to=10000, width=6, textvariable=self.steps_var)
+        self.steps_spin.pack(side=tk.LEFT, padx=5)
         
         # Buttons
         self.start_btn = tk.Button(self.control_frame, text="Start", command=self.start_search, state=tk.DISABLED)
@@ -131,7 +146,7 @@ class GridVisualizer:
         self.delay = int(float(val))
 
     def load_map(self):
-        file_path = filedialog.askopenfilename(initialdir=".", title="Select map file", filetypes=(("Text files","*.txt"),))
+        file_path = filedialog.askopenfilename(initialdir=".", title="Select map file", filetypes=(("Map files","*.txt *.rnav"), ("Text files","*.txt"), ("Compiled maps","*.rnav")))
         if not file_path:
             return
         
@@ -377,10 +392,23 @@ class GridVisualizer:
                     self.search_gen = gbfs(self.grid, as_generator=True)
                 elif method == "as":
                     self.search_gen = astar(self.grid, as_generator=True)
+                elif method == "was":
+                    self.search_gen = weighted_astar(self.grid, as_generator=True)
+                elif method == "ara":
+                    self.search_gen = ara_star(self.grid, as_generator=True)
                 elif method == "ids":
                     self.search_gen = ids(self.grid, as_generator=True)
                 elif method == "ida_star":
                     self.search_gen = ida_star(self.grid, as_generator=True)
+                elif method == "bi_bfs":
+                    self.search_gen = bidirectional_bfs(self.grid, as_generator=True)
+                elif method == "bi_as":
+                    self.search_gen = bidirectional_astar(self.grid, as_generator=True)
+                elif method == "jps":
+                    self.search_gen = jps(self.grid, as_generator=True)
+                self.search_gen = batched(self.search_gen, self.steps_per_frame())
+                self.visited = set()
+                self.frontier = set()
             except Exception as e:
                 messagebox.showerror("Error", f"Error starting search: {str(e)}")
                 self.search_active = False
@@ -389,15 +417,12 @@ class GridVisualizer:
                 return
                 
         try:
-            state = next(self.search_gen)
-            self.update_visualization(state)
-            nodes = len(state.get('visited', []))
-            frontier_size = len(state.get('frontier', []))
-            self.update_info(nodes, frontier_size)
+            path = self.apply_events(next(self.search_gen))
+            self.update_info(len(self.visited), len(self.frontier))
             
             # Check if we have a path (solution found)
-            if 'path' in state:
-                self.process_completed_search(state)
+            if path is not None:
+                self.process_completed_search(path)
             else:
                 self.root.after(self.delay, self.run_search)
                 
@@ -426,12 +451,11 @@ class GridVisualizer:
             self.start_btn.config(state=tk.NORMAL)
             self.pause_btn.config(state=tk.DISABLED)
             
-    def process_completed_search(self, final_state):
+    def process_completed_search(self, path):
         """Process the results of a completed search for the current goal"""
         method = self.method_var.get().upper()
-        if "path" in final_state:
-            path = final_state["path"]
-            nodes_expanded = len(final_state.get('visited', []))
+        if path is not None:
+            nodes_expanded = len(self.visited)
             moves = self.path_to_moves(path)
             
             # Add result to our tracking
@@ -483,22 +507,38 @@ class GridVisualizer:
                 self.results_text.insert(tk.END, "All goals attempted!\n")
                 self.pause_btn.config(state=tk.DISABLED)
 
-    def update_visualization(self, state):
-        # Reset non-essential cells
-        for (x, y), rect in self.cell_map.items():
-            if (x, y) not in [self.original_start] + self.original_goals + list(self.grid.wall_positions):
-                self.canvas.itemconfig(rect, fill=COLORS['empty'])
+    def steps_per_frame(self):
+        try:
+            return max(1, int(self.steps_var.get()))
+        except (tk.TclError, ValueError):
+            return 1
 
-        # Update visited nodes
-        for (x, y) in state.get('visited', []):
-            self.update_cell(x, y, COLORS['visited'])
-        # Update frontier nodes
-        for (x, y) in state.get('frontier', []):
-            self.update_cell(x, y, COLORS['frontier'])
-        # Update current path
-        if 'path' in state:
-            for (x, y) in state['path']:
-                self.update_cell(x, y, COLORS['path'])
+    def apply_events(self, events):
+        """
+        Recolour only the cells named in a batch of search events. Returns
+        the path if the batch ends the search with one, otherwise None.
+        """
+        path = None
+        for kind, value in events:
+            if kind == EXPAND:
+                self.visited.add(value)
+                self.update_cell(*value, COLORS['visited'])
+            elif kind == PUSH:
+                self.frontier.add(value)
+                self.update_cell(*value, COLORS['frontier'])
+            elif kind == POP:
+                self.frontier.discard(value)
+                self.update_cell(*value, COLORS['visited'] if value in self.visited else COLORS['empty'])
+            elif kind == BOUND:
+                # A new iteration starts with an empty frontier
+                for cell in self.frontier:
+                    self.update_cell(*cell, COLORS['visited'] if cell in self.visited else COLORS['empty'])
+                self.frontier.clear()
+            elif kind == PATH:
+                path = value
+                for cell in path:
+                    self.update_cell(*cell, COLORS['path'])
+        return path
 
 if __name__ == "__main__":
     GridVisualizer()
\ No newline at end of file
@@ -1,129 +1,164 @@
+import argparse
+import logging
 import sys
 import os
 from grid import Grid
-from search.bfs import bfs
-from search.dfs import dfs
-from search.gbfs import gbfs
-from search.astar import astar
-from search.ids import ids
-from search.ida_star import ida_star
-
-def path_to_moves(path):
-    moves = []
-    for i in range(1, len(path)):
-        prev = path[i-1]
-        curr = path[i]
-        dx = curr[0] - prev[0]
-        dy = curr[1] - prev[1]
-        if dx == 1:
-            moves.append('right')
-        elif dx == -1:
-            moves.append('left')
-        elif dy == 1:
-            moves.append('down')
-        elif dy == -1:
-            moves.append('up')
-    return moves
+from search import SEARCH_METHODS, METHOD_OPTIONS
+from search.cells import path_to_moves
+from search.multi_goal import multi_goal_search, MULTI_GOAL_METHODS
+from search.frontier import FRONTIERS
+from search.heuristics import HEURISTICS
+from search.wavefront import ENGINES
+from search.portfolio import DEFAULT_CANDIDATES
+from batch import solve_batch
+from resultcache import cached_results, process_cache
 
-def main():
-    if len(sys.argv) != 3:
+def resolve_map_path(filename):
+    """Find a map in the current directory or the 'map/' directory."""
+    if os.path.isfile(filename):
+        return filename
+    map_path = os.path.join('map', filename)
+    if os.path.isfile(map_path):
+        return map_path
+    return None
+
+def solve_goal(grid, method, goal, **options):
+    """Run one search method for a single goal, returning (path, nodes_expanded), or None if it failed."""
+    try:
+        return SEARCH_METHODS[method](grid, as_generator=False, start=grid.start_position, goals=[goal],
+                                      **options)
+    except Exception as e:
+        print(f"Error running {method}: {str(e)}")
+        return None
+
+def solve_goals(grid, method, goals, jobs=1, **options):
+    """
+    Solve each goal separately, yielding (path, nodes_expanded) in goal order.
+    With jobs > 1 the goals are spread over that many worker processes.
+    A failed search yields None.
+    """
+    if jobs <= 1 or len(goals) <= 1:
+        for goal in goals:
+            yield solve_goal(grid, method, goal, **options)
+        return
+    queries = [(grid.start_position, goal) for goal in goals]
+    for result in solve_batch(grid, queries, method, workers=min(jobs, len(goals)), chunk_size=1, **options):
+        if result.error is not None:
+            print(f"Error running {method}: {result.error}")
+            yield None
+        else:
+            yield result.path, result.nodes_expanded
+
+def print_result(filename, method, idx, start, goal, path, num_nodes):
+    print(f"{filename} {method.upper()} [Goal {idx+1}]")
+    print(f"Start at {start}")
+    print(f"Goal at {goal}")
+    print(f"{num_nodes} nodes expanded")
+    
+    if path:
+        # Calculate and display path length (number of moves)
+        path_length = len(path) - 1  # Subtract 1 because the path includes the start position
+        print(f"Path length: {path_length}")
+        
+        moves = path_to_moves(path)
+        print("; ".join(moves))
+    else:
+        print("No solution found.")
+    print("-----------------------")
+
+def add_method_arguments(parser):
+    """Flags for the keyword options of the search methods (see method_options)."""
+    parser.add_argument('--max-depth', type=int, default=None,
+                        help="deepest iteration for ids (default: no bound)")
+    parser.add_argument('--frontier', choices=sorted(FRONTIERS), default=None,
+                        help="priority queue used by gbfs, as, was, ara and their portfolio runs (default: bucket)")
+    parser.add_argument('--heuristic', choices=sorted(HEURISTICS), default=None,
+                        help="heuristic used by gbfs, as, was, ara, ida_star and their portfolio runs (default: manhattan)")
+    parser.add_argument('--engine', choices=ENGINES, default=None,
+                        help="layer engine for wave (default: numpy when installed, else python)")
+    parser.add_argument('--weight', type=float, default=None,
+                        help="heuristic weight for was, and the starting weight for ara (default: 2)")
+    parser.add_argument('--deadline', type=float, default=None,
+                        help="milliseconds ara may spend improving its path, or the portfolio may wait "
+                             "(default: no limit)")
+    parser.add_argument('--max-nodes', type=int, default=None,
+                        help="expansions ara may spend improving its path (default: no limit)")
+    parser.add_argument('--candidates', type=lambda value: [m.strip() for m in value.split(',') if m.strip()],
+                        default=None, help=f"methods the portfolio races (default: {','.join(DEFAULT_CANDIDATES)})")
+    parser.add_argument('--optimal', action='store_true', default=None,
+                        help="portfolio: race only methods that return shortest paths")
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(usage="python3 main.py <input_file> <method> [options]")
+    parser.add_argument('filename')
+    parser.add_argument('method')
+    parser.add_argument('--per-goal', action='store_true',
+                        help="search each goal separately instead of one shared bfs/dfs pass")
+    parser.add_argument('--jobs', type=int, default=1,
+                        help="solve goals in parallel in this many processes (default: %(default)s); "
+                             "bfs and dfs use it only with --per-goal")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="neither read nor store results in the persistent result cache")
+    add_method_arguments(parser)
+    if len(argv) < 2:
         print("Usage: python3 main.py <input_file> <method>")
         sys.exit(1)
+    return parser.parse_args(argv)
 
-    filename = sys.argv[1]
-    method = sys.argv[2].lower()
+def method_options(method, args):
+    """Keyword options of a search method taken from the command line."""
+    options = {}
+    for name in METHOD_OPTIONS.get(method, ()):
+        value = getattr(args, name, None)
+        if value is not None:
+            options[name] = value
+    if 'deadline' in options:
+        options['deadline'] /= 1000  # Given in milliseconds, the methods take seconds
+    return options
+
+def main():
+    args = parse_args(sys.argv[1:])
+    # Diagnostics such as the portfolio's winner go to stderr
+    logging.basicConfig(format='%(message)s', level=logging.INFO)
+    filename = args.filename
+    method = args.method.lower()
+
+    if method not in SEARCH_METHODS:
+        names = list(SEARCH_METHODS)
+        print(f"Unknown method. Please use: {', '.join(names[:-1])}, or {names[-1]}")
+        sys.exit(1)
 
     # Determine the correct file path
-    file_path = None
-    if os.path.isfile(filename):
-        file_path = filename
-    else:
-        map_path = os.path.join('map', filename)
-        if os.path.isfile(map_path):
-            file_path = map_path
-        else:
-            print(f"Error: File '{filename}' not found in current directory or 'map/' directory.")
-            sys.exit(1)
+    file_path = resolve_map_path(filename)
+    if file_path is None:
+        print(f"Error: File '{filename}' not found in current directory or 'map/' directory.")
+        sys.exit(1)
 
     # Load the grid with the resolved file path
     grid = Grid(file_path)
-    original_goals = grid.goal_positions.copy()
+    goals = list(grid.goal_positions)
 
-    # Process each goal sequentially
-    for idx, goal in enumerate(original_goals):
-        grid.goal_positions = [goal]
-        
-        path = []
-        num_nodes = 0
-        
-        try:
-            if method == "bfs":
-                result = bfs(grid, as_generator=False)
-                if result:
-                    if isinstance(result, tuple) and len(result) == 2:
-                        path, num_nodes = result
-                    else:
-                        print(f"Warning: bfs returned unexpected format: {result}")
-            elif method == "dfs":
-                result = dfs(grid, as_generator=False)
-                if result:
-                    if isinstance(result, tuple) and len(result) == 2:
-                        path, num_nodes = result
-                    else:
-                        print(f"Warning: dfs returned unexpected format: {result}")
-            elif method == "gbfs":
-                result = gbfs(grid, as_generator=False)
-                if result:
-                    if isinstance(result, tuple) and len(result) == 2:
-                        path, num_nodes = result
-                    else:
-                        print(f"Warning: gbfs returned unexpected format: {result}")
-            elif method == "as":
-                result = astar(grid, as_generator=False)
-                if result:
-                    if isinstance(result, tuple) and len(result) == 2:
-                        path, num_nodes = result
-                    else:
-                        print(f"Warning: astar returned unexpected format: {result}")
-            elif method == "ids":
-                result = ids(grid, as_generator=False)
-                if result:
-                    if isinstance(result, tuple) and len(result) == 2:
-                        path, num_nodes = result
-                    else:
-                        print(f"Warning: ids returned unexpected format: {result}")
-            elif method == "ida_star":
-                result = ida_star(grid, as_generator=False)
-                if result:
-                    if isinstance(result, tuple) and len(result) == 2:
-                        path, num_nodes = result
-                    else:
-                        print(f"Warning: ida_star returned unexpected format: {result}")
-            else:
-                print("Unknown method. Please use: bfs, dfs, gbfs, as, ids, or ida_star")
-                sys.exit(1)
-        except Exception as e:
-            print(f"Error running {method}: {str(e)}")
-            path = []
-            num_nodes = 0
-
-        print(f"{filename} {method.upper()} [Goal {idx+1}]")
-        print(f"Start at {grid.start_position}")
-        print(f"Goal at {goal}")
-        print(f"{num_nodes} nodes expanded")
-        
-        if path:
-            # Calculate and display path length (number of moves)
-            path_length = len(path) - 1  # Subtract 1 because the path includes the start position
-            print(f"Path length: {path_length}")
-            
-            moves = path_to_moves(path)
-            print("; ".join(moves))
-        else:
-            print("No solution found.")
-        print("-----------------------")
+    options = method_options(method, args)
+    if args.jobs > 1 and method in MULTI_GOAL_METHODS and not args.per_goal:
+        logging.warning("--jobs is ignored: %s searches all goals in one pass unless --per-goal is given", method)
+
+    def solve(goals):
+        if method in MULTI_GOAL_METHODS and not args.per_goal:
+            # One expansion from the start settles every goal
+            return multi_goal_search(grid, method, goals)
+        # Process each goal separately, in parallel with --jobs
+        return solve_goals(grid, method, goals, args.jobs, **options)
+
+    # Goals answered before are taken from the result cache and not searched
+    cache = None if args.no_cache else process_cache()
+    if cache is not None:
+        results = cached_results(cache, grid, method, grid.start_position, goals, options, solve)
+    else:
+        results = solve(goals)
 
-    grid.goal_positions = original_goals
+    for idx, (goal, result) in enumerate(zip(goals, results)):
+        path, num_nodes = result or ([], 0)
+        print_result(filename, method, idx, grid.start_position, goal, path, num_nodes)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
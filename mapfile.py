@@ -0,0 +1,215 @@
+"""
+Compiled binary map format.
+
+Layout (little endian):
+    header      magic, version, width, height, start x/y, goal count,
+                size and mtime of the text map it was compiled from
+    goals       goal count pairs of int32 x, y
+    walls       width * height bytes, one per cell (1 = wall)
+    neighbours  width * height bytes, the 4-bit open-neighbour mask per cell
+
+Both cell arrays are stored exactly as Grid uses them, so a compiled map is
+memory-mapped and used in place: loading costs the same for any map size and
+processes that open the same file share its pages.
+
+Usage: python3 mapfile.py <map.txt> [<map.txt> ...] [-o <output_dir>] [--text]
+
+With --text the maps are rewritten as compact text maps that describe each
+row's walls as run lengths instead of listing every wall cell.
+"""
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from contextlib import contextmanager
+
+MAGIC = b'RNAV'
+VERSION = 1
+EXTENSION = '.rnav'
+
+HEADER = struct.Struct('<4sHHIIiiIqq')
+GOAL = struct.Struct('<ii')
+
+
+def cache_dir():
+    """Directory holding compiled copies of text maps."""
+    return os.environ.get('ROBOTNAV_CACHE_DIR',
+                          os.path.join(os.path.expanduser('~'), '.cache', 'robotnav'))
+
+
+def cache_path(source):
+    """Compiled cache file for a text map, unique per absolute path."""
+    source = os.path.abspath(source)
+    name = os.path.splitext(os.path.basename(source))[0]
+    digest = hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(cache_dir(), f"{name}-{digest}{EXTENSION}")
+
+
+def is_compiled(filename):
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+@contextmanager
+def atomic_write(path):
+    """
+    Binary file to write that replaces path only once it is complete, so
+    readers never see a partial file. Missing directories are created. If
+    writing fails, the temporary file is removed and path is left as it was.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_compiled(path, grid, source_stat=None):
+    """Write a grid in compiled form. The file is replaced atomically."""
+    source_size = source_stat.st_size if source_stat else -1
+    source_mtime = source_stat.st_mtime_ns if source_stat else -1
+    header = HEADER.pack(MAGIC, VERSION, 0, grid.width, grid.height,
+                         grid.start_position[0], grid.start_position[1],
+                         len(grid.goal_positions), source_size, source_mtime)
+
+    with atomic_write(path) as f:
+        f.write(header)
+        for goal in grid.goal_positions:
+            f.write(GOAL.pack(*goal))
+        f.write(grid.walls)
+        f.write(grid.neighbor_mask)
+
+
+def row_runs(row):
+    """Alternating open/wall run lengths of one row of wall bytes."""
+    runs = []
+    x, wall = 0, 0
+    while x < len(row):
+        end = row.find(b'\x00' if wall else b'\x01', x)
+        if end == -1:
+            end = len(row)
+        runs.append(end - x)
+        x, wall = end, 1 - wall
+    return runs
+
+
+def write_text(path, grid):
+    """Write a grid as a text map using run-length rows for the walls."""
+    walls = bytes(grid.walls)
+    with open(path, 'w') as f:
+        f.write(f"{grid.width}x{grid.height}\n")
+        f.write(f"{grid.start_position[0]},{grid.start_position[1]}\n")
+        f.write("; ".join(f"{x},{y}" for x, y in grid.goal_positions) + "\n")
+        for y in range(grid.height):
+            row = walls[y * grid.width:(y + 1) * grid.width]
+            if 1 in row:
+                runs = row_runs(row)
+                # Trailing open cells need no run
+                if len(runs) % 2 == 1:
+                    runs.pop()
+                f.write(f"{y}:{','.join(map(str, runs))}\n")
+
+
+def read_header(path):
+    """Header fields of a compiled map, or None if it is not one."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    fields = HEADER.unpack(data)
+    if fields[0] != MAGIC or fields[1] != VERSION:
+        return None
+    return fields
+
+
+def load_compiled(path):
+    """
+    Memory-map a compiled map. Returns a dict with width, height, start,
+    goals and read-only 'walls' / 'neighbor_mask' views over the mapping.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise ValueError(f"'{path}' is truncated")
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    fields = HEADER.unpack_from(mapping, 0)
+    magic, version, _, width, height, start_x, start_y, goal_count, _, _ = fields
+    if magic != MAGIC:
+        raise ValueError(f"'{path}' is not a compiled map")
+    if version != VERSION:
+        raise ValueError(f"'{path}' has unsupported map version {version}")
+
+    offset = HEADER.size
+    if len(mapping) < offset + goal_count * GOAL.size:
+        raise ValueError(f"'{path}' is truncated")
+    goals = []
+    for _ in range(goal_count):
+        goals.append(GOAL.unpack_from(mapping, offset))
+        offset += GOAL.size
+
+    cells = width * height
+    if len(mapping) < offset + 2 * cells:
+        raise ValueError(f"'{path}' is truncated")
+    view = memoryview(mapping)
+    return {
+        'width': width,
+        'height': height,
+        'start': (start_x, start_y),
+        'goals': goals,
+        'walls': view[offset:offset + cells],
+        'neighbor_mask': view[offset + cells:offset + 2 * cells],
+    }
+
+
+def is_fresh(compiled, source):
+    """True if a compiled cache file matches the current text map."""
+    fields = read_header(compiled)
+    if fields is None:
+        return False
+    stat = os.stat(source)
+    return fields[8] == stat.st_size and fields[9] == stat.st_mtime_ns
+
+
+def main():
+    from grid import Grid
+
+    parser = argparse.ArgumentParser(description="Compile text maps to the binary map format.")
+    parser.add_argument('maps', nargs='+', help="text map files")
+    parser.add_argument('-o', '--output-dir', help="directory for compiled maps (default: next to each map)")
+    parser.add_argument('--text', action='store_true', help="write compact run-length text maps instead")
+    args = parser.parse_args()
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    for source in args.maps:
+        try:
+            grid = Grid(source, use_cache=False)
+        except (OSError, ValueError) as e:
+            print(f"Error: could not read '{source}': {e}")
+            sys.exit(1)
+        name = os.path.splitext(os.path.basename(source))[0]
+        name += '.compact.txt' if args.text else EXTENSION
+        target = os.path.join(args.output_dir or os.path.dirname(source), name)
+        if args.text:
+            write_text(target, grid)
+        else:
+            write_compiled(target, grid, os.stat(source))
+        print(f"{source} -> {target} ({grid.width}x{grid.height})")
+
+
+if __name__ == "__main__":
+    main()
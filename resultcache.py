@@ -0,0 +1,226 @@
+"""
+Persistent cache of search results.
+
+The same queries come back again and again, so results are kept in a SQLite
+database in the cache directory, next to the compiled maps. A result is
+keyed by the grid's content hash (its size and walls), the method, the start
+and goal, the method's options and RESULTS_VERSION. Editing a map changes
+its hash, so a result computed for the old walls is never returned for the
+new ones. Likewise, bumping RESULTS_VERSION retires every stored result.
+
+Paths are stored as their number of moves plus the moves packed four to a
+byte, two bits each in the order of grid.DIRECTIONS. The start is part of
+the key, so the path is rebuilt from it.
+
+Entries older than max_age seconds are dropped and, beyond max_entries, the
+oldest go first. Results that depend on timing (the portfolio, or any
+method given a deadline) are never stored. Caching is best effort: when the
+database cannot be opened or written, queries simply run.
+
+Usage: python3 resultcache.py [--clear]
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+import mapfile
+from grid import DIRECTIONS
+
+logger = logging.getLogger(__name__)
+
+DB_NAME = 'results.sqlite3'
+SCHEMA_VERSION = 1
+
+# Bump whenever a search method changes the paths or node counts it returns
+RESULTS_VERSION = 1
+DEFAULT_MAX_ENTRIES = 200_000
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+
+# Stores between eviction passes
+EVICT_EVERY = 256
+
+# Methods whose result depends on which process finishes first
+UNCACHEABLE_METHODS = ('portfolio',)
+
+_MOVE_CODES = {step: code for code, step in enumerate(DIRECTIONS)}
+
+
+def cacheable(method, options):
+    return method not in UNCACHEABLE_METHODS and options.get('deadline') is None
+
+
+def pack_moves(path):
+    """Moves of a path of unit steps, two bits each. Raises KeyError for any other step."""
+    packed = bytearray((len(path) + 2) // 4)
+    for i in range(1, len(path)):
+        (x, y), (next_x, next_y) = path[i - 1], path[i]
+        move = i - 1
+        packed[move >> 2] |= _MOVE_CODES[(next_x - x, next_y - y)] << ((move & 3) * 2)
+    return bytes(packed)
+
+
+def unpack_path(start, packed, length):
+    """Positions from start following length packed moves."""
+    x, y = start
+    path = [(x, y)]
+    for move in range(length):
+        dx, dy = DIRECTIONS[(packed[move >> 2] >> ((move & 3) * 2)) & 3]
+        x, y = x + dx, y + dy
+        path.append((x, y))
+    return path
+
+
+class ResultCache:
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES, max_age=DEFAULT_MAX_AGE):
+        self.path = path or os.path.join(mapfile.cache_dir(), DB_NAME)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._stores = 0
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Autocommit; several processes (batch and service workers) share the file
+        self._db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._create()
+        self.evict()
+
+    def _create(self):
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            if db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+                db.execute('DROP TABLE IF EXISTS results')
+                db.execute('CREATE TABLE results (key BLOB PRIMARY KEY, nodes INTEGER NOT NULL, '
+                           'length INTEGER, moves BLOB, created REAL NOT NULL)')
+                db.execute('CREATE INDEX results_created ON results (created)')
+                db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+    @staticmethod
+    def _key(grid, method, start, goal, options):
+        query = [RESULTS_VERSION, grid.content_hash(), method, list(start), list(goal), sorted(options.items())]
+        return hashlib.sha256(json.dumps(query, default=str).encode('utf-8')).digest()[:20]
+
+    def get(self, grid, method, start, goal, options=None):
+        """(path, nodes_expanded) stored for a query, or None."""
+        options = options or {}
+        if not cacheable(method, options):
+            return None
+        try:
+            row = self._db.execute('SELECT nodes, length, moves FROM results WHERE key = ?',
+                                   (self._key(grid, method, start, goal, options),)).fetchone()
+        except sqlite3.Error:
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        nodes, length, moves = row
+        return (unpack_path(start, moves, length) if length is not None else []), nodes
+
+    def put(self, grid, method, start, goal, options, path, nodes):
+        """Store the result of a query, unless it depends on timing."""
+        options = options or {}
+        if not cacheable(method, options):
+            return
+        try:
+            length, moves = (len(path) - 1, pack_moves(path)) if path else (None, None)
+        except KeyError:
+            return  # Not a path of unit steps
+        try:
+            self._db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                             (self._key(grid, method, start, goal, options), nodes, length, moves, time.time()))
+        except sqlite3.Error as e:
+            logger.debug("result cache: store failed: %s", e)
+            return
+        self._stores += 1
+        if self._stores % EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """Drop entries older than max_age, then the oldest beyond max_entries."""
+        try:
+            if self.max_age is not None:
+                self._db.execute('DELETE FROM results WHERE created < ?', (time.time() - self.max_age,))
+            if self.max_entries is not None:
+                self._db.execute('DELETE FROM results WHERE key IN (SELECT key FROM results '
+                                 'ORDER BY created DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+        except sqlite3.Error as e:
+            logger.debug("result cache: eviction failed: %s", e)
+
+    def clear(self):
+        self._db.execute('DELETE FROM results')
+        self._db.execute('VACUUM')
+        self._db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def stats(self):
+        entries = self._db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        # Recent writes sit in the write-ahead log until SQLite checkpoints them
+        size = sum(os.path.getsize(path) for path in (self.path, self.path + '-wal') if os.path.exists(path))
+        return {'path': self.path, 'entries': entries, 'bytes': size, 'hits': self.hits, 'misses': self.misses}
+
+
+_END = object()
+
+
+def cached_results(cache, grid, method, start, goals, options, solve):
+    """
+    (path, nodes_expanded) per goal, in order. Goals with a stored result are
+    not searched; solve(goals) runs the others and what it returns is stored.
+    A None result (a failed search) is passed on without being stored, and
+    if solve stops early so do the results.
+    """
+    stored = [cache.get(grid, method, start, goal, options) for goal in goals]
+    missing = [goal for goal, result in zip(goals, stored) if result is None]
+    solved = iter(solve(missing) if missing else ())
+    for goal, result in zip(goals, stored):
+        if result is None:
+            result = next(solved, _END)
+            if result is _END:
+                return
+            if result is not None:
+                cache.put(grid, method, start, goal, options, *result)
+        yield result
+
+
+# Connections must not cross a fork, so each process opens its own
+_process_cache = (None, None)
+
+
+def process_cache():
+    """The ResultCache of this process, opened on first use, or None if it cannot be opened."""
+    global _process_cache
+    pid, cache = _process_cache
+    if pid != os.getpid():
+        try:
+            cache = ResultCache()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("result cache disabled: %s", e)
+            cache = None
+        _process_cache = (os.getpid(), cache)
+    return cache
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show or clear the persistent result cache.")
+    parser.add_argument('--clear', action='store_true', help="delete every stored result")
+    args = parser.parse_args()
+
+    cache = ResultCache()
+    if args.clear:
+        cache.clear()
+    stats = cache.stats()
+    print(f"{stats['path']}: {stats['entries']} results, {stats['bytes'] / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Search methods by the name used on the command line. Every method is called
+as method(grid, as_generator=False, start=None, goals=None) and returns
+(path, nodes_expanded); start and goals default to the grid's own. With
+as_generator=True the step-by-step methods instead return a stream of search
+events (see search.events).
+"""
+from .bfs import bfs
+from .wavefront import wavefront_bfs
+from .dfs import dfs
+from .gbfs import gbfs
+from .astar import astar
+from .weighted_astar import weighted_astar, ara_star
+from .ids import ids
+from .ida_star import ida_star
+from .distance_field import distance_field_search
+from .bidirectional import bidirectional_bfs, bidirectional_astar
+from .jps import jps
+from .hpa import hpa
+from .dstar_lite import dstar_lite
+from .portfolio import portfolio
+
+SEARCH_METHODS = {
+    'bfs': bfs,
+    'wave': wavefront_bfs,
+    'dfs': dfs,
+    'gbfs': gbfs,
+    'as': astar,
+    'was': weighted_astar,
+    'ara': ara_star,
+    'ids': ids,
+    'ida_star': ida_star,
+    'df': distance_field_search,
+    'bi_bfs': bidirectional_bfs,
+    'bi_as': bidirectional_astar,
+    'jps': jps,
+    'hpa': hpa,
+    'dstar': dstar_lite,
+    'portfolio': portfolio,
+}
+
+# Keyword options each method accepts beyond start and goals, as used by the command line tools
+METHOD_OPTIONS = {
+    'gbfs': ('frontier', 'heuristic'),
+    'as': ('frontier', 'heuristic'),
+    'was': ('weight', 'frontier', 'heuristic'),
+    'ara': ('weight', 'deadline', 'max_nodes', 'frontier', 'heuristic'),
+    'wave': ('engine',),
+    'ids': ('max_depth',),
+    'ida_star': ('heuristic',),
+    'portfolio': ('candidates', 'optimal', 'deadline', 'frontier', 'heuristic'),
+}
@@ -0,0 +1,102 @@
+"""
+In-memory cache of what the searches precompute per map: distance fields,
+landmark tables and HPA abstract graphs.
+
+Artifacts are keyed by kind, the grid's content hash and the parameters
+they were built with, so grids loaded from the same contents share them.
+Each kind keeps at most max_entries of its own, least recently used out
+first, and when max_bytes is set all kinds together stay within it.
+
+An artifact refers to the grid it was built on. A hit rebinds it to the
+grid asking, and discard() drops everything built for a map's contents, so
+whoever stops using a grid can let its artifacts (and the grid) go too.
+"""
+from collections import OrderedDict
+
+
+class ArtifactCache:
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes
+        # (kind, content hash, params) -> (artifact, size in bytes)
+        self._entries = OrderedDict()
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, kind, grid, params):
+        """The artifact of this kind for the grid's contents, rebound to grid, or None."""
+        key = (kind, grid.content_hash(), params)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        artifact = entry[0]
+        artifact.grid = grid
+        return artifact
+
+    def put(self, kind, grid, params, artifact, max_entries=None):
+        key = (kind, grid.content_hash(), params)
+        self.pop(key)
+        size = artifact.nbytes
+        self._entries[key] = (artifact, size)
+        self.bytes += size
+        if max_entries is not None:
+            keys = [other for other in self._entries if other[0] == kind]
+            for other in keys[:max(0, len(keys) - max_entries)]:
+                self.pop(other)
+        if self.max_bytes is not None:
+            while self.bytes > self.max_bytes and len(self._entries) > 1:
+                self.pop(next(iter(self._entries)))
+
+    def pop(self, key):
+        """Remove one entry and return its artifact, or None if there is none."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self.bytes -= entry[1]
+        return entry[0]
+
+    def entries(self, kind):
+        """(key, artifact) of every entry of a kind, least recently used first."""
+        return [(key, artifact) for key, (artifact, _) in self._entries.items() if key[0] == kind]
+
+    def bytes_for(self, content_hash):
+        """Bytes held by the artifacts of one map's contents."""
+        return sum(size for key, (_, size) in self._entries.items() if key[1] == content_hash)
+
+    def discard(self, content_hash):
+        """Drop every artifact built for one map's contents."""
+        for key in [key for key in self._entries if key[1] == content_hash]:
+            self.pop(key)
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def fetch(self, kind, grid, params, build, max_entries=None, path=None, load=None):
+        """
+        Artifact of this kind for the grid: from memory, else load(path), else
+        build(). A built artifact is saved to path when one is given.
+        """
+        artifact = self.get(kind, grid, params)
+        if artifact is not None:
+            return artifact
+        if path and load:
+            try:
+                artifact = load(path)
+            except OSError:
+                artifact = None
+        if artifact is None:
+            artifact = build()
+            if path:
+                try:
+                    artifact.save(path)
+                except OSError:
+                    pass  # Saving is best effort; the artifact in memory is still usable
+        self.put(kind, grid, params, artifact, max_entries)
+        return artifact
+
+
+# Shared by every search in this process
+artifact_cache = ArtifactCache()
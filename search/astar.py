@@ -1,121 +1,119 @@
-import heapq
-from .heuristic_manhattan import heuristic_manhattan
+from .heuristics import DEFAULT_HEURISTIC, make_heuristic
+from .cells import endpoints, reconstruct_path, path_positions
+from .events import EXPAND, PUSH, POP, PATH, position_events
+from .frontier import DEFAULT_FRONTIER, make_frontier
 
-def astar(grid, as_generator=False):
-    # If as_generator is False, run through the algorithm to completion
+
+def astar(grid, as_generator=False, start=None, goals=None, frontier=DEFAULT_FRONTIER,
+          heuristic=DEFAULT_HEURISTIC):
+    start, goals = endpoints(grid, start, goals)
+    # If as_generator is False, run the lean search without visualization states
     if not as_generator:
-        # Create a generator
-        generator = _astar_generator(grid)
-        # Run it to completion
-        final_state = None
-        for state in generator:
-            final_state = state
-        
-        # Check if a path was found
-        if final_state and 'path' in final_state:
-            return final_state['path'], len(final_state['visited'])
-        else:
-            return [], len(final_state['visited']) if final_state else 0
-    
+        path, nodes_expanded = _astar_search(grid, start, goals, frontier, heuristic)
+        return path_positions(grid, path), nodes_expanded
+
     # If as_generator is True, return the generator directly
-    return _astar_generator(grid)
+    return position_events(grid, _astar_generator(grid, start, goals, frontier, heuristic))
+
+def _astar_search(grid, start_position, goal_positions, frontier=DEFAULT_FRONTIER,
+                  heuristic=DEFAULT_HEURISTIC):
+    """Same search as _astar_generator without the events. Returns (path, nodes_expanded)."""
+    current_goal = goal_positions[0] if goal_positions else None
+    if not current_goal:
+        return [], 0
 
-def _astar_generator(grid):
-    start = grid.start_position
-    goals = grid.goal_positions
-    
+    goal_cell = grid.cell_id(current_goal) if grid.in_bounds(current_goal) else None
+    start = grid.cell_id(start_position)
+    h = make_heuristic(heuristic, grid, [current_goal])
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+
+    # Ordered by f, then h, then insertion order
+    open_cells = make_frontier(frontier)
+    push, pop = open_cells.push, open_cells.pop
+    start_h = h(start)
+    push(start, start_h, start_h)
+    parent = {start: None}
+    g_score = {start: 0}
+    visited = set()
+
+    while open_cells:
+        current = pop()[0]
+        if current in visited:
+            continue
+        visited.add(current)
+        if current == goal_cell:
+            return reconstruct_path(parent, current), len(visited)
+
+        tentative_g = g_score[current] + 1
+        for _, offset in neighbor_steps[neighbor_mask[current]]:
+            neighbor = current + offset
+            if tentative_g < g_score.get(neighbor, tentative_g + 1):
+                parent[neighbor] = current
+                g_score[neighbor] = tentative_g
+                new_h = h(neighbor)
+                push(neighbor, tentative_g + new_h, new_h)
+
+    return [], len(visited)
+
+def _astar_generator(grid, start_position, goal_positions, frontier=DEFAULT_FRONTIER,
+                     heuristic=DEFAULT_HEURISTIC):
     # When multiple goals exist, focus on the current target goal
     # In main.py, we're already processing one goal at a time
-    current_goal = goals[0] if goals else None
+    current_goal = goal_positions[0] if goal_positions else None
     if not current_goal:
-        yield {'visited': set(), 'frontier': []}
         return
-    
+
+    goal_cell = grid.cell_id(current_goal) if grid.in_bounds(current_goal) else None
+    start = grid.cell_id(start_position)
+    h = make_heuristic(heuristic, grid, [current_goal])
     visited = set()
-    
-    # Priority queue for frontier: (f_score, tie_breaker, position)
-    # The tie_breaker is now: (h_score, sequence_number)
-    # This creates a more consistent ordering when f_scores are equal
-    heap = []
-    
-    # For visualization purposes
-    frontier_nodes = set()  # Changed from list to set for O(1) containment checks
-    
+
+    # Frontier ordered by f, then h (prefer cells closer to the goal), then
+    # insertion order (breadth-first among equals). A cell whose g improves
+    # is moved to its new place instead of being pushed a second time.
+    open_cells = make_frontier(frontier)
+
     # Track parents for path reconstruction and g_scores
     parent = {start: None}
     g_score = {start: 0}
-    seq = 0  # Sequence number for tie-breaking
-    
-    # Initialize with start position
-    # Calculate heuristic directly to the current target goal
-    h_score = heuristic_manhattan(start, [current_goal])
-    f_score = h_score  # g_score is 0 for start
-    heapq.heappush(heap, (f_score, (h_score, seq), start))
-    frontier_nodes.add(start)
-    seq += 1
-    
-    # Precompute directions
-    directions = [(1, 0), (0, 1), (-1, 0), (0, -1)]  # RIGHT, DOWN, LEFT, UP
-    
-    while heap:
+
+    # Initialize with start position; g is 0 so f equals h
+    start_h = h(start)
+    open_cells.push(start, start_h, start_h)
+    yield PUSH, start
+
+    # Open neighbours per cell in RIGHT, DOWN, LEFT, UP order
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+
+    while open_cells:
         # Get the most promising node
-        f, (h, _), current = heapq.heappop(heap)
-        frontier_nodes.discard(current)
-        
+        current = open_cells.pop()[0]
+        yield POP, current
+
         # Skip if already visited
         if current in visited:
             continue
-            
+
         visited.add(current)
-        
+        yield EXPAND, current
+
         # If reached the current goal, reconstruct path
-        if current == current_goal:
-            path = []
-            while current:
-                path.append(current)
-                current = parent.get(current)
-            path.reverse()
-            
-            # Convert to list for visualization
-            frontier = list(frontier_nodes)
-            yield {'visited': visited, 'frontier': frontier, 'path': path}
+        if current == goal_cell:
+            yield PATH, reconstruct_path(parent, current)
             return
-        
-        # Process neighbors
-        x, y = current
-        current_g = g_score[current]
-        
-        for i, (dx, dy) in enumerate(directions):
-            neighbor = (x + dx, y + dy)
-            
-            # Skip invalid positions
-            if not grid.is_valid_position(neighbor):
-                continue
-                
-            # Calculate new g score (uniform cost of 1 per step)
-            tentative_g = current_g + 1
-            
+
+        # Uniform cost of 1 per step
+        tentative_g = g_score[current] + 1
+
+        for _, offset in neighbor_steps[neighbor_mask[current]]:
+            neighbor = current + offset
+
             # Only process if this path is better than any previously found
-            if neighbor not in g_score or tentative_g < g_score[neighbor]:
-                # Update tracking information
+            if tentative_g < g_score.get(neighbor, tentative_g + 1):
                 parent[neighbor] = current
                 g_score[neighbor] = tentative_g
-                
-                # Calculate scores directly to the current target goal
-                new_h = heuristic_manhattan(neighbor, [current_goal])
-                new_f = tentative_g + new_h
-                
-                # Improved tie-breaking:
-                # Uses the h-score as primary tie-breaker (prefer nodes closer to goal)
-                # Uses sequence number as secondary tie-breaker (breadth-first ordering)
-                heapq.heappush(heap, (new_f, (new_h, seq), neighbor))
-                frontier_nodes.add(neighbor)
-                seq += 1  # Increment sequence for each node
-        
-        # Yield current state for visualization
-        frontier = list(frontier_nodes)  # Convert set to list for visualization
-        yield {'visited': visited, 'frontier': frontier}
-    
-    # No path found
-    frontier = list(frontier_nodes)
-    yield {'visited': visited, 'frontier': frontier}
\ No newline at end of file
+                new_h = h(neighbor)
+                open_cells.push(neighbor, tentative_g + new_h, new_h)
+                yield PUSH, neighbor
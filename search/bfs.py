@@ -1,62 +1,68 @@
 from collections import deque
+from .cells import endpoints, goal_cells, reconstruct_path, path_positions
+from .events import EXPAND, PUSH, POP, PATH, position_events
 
-def bfs(grid, as_generator=False):
+def bfs(grid, as_generator=False, start=None, goals=None):
+    start, goals = endpoints(grid, start, goals)
     if not as_generator:
-        # Create a generator
-        generator = _bfs_generator(grid)
-        # Run it to completion
-        final_state = None
-        for state in generator:
-            final_state = state
-        
-        # Check if a path was found
-        if final_state and 'path' in final_state:
-            return final_state['path'], len(final_state['visited'])
-        else:
-            return [], len(final_state['visited']) if final_state else 0
-    
+        path, nodes_expanded = _bfs_search(grid, start, goals)
+        return path_positions(grid, path), nodes_expanded
+
     # If as_generator is True, return the generator directly
-    return _bfs_generator(grid)
+    return position_events(grid, _bfs_generator(grid, start, goals))
+
+def _bfs_search(grid, start_position, goal_positions):
+    """Same search as _bfs_generator without the per-step states. Returns (path, nodes_expanded)."""
+    start = grid.cell_id(start_position)
+    goals = goal_cells(grid, goal_positions)
+    frontier = deque([start])
+    parent = {start: None}
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+    expanded = 0
+
+    # Every cell enters the frontier once, so each pop is a new expansion
+    while frontier:
+        current = frontier.popleft()
+        expanded += 1
+        if current in goals:
+            return reconstruct_path(parent, current), expanded
+        for _, offset in neighbor_steps[neighbor_mask[current]]:
+            neighbor = current + offset
+            if neighbor not in parent:
+                parent[neighbor] = current
+                frontier.append(neighbor)
 
-def _bfs_generator(grid):
-    # Helper function that implements the BFS algorithm and yields states
-    start = grid.start_position
-    goals = set(grid.goal_positions)
-    visited = set()
+    return [], expanded
+
+def _bfs_generator(grid, start_position, goal_positions):
+    # Helper function that implements the BFS algorithm and yields search events (cell ids)
+    start = grid.cell_id(start_position)
+    goals = goal_cells(grid, goal_positions)
     frontier = deque([start])
-    
-    # Track parents for path reconstruction
+
+    # Track parents for path reconstruction; a cell is in parent once it has
+    # been added to the frontier, which replaces the linear frontier scan
     parent = {start: None}
-    
+
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+    yield PUSH, start
+
     while frontier:
         current = frontier.popleft()
-        
-        # Skip if already visited
-        if current in visited:
-            continue
-            
-        visited.add(current)
-        
+        yield POP, current
+        yield EXPAND, current
+
         # If reached a goal, reconstruct path
         if current in goals:
-            path = []
-            while current:
-                path.append(current)
-                current = parent.get(current)
-            path.reverse()
-            
-            yield {'visited': visited, 'frontier': list(frontier), 'path': path}
+            yield PATH, reconstruct_path(parent, current)
             return
-        
+
         # Process neighbors in RIGHT, DOWN, LEFT, UP order
-        x, y = current
-        for dx, dy in [(1, 0), (0, 1), (-1, 0), (0, -1)]:  # RIGHT, DOWN, LEFT, UP
-            neighbor = (x + dx, y + dy)
-            if grid.is_valid_position(neighbor) and neighbor not in visited and neighbor not in frontier:
+        for _, offset in neighbor_steps[neighbor_mask[current]]:
+            neighbor = current + offset
+            if neighbor not in parent:
                 parent[neighbor] = current
                 frontier.append(neighbor)
-        
-        yield {'visited': visited, 'frontier': list(frontier)}
-    
-    # No path found
-    yield {'visited': visited, 'frontier': list(frontier)}
\ No newline at end of file
+                yield PUSH, neighbor
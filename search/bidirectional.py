@@ -0,0 +1,294 @@
+"""
+Bidirectional BFS and bidirectional A*.
+
+Both grow one search tree from the start and one from the goals and stop
+once the best meeting point is provably optimal, so the frontier on open
+floors covers roughly half the area of a one-sided search.
+"""
+import heapq
+from .heuristics import heuristic_manhattan, manhattan_to
+from .cells import endpoints, goal_cells, reconstruct_path, path_positions
+from .events import EXPAND, PUSH, POP, PATH, position_events
+
+def bidirectional_bfs(grid, as_generator=False, start=None, goals=None):
+    start, goals = endpoints(grid, start, goals)
+    if not as_generator:
+        path, nodes_expanded = _bidirectional_bfs_search(grid, start, goals)
+        return path_positions(grid, path), nodes_expanded
+    return position_events(grid, _bidirectional_bfs_generator(grid, start, goals))
+
+def bidirectional_astar(grid, as_generator=False, start=None, goals=None):
+    start, goals = endpoints(grid, start, goals)
+    if not as_generator:
+        path, nodes_expanded = _bidirectional_astar_search(grid, start, goals)
+        return path_positions(grid, path), nodes_expanded
+    return position_events(grid, _bidirectional_astar_generator(grid, start, goals))
+
+def _join_paths(parent_forward, parent_backward, forward_cell, backward_cell):
+    """Path from the start through forward_cell -> backward_cell to a goal."""
+    path = reconstruct_path(parent_forward, forward_cell)
+    cell = backward_cell
+    while cell is not None:
+        path.append(cell)
+        cell = parent_backward[cell]
+    return path
+
+def _bidirectional_bfs_search(grid, start_position, goal_positions):
+    """Same search as _bidirectional_bfs_generator without the per-step states."""
+    start = grid.cell_id(start_position)
+    goals = {goal for goal in goal_cells(grid, goal_positions) if not grid.walls[goal]}
+    if not goals:
+        return [], 0
+    if start in goals:
+        return [start], 1
+
+    parent = [{start: None}, {goal: None for goal in goals}]
+    depth = [{start: 0}, {goal: 0 for goal in goals}]
+    layers = [[start], list(goals)]
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+    # Each cell is expanded by at most one side, in at most one layer
+    expanded = 0
+
+    while layers[0] and layers[1]:
+        side = 0 if len(layers[0]) <= len(layers[1]) else 1
+        this_parent, other_parent = parent[side], parent[1 - side]
+        this_depth, other_depth = depth[side], depth[1 - side]
+
+        best_length = None
+        meeting = None
+        next_layer = []
+        for current in layers[side]:
+            next_depth = this_depth[current] + 1
+            for _, offset in neighbor_steps[neighbor_mask[current]]:
+                neighbor = current + offset
+                if neighbor in other_parent:
+                    length = next_depth + other_depth[neighbor]
+                    if best_length is None or length < best_length:
+                        best_length = length
+                        meeting = (current, neighbor)
+                if neighbor not in this_parent:
+                    this_parent[neighbor] = current
+                    this_depth[neighbor] = next_depth
+                    next_layer.append(neighbor)
+        expanded += len(layers[side])
+
+        if meeting is not None:
+            forward_cell, backward_cell = meeting if side == 0 else meeting[::-1]
+            return _join_paths(parent[0], parent[1], forward_cell, backward_cell), expanded
+
+        layers[side] = next_layer
+
+    return [], expanded
+
+def _bidirectional_bfs_generator(grid, start_position, goal_positions):
+    start = grid.cell_id(start_position)
+    # Walls cannot be entered, so a goal on a wall is unreachable
+    goals = {goal for goal in goal_cells(grid, goal_positions) if not grid.walls[goal]}
+
+    if not goals:
+        return
+    if start in goals:
+        yield EXPAND, start
+        yield PATH, [start]
+        return
+
+    # Parents and depths for each direction; backward parents point towards a goal
+    parent = [{start: None}, {goal: None for goal in goals}]
+    depth = [{start: 0}, {goal: 0 for goal in goals}]
+    layers = [[start], list(goals)]
+    for cell in layers[0] + layers[1]:
+        yield PUSH, cell
+
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+
+    while layers[0] and layers[1]:
+        # Expand a whole layer of the smaller frontier
+        side = 0 if len(layers[0]) <= len(layers[1]) else 1
+        other = 1 - side
+        this_parent, other_parent = parent[side], parent[other]
+        this_depth, other_depth = depth[side], depth[other]
+
+        best_length = None
+        meeting = None
+        next_layer = []
+        for current in layers[side]:
+            yield POP, current
+            yield EXPAND, current
+            for _, offset in neighbor_steps[neighbor_mask[current]]:
+                neighbor = current + offset
+                if neighbor in other_parent:
+                    # Candidate meeting edge current -> neighbor
+                    length = this_depth[current] + 1 + other_depth[neighbor]
+                    if best_length is None or length < best_length:
+                        best_length = length
+                        meeting = (current, neighbor)
+                if neighbor not in this_parent:
+                    this_parent[neighbor] = current
+                    this_depth[neighbor] = this_depth[current] + 1
+                    next_layer.append(neighbor)
+                    yield PUSH, neighbor
+
+        if meeting is not None:
+            # Every shorter route would have met in an earlier layer
+            forward_cell, backward_cell = meeting if side == 0 else meeting[::-1]
+            yield PATH, _join_paths(parent[0], parent[1], forward_cell, backward_cell)
+            return
+
+        layers[side] = next_layer
+
+def _bidirectional_astar_search(grid, start_position, goal_positions):
+    """Same search as _bidirectional_astar_generator without the per-step states."""
+    start = grid.cell_id(start_position)
+    goals = {goal for goal in goal_cells(grid, goal_positions) if not grid.walls[goal]}
+    if not goals:
+        return [], 0
+    if start in goals:
+        return [start], 1
+
+    width = grid.width
+    start_x, start_y = start_position
+    forward_h = manhattan_to(goal_positions)
+
+    def backward_h(x, y):
+        return abs(x - start_x) + abs(y - start_y)
+
+    heuristics = [forward_h, backward_h]
+    parent = [{start: None}, {goal: None for goal in goals}]
+    g_score = [{start: 0}, {goal: 0 for goal in goals}]
+    closed = [set(), set()]
+    heaps = [[], []]
+    heappush, heappop = heapq.heappush, heapq.heappop
+
+    h = forward_h(*start_position)
+    heaps[0].append((h, h, 0, start))
+    seq = 1
+    for goal in sorted(goals):
+        h = backward_h(*grid.cell_position(goal))
+        heappush(heaps[1], (h, h, seq, goal))
+        seq += 1
+
+    best_length = float('inf')
+    meeting = None
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+
+    while heaps[0] and heaps[1]:
+        if heaps[0][0][0] >= best_length or heaps[1][0][0] >= best_length:
+            break
+
+        side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+        heap = heaps[side]
+        current = heappop(heap)[3]
+        if current in closed[side]:
+            continue
+        closed[side].add(current)
+
+        this_parent = parent[side]
+        this_g, other_g = g_score[side], g_score[1 - side]
+        heuristic = heuristics[side]
+        tentative_g = this_g[current] + 1
+
+        for _, offset in neighbor_steps[neighbor_mask[current]]:
+            neighbor = current + offset
+            if neighbor in other_g:
+                length = tentative_g + other_g[neighbor]
+                if length < best_length:
+                    best_length = length
+                    meeting = (current, neighbor) if side == 0 else (neighbor, current)
+            if tentative_g < this_g.get(neighbor, tentative_g + 1):
+                this_parent[neighbor] = current
+                this_g[neighbor] = tentative_g
+                y, x = divmod(neighbor, width)
+                new_h = heuristic(x, y)
+                heappush(heap, (tentative_g + new_h, new_h, seq, neighbor))
+                seq += 1
+
+    expanded = len(closed[0] | closed[1])
+    if meeting is None:
+        return [], expanded
+    return _join_paths(parent[0], parent[1], *meeting), expanded
+
+def _bidirectional_astar_generator(grid, start_position, goal_positions):
+    start = grid.cell_id(start_position)
+    goals = {goal for goal in goal_cells(grid, goal_positions) if not grid.walls[goal]}
+    width = grid.width
+
+    if not goals:
+        return
+    if start in goals:
+        yield EXPAND, start
+        yield PATH, [start]
+        return
+
+    # Forward search heads for the nearest goal, backward search for the start
+    def forward_h(cell):
+        return heuristic_manhattan((cell % width, cell // width), goal_positions)
+
+    def backward_h(cell):
+        return abs(cell % width - start_position[0]) + abs(cell // width - start_position[1])
+
+    heuristics = [forward_h, backward_h]
+    parent = [{start: None}, {goal: None for goal in goals}]
+    g_score = [{start: 0}, {goal: 0 for goal in goals}]
+    closed = [set(), set()]
+    heaps = [[], []]
+    seq = 0  # Sequence number for tie-breaking
+
+    h = forward_h(start)
+    heaps[0].append((h, (h, seq), start))
+    yield PUSH, start
+    seq += 1
+    for goal in sorted(goals):
+        h = backward_h(goal)
+        heapq.heappush(heaps[1], (h, (h, seq), goal))
+        yield PUSH, goal
+        seq += 1
+
+    best_length = float('inf')
+    meeting = None
+
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+
+    while heaps[0] and heaps[1]:
+        # With consistent heuristics neither side can improve on best_length
+        # once its smallest f reaches it
+        if heaps[0][0][0] >= best_length or heaps[1][0][0] >= best_length:
+            break
+
+        side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+        other = 1 - side
+        f, _, current = heapq.heappop(heaps[side])
+        yield POP, current
+        if current in closed[side]:
+            continue
+        closed[side].add(current)
+        yield EXPAND, current
+
+        this_g, other_g = g_score[side], g_score[other]
+        heuristic = heuristics[side]
+        current_g = this_g[current]
+
+        for _, offset in neighbor_steps[neighbor_mask[current]]:
+            neighbor = current + offset
+            tentative_g = current_g + 1
+
+            if neighbor in other_g:
+                length = tentative_g + other_g[neighbor]
+                if length < best_length:
+                    best_length = length
+                    meeting = (current, neighbor) if side == 0 else (neighbor, current)
+
+            if neighbor not in this_g or tentative_g < this_g[neighbor]:
+                parent[side][neighbor] = current
+                this_g[neighbor] = tentative_g
+                new_h = heuristic(neighbor)
+                heapq.heappush(heaps[side], (tentative_g + new_h, (new_h, seq), neighbor))
+                yield PUSH, neighbor
+                seq += 1
+
+    # No event for a missing path
+    if meeting is not None:
+        yield PATH, _join_paths(parent[0], parent[1], *meeting)
@@ -0,0 +1,52 @@
+"""
+Helpers shared by the search modules for working on integer cell ids.
+
+The algorithms run on ids (y * width + x) internally and only convert back
+to (x, y) tuples at the output boundary.
+"""
+
+
+def endpoints(grid, start=None, goals=None):
+    """Start position and goal list of a query, defaulting to the grid's own."""
+    if start is None:
+        start = grid.start_position
+    if goals is None:
+        goals = grid.goal_positions
+    return start, list(goals)
+
+
+def goal_cells(grid, goals):
+    """Cell ids of the goals that lie inside the grid."""
+    return {grid.cell_id(goal) for goal in goals if grid.in_bounds(goal)}
+
+
+def reconstruct_path(parent, cell):
+    path = []
+    while cell is not None:
+        path.append(cell)
+        cell = parent.get(cell)
+    path.reverse()
+    return path
+
+
+def path_positions(grid, path):
+    return [grid.cell_position(cell) for cell in path]
+
+
+def path_to_moves(path):
+    """Names of the moves (right, down, left, up) between consecutive positions."""
+    moves = []
+    for i in range(1, len(path)):
+        prev = path[i-1]
+        curr = path[i]
+        dx = curr[0] - prev[0]
+        dy = curr[1] - prev[1]
+        if dx == 1:
+            moves.append('right')
+        elif dx == -1:
+            moves.append('left')
+        elif dy == 1:
+            moves.append('down')
+        elif dy == -1:
+            moves.append('up')
+    return moves
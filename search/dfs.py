@@ -1,4 +1,7 @@
-def dfs(grid, as_generator=False):
+from .cells import endpoints, goal_cells, reconstruct_path, path_positions
+from .events import EXPAND, PUSH, POP, PATH, position_events
+
+def dfs(grid, as_generator=False, start=None, goals=None):
     """
     Depth-First Search algorithm for grid navigation.
     
@@ -8,93 +11,75 @@ def dfs(grid, as_generator=False):
         
     Returns:
         If as_generator is False: (path, nodes_explored) tuple
-        If as_generator is True: Generator yielding state dictionaries
+        If as_generator is True: Generator yielding search events (see search.events)
     """
-    # If as_generator is False, we need to run through the algorithm to completion and return the final result
+    start, goals = endpoints(grid, start, goals)
     if not as_generator:
-        # Create a generator
-        generator = _dfs_generator(grid)
-        # Run it to completion
-        final_state = None
-        for state in generator:
-            final_state = state
-        
-        # Check if a path was found
-        if final_state and 'path' in final_state:
-            return final_state['path'], len(final_state['visited'])
-        else:
-            return [], len(final_state['visited']) if final_state else 0
-    
+        path, nodes_expanded = _dfs_search(grid, start, goals)
+        return path_positions(grid, path), nodes_expanded
+
     # If as_generator is True, return the generator directly
-    return _dfs_generator(grid)
+    return position_events(grid, _dfs_generator(grid, start, goals))
+
+def _dfs_search(grid, start_position, goal_positions):
+    """Same search as _dfs_generator without the per-step states. Returns (path, nodes_expanded)."""
+    start = grid.cell_id(start_position)
+    goals = goal_cells(grid, goal_positions)
+    frontier = [start]
+    parent = {start: None}
+    neighbor_mask = grid.neighbor_mask
+    reversed_steps = grid.direction_table((3, 2, 1, 0))
+    expanded = 0
 
-def _dfs_generator(grid):
+    # A cell is pushed only when it first gets a parent, so no pop is a repeat
+    while frontier:
+        current = frontier.pop()
+        expanded += 1
+        if current in goals:
+            return reconstruct_path(parent, current), expanded
+        for _, offset in reversed_steps[neighbor_mask[current]]:
+            neighbor = current + offset
+            if neighbor not in parent:
+                parent[neighbor] = current
+                frontier.append(neighbor)
+
+    return [], expanded
+
+def _dfs_generator(grid, start_position, goal_positions):
     """
-    Helper function that implements the DFS algorithm and yields states.
-    
-    Yields:
-        Dictionary containing current state information:
-        - 'visited': Set of visited positions
-        - 'frontier': List of positions to explore next
-        - 'path': List of positions from start to goal (only in final state)
+    Helper function that implements the DFS algorithm and yields search
+    events as cell ids: PUSH and POP for the stack, EXPAND per visited cell
+    and PATH when a goal is reached.
     """
-    start = grid.start_position
-    goals = set(grid.goal_positions)
-    visited = set()
+    start = grid.cell_id(start_position)
+    goals = goal_cells(grid, goal_positions)
     frontier = [start]  # Using list as stack
     
     # Track parents for path reconstruction
     parent = {start: None}
     
-    # Handle empty grid case
-    if not frontier:
-        yield {'visited': visited, 'frontier': frontier}
-        return
+    # UP, LEFT, DOWN, RIGHT lookup per neighbour mask (see push order below)
+    neighbor_mask = grid.neighbor_mask
+    reversed_steps = grid.direction_table((3, 2, 1, 0))
+    yield PUSH, start
     
     while frontier:
         current = frontier.pop()  # DFS pops from the end (LIFO)
-        
-        # Skip if already visited
-        if current in visited:
-            continue
-            
-        visited.add(current)
+        yield POP, current
+        yield EXPAND, current
         
         # If reached a goal, reconstruct path
         if current in goals:
-            path = []
-            while current:
-                path.append(current)
-                current = parent.get(current)
-            path.reverse()
-            
-            yield {'visited': visited, 'frontier': frontier, 'path': path}
+            yield PATH, reconstruct_path(parent, current)
             return
         
-        # Get neighbors in exploration preference order
-        x, y = current
-        neighbors = []
-        # Define directions - we need to consider the actual visual grid orientation
-        # The order here depends on how your grid is structured
-        # Based on your visualization, this might need adjustment
-        directions = [(1, 0), (0, 1), (-1, 0), (0, -1)]  # RIGHT, DOWN, LEFT, UP
-        
-        for dx, dy in directions:
-            neighbor = (x + dx, y + dy)
-            if grid.is_valid_position(neighbor) and neighbor not in visited:
-                neighbors.append(neighbor)
-        
         # For DFS, we need to understand how the frontier.pop() and push order interaction works:
         # Last item pushed is first to be explored (LIFO - stack behavior)
         # To achieve RIGHT, DOWN, LEFT, UP exploration order, we need to push in UP, LEFT, DOWN, RIGHT order
         # This way when popping from stack, RIGHT comes out first, then DOWN, etc.
-        reversed_neighbors = neighbors[::-1]  # Reverse to get UP, LEFT, DOWN, RIGHT
-        for neighbor in reversed_neighbors:
+        for _, offset in reversed_steps[neighbor_mask[current]]:
+            neighbor = current + offset
             if neighbor not in parent:
                 parent[neighbor] = current
                 frontier.append(neighbor)
-        
-        yield {'visited': visited, 'frontier': frontier}
-    
-    # No path found
-    yield {'visited': visited, 'frontier': frontier}
\ No newline at end of file
+                yield PUSH, neighbor
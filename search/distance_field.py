@@ -0,0 +1,164 @@
+"""
+Per-goal distance fields.
+
+A distance field holds the BFS distance from every cell to one goal. Moves
+are symmetric, so a single BFS outwards from the goal gives the distance of
+every start. After that any start-to-goal query is answered by walking
+downhill through the field, which costs only the length of the path.
+
+Fields are kept in memory per (map contents, goal) and can be saved to the
+cache directory, keyed by the grid's content hash.
+"""
+import os
+import struct
+from array import array
+from collections import deque
+
+import mapfile
+from .artifacts import artifact_cache
+from .cells import endpoints
+
+UNREACHABLE = -1
+
+FIELD_MAGIC = b'RNDF'
+FIELD_HEADER = struct.Struct('<4sIIii')
+
+# Most recently used fields kept in memory
+MAX_CACHED_FIELDS = 32
+
+# Whether fields are read from and saved to the cache directory by default
+PERSIST_FIELDS = True
+
+
+class DistanceField:
+    def __init__(self, grid, goal, distances, cells_settled=0):
+        self.grid = grid
+        self.goal = goal
+        # Distance to the goal per cell id, UNREACHABLE where there is no path
+        self.distances = distances
+        # Number of cells the BFS settled while building the field (0 if loaded)
+        self.cells_settled = cells_settled
+
+    @classmethod
+    def compute(cls, grid, goal):
+        """Build the field with one BFS from the goal."""
+        distances = array('i', [UNREACHABLE]) * (grid.width * grid.height)
+        if not grid.in_bounds(goal):
+            return cls(grid, goal, distances)
+
+        goal_cell = grid.cell_id(goal)
+        distances[goal_cell] = 0
+        if grid.walls[goal_cell]:
+            return cls(grid, goal, distances, 1)
+
+        neighbor_mask = grid.neighbor_mask
+        neighbor_steps = grid.neighbor_steps
+        frontier = deque([goal_cell])
+        settled = 0
+        while frontier:
+            current = frontier.popleft()
+            settled += 1
+            next_distance = distances[current] + 1
+            for _, offset in neighbor_steps[neighbor_mask[current]]:
+                neighbor = current + offset
+                if distances[neighbor] == UNREACHABLE:
+                    distances[neighbor] = next_distance
+                    frontier.append(neighbor)
+        return cls(grid, goal, distances, settled)
+
+    @property
+    def nbytes(self):
+        return len(self.distances) * self.distances.itemsize
+
+    def distance(self, position):
+        if not self.grid.in_bounds(position):
+            return UNREACHABLE
+        return self.distances[self.grid.cell_id(position)]
+
+    def path_from(self, start):
+        """
+        Shortest path from start to the goal by greedy descent, preferring
+        RIGHT, DOWN, LEFT, UP among equally good moves. Empty if unreachable.
+        """
+        grid = self.grid
+        if not grid.in_bounds(start):
+            return []
+        distances = self.distances
+        neighbor_mask = grid.neighbor_mask
+        neighbor_steps = grid.neighbor_steps
+
+        current = grid.cell_id(start)
+        remaining = distances[current]
+        if remaining == UNREACHABLE:
+            return []
+
+        path = [current]
+        while remaining > 0:
+            for _, offset in neighbor_steps[neighbor_mask[current]]:
+                if distances[current + offset] == remaining - 1:
+                    current += offset
+                    break
+            else:
+                return []  # Field does not match the grid
+            path.append(current)
+            remaining -= 1
+        return [grid.cell_position(cell) for cell in path]
+
+    def save(self, path):
+        with mapfile.atomic_write(path) as f:
+            f.write(FIELD_HEADER.pack(FIELD_MAGIC, self.grid.width, self.grid.height, *self.goal))
+            self.distances.tofile(f)
+
+    @classmethod
+    def load(cls, grid, goal, path):
+        """Load a saved field, or return None if it does not fit this grid and goal."""
+        with open(path, 'rb') as f:
+            header = f.read(FIELD_HEADER.size)
+            if len(header) < FIELD_HEADER.size:
+                return None
+            magic, width, height, goal_x, goal_y = FIELD_HEADER.unpack(header)
+            if (magic != FIELD_MAGIC or (width, height) != (grid.width, grid.height)
+                    or (goal_x, goal_y) != tuple(goal)):
+                return None
+            distances = array('i')
+            try:
+                distances.fromfile(f, width * height)
+            except EOFError:
+                return None
+        return cls(grid, goal, distances)
+
+
+def field_path(grid, goal):
+    """Cache file of the field for a goal on this grid's contents."""
+    return os.path.join(mapfile.cache_dir(), 'fields',
+                        f"{grid.content_hash()}-{goal[0]}_{goal[1]}.dist")
+
+
+def distance_field(grid, goal, persist=PERSIST_FIELDS):
+    """
+    Distance field for a goal, built once per map contents. With persist the
+    field is also read from and written to the cache directory.
+    """
+    return artifact_cache.fetch('field', grid, tuple(goal),
+                                lambda: DistanceField.compute(grid, goal), MAX_CACHED_FIELDS,
+                                field_path(grid, goal) if persist else None,
+                                lambda path: DistanceField.load(grid, goal, path))
+
+
+def distance_field_search(grid, as_generator=False, start=None, goals=None, persist=PERSIST_FIELDS):
+    """
+    Answer the first goal (default grid.goal_positions) from start (default
+    grid.start_position) using its distance field. Returns (path,
+    nodes_expanded), where the node count is the cells the walk visited: the
+    path, or none if the goal is unreachable. It does not depend on whether
+    the field was cached; the one-off cost of building it is the field's
+    cells_settled.
+    """
+    if as_generator:
+        raise ValueError("Distance field queries have no step-by-step view")
+    start, goals = endpoints(grid, start, goals)
+    if not goals:
+        return [], 0
+    field = distance_field(grid, goals[0], persist=persist)
+    path = field.path_from(start)
+    return path, len(path)
@@ -0,0 +1,218 @@
+"""
+D* Lite: incremental replanning for grids whose walls change at runtime.
+
+The search runs backwards from the goals. g is the distance to the nearest
+goal as last computed and rhs the one-step lookahead value,
+min(1 + g(neighbour)). A cell is queued while the two differ, keyed by
+(min(g, rhs) + h + km, min(g, rhs)). h is the Manhattan distance to the
+current start, and km grows by how far the start has moved so that old keys
+stay valid lower bounds.
+
+After a wall change only the changed cell and its four neighbours get a new
+rhs. The queue then repairs just the part of the search tree whose
+distances actually changed, instead of searching again from scratch. The
+robot can move between plans; the start only enters the keys, so moving it
+costs nothing until the next plan.
+
+    planner = DStarLite(grid)
+    path, nodes = planner.plan()
+    grid.add_wall((x, y))
+    planner.move_to(path[3])
+    path, nodes = planner.plan()
+
+The planner reads the grid's change log (Grid.changes_since) on every
+plan(), so walls can be changed through the Grid API at any time. If more
+changes happened than the log keeps, it starts over.
+"""
+from .cells import endpoints
+from .frontier import make_frontier
+
+# Keys rise and fall as km and the start change; the heap handles both
+DEFAULT_FRONTIER = 'heap'
+
+INFINITY = float('inf')
+
+
+class DStarLite:
+    def __init__(self, grid, start=None, goals=None, frontier=DEFAULT_FRONTIER):
+        start, goals = endpoints(grid, start, goals)
+        self.grid = grid
+        self.goals = {grid.cell_id(goal) for goal in goals if grid.in_bounds(goal)}
+        self.start = grid.cell_id(start)
+        self.frontier = frontier
+        self.reset()
+
+    def reset(self):
+        """Forget all search state; the next plan() searches from scratch."""
+        self.g = {}
+        self.rhs = {}
+        self.km = 0
+        self.version = self.grid.version
+        self._last_start = self.start
+        self._queue = make_frontier(self.frontier)
+        for goal in self.goals:
+            self.rhs[goal] = 0
+            self._queue.push(goal, *self._key(goal))
+
+    def move_to(self, position):
+        """Move the start, typically along the last planned path."""
+        self.start = self.grid.cell_id(position)
+
+    def plan(self):
+        """
+        Bring the search up to date with the grid's walls and the current
+        start. Returns (path, nodes_expanded), where the node count is the
+        work done by this call only.
+        """
+        grid = self.grid
+        if self.start != self._last_start:
+            self.km += self._distance(self._last_start, self.start)
+            self._last_start = self.start
+        if grid.version != self.version:
+            cells = grid.changes_since(self.version)
+            if cells is None:
+                self.reset()
+            else:
+                self._cells_changed(cells)
+            self.version = grid.version
+        expanded = self._compute_shortest_path()
+        return self.path(), expanded
+
+    def path(self):
+        """Greedy walk down the g-values from the start, as positions."""
+        grid = self.grid
+        g = self.g
+        current = self.start
+        # The search may stop before settling the start itself, so its rhs is the distance
+        if self.rhs.get(current, INFINITY) == INFINITY and current not in self.goals:
+            return []
+        neighbor_mask = grid.neighbor_mask
+        neighbor_steps = grid.neighbor_steps
+        path = [current]
+        while current not in self.goals:
+            best, best_g = None, INFINITY
+            for _, offset in neighbor_steps[neighbor_mask[current]]:
+                neighbor_g = g.get(current + offset, INFINITY)
+                if neighbor_g < best_g:
+                    best, best_g = current + offset, neighbor_g
+            if best is None or len(path) > grid.width * grid.height:
+                return []
+            current = best
+            path.append(current)
+        return [grid.cell_position(cell) for cell in path]
+
+    def _distance(self, a, b):
+        width = self.grid.width
+        ay, ax = divmod(a, width)
+        by, bx = divmod(b, width)
+        return abs(ax - bx) + abs(ay - by)
+
+    def _key(self, cell):
+        value = min(self.g.get(cell, INFINITY), self.rhs.get(cell, INFINITY))
+        return value + self._distance(self.start, cell) + self.km, value
+
+    def _lookahead(self, cell):
+        """rhs of a non-goal cell: one step plus the best neighbour's g."""
+        grid = self.grid
+        if grid.walls[cell]:
+            return INFINITY
+        g = self.g
+        best = INFINITY
+        for _, offset in grid.neighbor_steps[grid.neighbor_mask[cell]]:
+            neighbor_g = g.get(cell + offset, INFINITY)
+            if neighbor_g < best:
+                best = neighbor_g
+        return best + 1
+
+    def _update_vertex(self, cell):
+        if self.g.get(cell, INFINITY) != self.rhs.get(cell, INFINITY):
+            self._queue.push(cell, *self._key(cell))
+        else:
+            self._queue.discard(cell)
+
+    def _cells_changed(self, cells):
+        """A wall changed at each of these cells: recompute rhs around them."""
+        grid = self.grid
+        width = grid.width
+        touched = set()
+        for cell in cells:
+            y, x = divmod(cell, width)
+            touched.add(cell)
+            for dx, dy in ((1, 0), (0, 1), (-1, 0), (0, -1)):
+                if grid.in_bounds((x + dx, y + dy)):
+                    touched.add(cell + dy * width + dx)
+        for cell in touched:
+            if cell not in self.goals:
+                self.rhs[cell] = self._lookahead(cell)
+            self._update_vertex(cell)
+
+    def _compute_shortest_path(self):
+        grid = self.grid
+        width = grid.width
+        walls, neighbor_mask, neighbor_steps = grid.walls, grid.neighbor_mask, grid.neighbor_steps
+        g, rhs, goals = self.g, self.rhs, self.goals
+        queue = self._queue
+        push, pop, discard = queue.push, queue.pop, queue.discard
+        start, km = self.start, self.km
+        start_y, start_x = divmod(start, width)
+        expanded = 0
+
+        while queue:
+            cell, old_key = pop()
+            start_g = g.get(start, INFINITY)
+            start_rhs = rhs.get(start, INFINITY)
+            start_value = start_g if start_g < start_rhs else start_rhs
+            if not (old_key < (start_value + km, start_value) or start_rhs > start_g):
+                push(cell, *old_key)
+                break
+
+            cell_g = g.get(cell, INFINITY)
+            cell_rhs = rhs.get(cell, INFINITY)
+            value = cell_g if cell_g < cell_rhs else cell_rhs
+            y, x = divmod(cell, width)
+            new_key = (value + abs(x - start_x) + abs(y - start_y) + km, value)
+            if old_key < new_key:
+                # Queued before km grew; requeue with its current key
+                push(cell, *new_key)
+                continue
+
+            expanded += 1
+            steps = () if walls[cell] else neighbor_steps[neighbor_mask[cell]]
+            if cell_g > cell_rhs:
+                # Overconsistent: the distance dropped, settle it
+                g[cell] = cell_rhs
+                neighbor_rhs = cell_rhs + 1
+                for _, offset in steps:
+                    neighbor = cell + offset
+                    if neighbor_rhs < rhs.get(neighbor, INFINITY) and neighbor not in goals:
+                        rhs[neighbor] = neighbor_rhs
+                        # _update_vertex, inlined
+                        neighbor_g = g.get(neighbor, INFINITY)
+                        if neighbor_g != neighbor_rhs:
+                            value = neighbor_g if neighbor_g < neighbor_rhs else neighbor_rhs
+                            y, x = divmod(neighbor, width)
+                            push(neighbor, value + abs(x - start_x) + abs(y - start_y) + km, value)
+                        else:
+                            discard(neighbor)
+            else:
+                # Underconsistent: the distance rose, so neighbours that relied on it look again
+                g[cell] = INFINITY
+                for _, offset in steps:
+                    neighbor = cell + offset
+                    if neighbor not in goals and rhs.get(neighbor, INFINITY) == cell_g + 1:
+                        rhs[neighbor] = self._lookahead(neighbor)
+                        self._update_vertex(neighbor)
+                if cell not in goals:
+                    rhs[cell] = self._lookahead(cell)
+                self._update_vertex(cell)
+        return expanded
+
+
+def dstar_lite(grid, as_generator=False, start=None, goals=None, frontier=DEFAULT_FRONTIER):
+    """
+    One-off D* Lite plan from start to the nearest of the goals. For
+    replanning after wall changes keep a DStarLite instance instead.
+    """
+    if as_generator:
+        raise ValueError("D* Lite has no step-by-step view")
+    return DStarLite(grid, start, goals, frontier).plan()
@@ -0,0 +1,70 @@
+"""
+Search events for step-by-step views.
+
+A search generator yields one small event per change instead of a snapshot
+of its whole state, so a view only pays for what actually changed:
+
+    (EXPAND, cell)   the cell was expanded
+    (PUSH, cell)     the cell was added to the frontier
+    (POP, cell)      the cell was taken off the frontier, possibly as a stale entry
+    (BOUND, value)   a new iteration started with this depth or f bound;
+                     the frontier is empty again, expanded cells are kept
+    (PATH, cells)    the search ended with this path
+
+A stream that ends without a PATH event found no path. The number of nodes
+expanded is the number of distinct cells in EXPAND events.
+"""
+from .cells import path_positions
+
+EXPAND = 'expand'
+PUSH = 'push'
+POP = 'pop'
+BOUND = 'bound'
+PATH = 'path'
+
+# Events whose value is a cell id
+CELL_EVENTS = (EXPAND, PUSH, POP)
+
+
+def run_to_completion(events):
+    """Consume a cell-id event stream and return (path, nodes_expanded)."""
+    expanded = set()
+    for kind, value in events:
+        if kind == EXPAND:
+            expanded.add(value)
+        elif kind == PATH:
+            return value, len(expanded)
+    return [], len(expanded)
+
+
+def position_events(grid, events):
+    """Translate the cell ids in an event stream into (x, y) positions for the GUI."""
+    cell_position = grid.cell_position
+    for kind, value in events:
+        if kind in CELL_EVENTS:
+            yield kind, cell_position(value)
+        elif kind == PATH:
+            yield kind, path_positions(grid, value)
+        else:
+            yield kind, value
+
+
+def batched(events, expansions=1):
+    """
+    Group an event stream into lists, each ending after the given number of
+    EXPAND events, at a BOUND or PATH event, or at the end of the stream.
+    Consumers that redraw once per list see one frame per batch of expansions.
+    """
+    batch = []
+    remaining = expansions
+    for event in events:
+        batch.append(event)
+        kind = event[0]
+        if kind == EXPAND:
+            remaining -= 1
+        if remaining <= 0 or kind == BOUND or kind == PATH:
+            yield batch
+            batch = []
+            remaining = expansions
+    if batch:
+        yield batch
@@ -0,0 +1,215 @@
+"""
+Priority queues for the best-first searches.
+
+Every frontier orders items by (priority, tie) and then by insertion order,
+which is the order A* and GBFS have always used. Pushing an item that is
+already queued moves it to the new priority (decrease-key), taking a new
+place in the insertion order as a fresh push would. pop() returns the item
+and its (priority, tie); discard() drops an item if it is queued.
+
+- HeapFrontier: heapq with lazy deletion; a moved item leaves a stale entry
+  behind that is skipped when it reaches the top.
+- IndexedHeap: binary heap with a position index, so moving an item sifts
+  its one entry and no stale entries pile up.
+- BucketQueue: one bucket per integer priority with a cursor, for small
+  non-negative integer priorities such as f in A* or h in GBFS. Each bucket
+  is a small heap on (tie, insertion order). Priorities above max_priority
+  (a far or out-of-bounds goal, a large weight) go to one overflow heap
+  instead of allocating a bucket for every value up to them.
+
+DEFAULT_FRONTIER is the backend A*, GBFS, weighted A* and ARA* use unless
+told otherwise.
+"""
+import heapq
+
+DEFAULT_FRONTIER = 'bucket'
+
+# Largest priority BucketQueue gives a bucket of its own
+MAX_BUCKET_PRIORITY = 1 << 16
+
+
+class HeapFrontier:
+    def __init__(self):
+        self._heap = []
+        self._entries = {}  # item -> insertion counter of its live entry
+        self._counter = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item):
+        return item in self._entries
+
+    def push(self, item, priority, tie=0):
+        self._counter += 1
+        self._entries[item] = self._counter
+        heapq.heappush(self._heap, (priority, tie, self._counter, item))
+
+    def discard(self, item):
+        self._entries.pop(item, None)
+
+    def pop(self):
+        heap, entries = self._heap, self._entries
+        while heap:
+            priority, tie, counter, item = heapq.heappop(heap)
+            if entries.get(item) == counter:
+                del entries[item]
+                return item, (priority, tie)
+        raise IndexError("pop from an empty frontier")
+
+
+class IndexedHeap:
+    def __init__(self):
+        self._heap = []       # [priority, tie, counter, item] lists
+        self._position = {}   # item -> index in self._heap
+        self._counter = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, item):
+        return item in self._position
+
+    def push(self, item, priority, tie=0):
+        self._counter += 1
+        entry = [priority, tie, self._counter, item]
+        index = self._position.get(item)
+        if index is None:
+            self._heap.append(entry)
+            self._sift_up(len(self._heap) - 1)
+            return
+        old = self._heap[index]
+        self._heap[index] = entry
+        if entry < old:
+            self._sift_up(index)
+        else:
+            self._sift_down(index)
+
+    def discard(self, item):
+        index = self._position.pop(item, None)
+        if index is None:
+            return
+        heap = self._heap
+        last = heap.pop()
+        if index < len(heap):
+            old = heap[index]
+            heap[index] = last
+            if last < old:
+                self._sift_up(index)
+            else:
+                self._sift_down(index)
+
+    def pop(self):
+        heap = self._heap
+        if not heap:
+            raise IndexError("pop from an empty frontier")
+        top = heap[0]
+        last = heap.pop()
+        del self._position[top[3]]
+        if heap:
+            heap[0] = last
+            self._sift_down(0)
+        return top[3], (top[0], top[1])
+
+    def _sift_up(self, index):
+        heap, position = self._heap, self._position
+        entry = heap[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if entry < heap[parent]:
+                heap[index] = heap[parent]
+                position[heap[index][3]] = index
+                index = parent
+            else:
+                break
+        heap[index] = entry
+        position[entry[3]] = index
+
+    def _sift_down(self, index):
+        heap, position = self._heap, self._position
+        size = len(heap)
+        entry = heap[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+            if heap[child] < entry:
+                heap[index] = heap[child]
+                position[heap[index][3]] = index
+                index = child
+            else:
+                break
+        heap[index] = entry
+        position[entry[3]] = index
+
+
+class BucketQueue:
+    def __init__(self, max_priority=MAX_BUCKET_PRIORITY):
+        self.max_priority = max_priority
+        self._buckets = []    # priority -> heap of (tie, counter, item)
+        self._overflow = []   # heap of (priority, tie, counter, item) above max_priority
+        self._entries = {}    # item -> insertion counter of its live entry
+        self._cursor = 0      # No live entry in the buckets has a smaller priority
+        self._counter = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, item):
+        return item in self._entries
+
+    def push(self, item, priority, tie=0):
+        if priority < 0:
+            raise ValueError("BucketQueue priorities must not be negative")
+        self._counter += 1
+        self._entries[item] = self._counter
+        if priority > self.max_priority:
+            heapq.heappush(self._overflow, (priority, tie, self._counter, item))
+            return
+        buckets = self._buckets
+        while len(buckets) <= priority:
+            buckets.append([])
+        heapq.heappush(buckets[priority], (tie, self._counter, item))
+        if priority < self._cursor:
+            # A* with a consistent heuristic never does this, GBFS often does
+            self._cursor = priority
+
+    def discard(self, item):
+        self._entries.pop(item, None)
+
+    def pop(self):
+        buckets, entries = self._buckets, self._entries
+        if not entries:
+            raise IndexError("pop from an empty frontier")
+        while self._cursor < len(buckets):
+            bucket = buckets[self._cursor]
+            if not bucket:
+                self._cursor += 1
+                continue
+            tie, counter, item = heapq.heappop(bucket)
+            if entries.get(item) == counter:
+                del entries[item]
+                return item, (self._cursor, tie)
+        # Every bucket is empty; the rest is above max_priority
+        overflow = self._overflow
+        while True:
+            priority, tie, counter, item = heapq.heappop(overflow)
+            if entries.get(item) == counter:
+                del entries[item]
+                return item, (priority, tie)
+
+
+FRONTIERS = {
+    'heap': HeapFrontier,
+    'indexed': IndexedHeap,
+    'bucket': BucketQueue,
+}
+
+
+def make_frontier(name=DEFAULT_FRONTIER):
+    try:
+        return FRONTIERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown frontier '{name}', use one of: {', '.join(FRONTIERS)}") from None
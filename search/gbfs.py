@@ -1,86 +1,89 @@
-import heapq
-from .heuristic_manhattan import heuristic_manhattan
+from .heuristics import DEFAULT_HEURISTIC, make_heuristic
+from .cells import endpoints, goal_cells, reconstruct_path, path_positions
+from .events import EXPAND, PUSH, POP, PATH, position_events
+from .frontier import DEFAULT_FRONTIER, make_frontier
 
-def gbfs(grid, as_generator=False):
+
+def gbfs(grid, as_generator=False, start=None, goals=None, frontier=DEFAULT_FRONTIER,
+         heuristic=DEFAULT_HEURISTIC):
+    start, goals = endpoints(grid, start, goals)
     if not as_generator:
-        # Create a generator
-        generator = _gbfs_generator(grid)
-        # Run it to completion
-        final_state = None
-        for state in generator:
-            final_state = state
-        
-        # Check if a path was found
-        if final_state and 'path' in final_state:
-            return final_state['path'], len(final_state['visited'])
-        else:
-            return [], len(final_state['visited']) if final_state else 0
-    
+        path, nodes_expanded = _gbfs_search(grid, start, goals, frontier, heuristic)
+        return path_positions(grid, path), nodes_expanded
+
     # If as_generator is True, return the generator directly
-    return _gbfs_generator(grid)
+    return position_events(grid, _gbfs_generator(grid, start, goals, frontier, heuristic))
+
+def _gbfs_search(grid, start_position, goal_positions, frontier=DEFAULT_FRONTIER,
+                 heuristic=DEFAULT_HEURISTIC):
+    """Same search as _gbfs_generator without the events. Returns (path, nodes_expanded)."""
+    if not goal_positions:
+        return [], 0
+
+    start = grid.cell_id(start_position)
+    goal_set = goal_cells(grid, goal_positions)
+    h = make_heuristic(heuristic, grid, goal_positions)
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+
+    open_cells = make_frontier(frontier)
+    push, pop = open_cells.push, open_cells.pop
+    push(start, h(start))
+    parent = {start: None}
+    expanded = 0
+
+    # Cells are pushed once, when they get a parent, so every pop is an expansion
+    while open_cells:
+        current = pop()[0]
+        expanded += 1
+        if current in goal_set:
+            return reconstruct_path(parent, current), expanded
+        for _, offset in neighbor_steps[neighbor_mask[current]]:
+            neighbor = current + offset
+            if neighbor not in parent:
+                parent[neighbor] = current
+                push(neighbor, h(neighbor))
+
+    return [], expanded
 
-def _gbfs_generator(grid):
-    # If no goals, return empty path
-    if not grid.goal_positions:
-        yield {'visited': set(), 'frontier': []}
+def _gbfs_generator(grid, start_position, goal_positions, frontier=DEFAULT_FRONTIER,
+                    heuristic=DEFAULT_HEURISTIC):
+    # If no goals, there is nothing to search for
+    if not goal_positions:
         return
-    
-    start = grid.start_position
-    goals = grid.goal_positions
-    visited = set()
-    
-    # Priority queue elements: (heuristic, sequence_number, position)
-    heap = []
-    frontier = []  # For visualization purposes
-    
+
+    start = grid.cell_id(start_position)
+    goal_set = goal_cells(grid, goal_positions)
+    h = make_heuristic(heuristic, grid, goal_positions)
+
+    # Frontier ordered by heuristic, then insertion order: cells expanded
+    # earlier come first and a cell's neighbours follow RIGHT, DOWN, LEFT, UP
+    open_cells = make_frontier(frontier)
+
     # Track parents for path reconstruction
     parent = {start: None}
-    seq = 0  # Sequence number for consistent tie-breaking
-    
+
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+
     # Initialize with start position
-    initial_h = heuristic_manhattan(start, goals)
-    heapq.heappush(heap, (initial_h, seq, start))
-    frontier.append(start)
-    seq += 1
-    
-    while heap:
-        h, s, current = heapq.heappop(heap)
-        frontier.remove(current)
-        
-        # Skip if already visited
-        if current in visited:
-            continue
-            
-        visited.add(current)
-        
+    open_cells.push(start, h(start))
+    yield PUSH, start
+
+    while open_cells:
+        current = open_cells.pop()[0]
+        yield POP, current
+        yield EXPAND, current
+
         # If reached a goal, reconstruct path
-        if current in goals:
-            path = []
-            while current:
-                path.append(current)
-                current = parent.get(current)
-            path.reverse()
-            
-            yield {'visited': visited, 'frontier': frontier, 'path': path}
+        if current in goal_set:
+            yield PATH, reconstruct_path(parent, current)
             return
-        
+
         # Process neighbors in RIGHT, DOWN, LEFT, UP order
-        x, y = current
-        directions = [(1, 0), (0, 1), (-1, 0), (0, -1)]  # RIGHT, DOWN, LEFT, UP
-        
-        for i, (dx, dy) in enumerate(directions):
-            neighbor = (x + dx, y + dy)
-            if grid.is_valid_position(neighbor) and neighbor not in visited:
-                if neighbor not in parent:
-                    parent[neighbor] = current
-                    new_h = heuristic_manhattan(neighbor, goals)
-                    direction_pref = i * 0.1  # Small preference based on direction
-                    heapq.heappush(heap, (new_h, seq + direction_pref, neighbor))
-                    frontier.append(neighbor)
-        
-        seq += 1  # Increment sequence after all neighbors are processed
-        
-        yield {'visited': visited, 'frontier': frontier}
-    
-    # No path found
-    yield {'visited': visited, 'frontier': frontier}
\ No newline at end of file
+        for _, offset in neighbor_steps[neighbor_mask[current]]:
+            neighbor = current + offset
+            if neighbor not in parent:
+                parent[neighbor] = current
+                open_cells.push(neighbor, h(neighbor))
+                yield PUSH, neighbor
@@ -0,0 +1,313 @@
+"""
+Heuristics for the informed searches.
+
+Every entry in HEURISTICS is a factory called as factory(grid, goals) that
+returns h(cell): a lower bound on the number of moves from a cell id to the
+nearest of the goals. All of them are consistent, so A* and IDA* stay
+optimal whichever is chosen.
+
+- manhattan: |dx| + |dy| to the nearest goal. With many goals the nearest
+  one is found through a GoalIndex instead of scanning the whole list.
+- alt: ALT (A*, landmarks, triangle inequality). Exact BFS distances from a
+  few landmark cells are computed once per map contents. For any landmark L,
+  |d(L, goal) - d(L, cell)| cannot exceed the true distance from cell to
+  goal, so the largest such value over the landmarks is a lower bound. On
+  mazes it is far closer to the true distance than Manhattan is. The value
+  used is never below Manhattan.
+
+Landmarks are chosen farthest-first inside the largest connected area: the
+first is the cell farthest from that area's first cell, each next one the
+cell farthest from all landmarks chosen so far. Their distances are kept as
+one array('i') per landmark, in memory per map contents and in the cache
+directory.
+"""
+import math
+import os
+import struct
+from array import array
+from collections import deque
+
+import mapfile
+from .artifacts import artifact_cache
+from .distance_field import DistanceField, UNREACHABLE
+
+DEFAULT_HEURISTIC = 'manhattan'
+
+# Goal lists at least this long are searched through a GoalIndex
+INDEX_MIN_GOALS = 32
+
+# Landmarks per map for ALT
+DEFAULT_LANDMARKS = 6
+
+LANDMARK_MAGIC = b'RNLM'
+LANDMARK_HEADER = struct.Struct('<4sIII')
+
+# Most recently used landmark tables kept in memory
+MAX_CACHED_TABLES = 8
+
+
+def heuristic_manhattan(current, goals):
+    min_distance = float('inf')
+    for goal in goals:
+        distance = abs(current[0] - goal[0]) + abs(current[1] - goal[1])
+        if distance < min_distance:
+            min_distance = distance
+    return min_distance
+
+
+class GoalIndex:
+    """
+    Goals bucketed into square blocks of cells for nearest-goal queries.
+
+    nearest_distance(x, y) looks at the blocks in rings of growing size
+    around (x, y) and stops once the next ring is farther away than the
+    best goal found, so a query touches only the goals near the answer
+    rather than the whole list.
+    """
+
+    def __init__(self, goals, block_size=None):
+        goals = sorted({tuple(goal) for goal in goals})
+        if not goals:
+            raise ValueError("GoalIndex needs at least one goal")
+        xs = [x for x, _ in goals]
+        ys = [y for _, y in goals]
+        if block_size is None:
+            # About one goal per block over the area the goals cover
+            area = (max(xs) - min(xs) + 1) * (max(ys) - min(ys) + 1)
+            block_size = max(1, int(math.sqrt(area / len(goals))))
+        self.block_size = block_size
+        self.blocks = {}
+        for x, y in goals:
+            self.blocks.setdefault((x // block_size, y // block_size), []).append((x, y))
+        self.min_block = (min(xs) // block_size, min(ys) // block_size)
+        self.max_block = (max(xs) // block_size, max(ys) // block_size)
+
+    def nearest_distance(self, x, y):
+        size = self.block_size
+        blocks = self.blocks
+        block_x, block_y = x // size, y // size
+        (min_x, min_y), (max_x, max_y) = self.min_block, self.max_block
+        # Rings before the first one hold no blocks with goals, nor do those after the last
+        first_ring = max(min_x - block_x, block_x - max_x, min_y - block_y, block_y - max_y, 0)
+        last_ring = max(block_x - min_x, max_x - block_x, block_y - min_y, max_y - block_y)
+
+        best = float('inf')
+        for ring in range(first_ring, last_ring + 1):
+            # Every cell of ring r is at least (r - 1) * size + 1 columns or rows away
+            if ring and (ring - 1) * size + 1 >= best:
+                break
+            for block in self._ring(block_x, block_y, ring):
+                for goal_x, goal_y in blocks.get(block, ()):
+                    distance = abs(x - goal_x) + abs(y - goal_y)
+                    if distance < best:
+                        best = distance
+        return best
+
+    def _ring(self, center_x, center_y, ring):
+        """Blocks at Chebyshev distance ring from the center block, within the goals' extent."""
+        (min_x, min_y), (max_x, max_y) = self.min_block, self.max_block
+        if ring == 0:
+            yield center_x, center_y
+            return
+        xs = range(max(center_x - ring, min_x), min(center_x + ring, max_x) + 1)
+        for row in (center_y - ring, center_y + ring):
+            if min_y <= row <= max_y:
+                for column in xs:
+                    yield column, row
+        ys = range(max(center_y - ring + 1, min_y), min(center_y + ring - 1, max_y) + 1)
+        for column in (center_x - ring, center_x + ring):
+            if min_x <= column <= max_x:
+                for row in ys:
+                    yield column, row
+
+
+def manhattan_to(goals):
+    """
+    Heuristic function h(x, y) for a fixed goal list, for the lean search
+    loops. Equal to heuristic_manhattan((x, y), goals).
+    """
+    goals = [tuple(goal) for goal in goals]
+    if len(goals) == 1:
+        (goal_x, goal_y), = goals
+
+        def h(x, y):
+            return abs(x - goal_x) + abs(y - goal_y)
+    elif len(goals) >= INDEX_MIN_GOALS:
+        h = GoalIndex(goals).nearest_distance
+    else:
+        def h(x, y):
+            return heuristic_manhattan((x, y), goals)
+    return h
+
+
+def manhattan(grid, goals):
+    """Manhattan distance from a cell id to the nearest goal."""
+    h = manhattan_to(goals)
+    width = grid.width
+
+    def cell_h(cell):
+        y, x = divmod(cell, width)
+        return h(x, y)
+    return cell_h
+
+
+class LandmarkTable:
+    def __init__(self, grid, landmarks, distances):
+        self.grid = grid
+        # Landmark cell ids and, per landmark, the BFS distance of every cell
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def compute(cls, grid, count=DEFAULT_LANDMARKS):
+        """Choose up to count landmarks farthest-first and measure their distances."""
+        seed = _largest_area_cell(grid)
+        if seed is None:
+            return cls(grid, [], [])
+
+        # Distance of each cell to the nearest landmark so far; cells outside
+        # the area stay UNREACHABLE and are never chosen
+        nearest = DistanceField.compute(grid, grid.cell_position(seed)).distances
+        landmarks, distances = [], []
+        while len(landmarks) < count:
+            farthest = max(nearest)
+            if farthest <= 0:
+                break  # Every cell in the area is already a landmark
+            landmark = nearest.index(farthest)
+            field = DistanceField.compute(grid, grid.cell_position(landmark)).distances
+            landmarks.append(landmark)
+            distances.append(field)
+            nearest = array('i', map(min, nearest, field))
+        return cls(grid, landmarks, distances)
+
+    @property
+    def nbytes(self):
+        return sum(len(field) * field.itemsize for field in self.distances)
+
+    def save(self, path):
+        with mapfile.atomic_write(path) as f:
+            f.write(LANDMARK_HEADER.pack(LANDMARK_MAGIC, self.grid.width, self.grid.height,
+                                         len(self.landmarks)))
+            array('i', self.landmarks).tofile(f)
+            for field in self.distances:
+                field.tofile(f)
+
+    @classmethod
+    def load(cls, grid, path):
+        """Load a saved table, or return None if it does not fit this grid."""
+        with open(path, 'rb') as f:
+            header = f.read(LANDMARK_HEADER.size)
+            if len(header) < LANDMARK_HEADER.size:
+                return None
+            magic, width, height, count = LANDMARK_HEADER.unpack(header)
+            if magic != LANDMARK_MAGIC or (width, height) != (grid.width, grid.height):
+                return None
+            try:
+                landmarks = array('i')
+                landmarks.fromfile(f, count)
+                distances = []
+                for _ in range(count):
+                    field = array('i')
+                    field.fromfile(f, width * height)
+                    distances.append(field)
+            except EOFError:
+                return None
+        return cls(grid, list(landmarks), distances)
+
+
+def _largest_area_cell(grid):
+    """First cell of the largest 4-connected open area, or None if there is none."""
+    size = grid.width * grid.height
+    walls = grid.walls
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+    seen = bytearray(walls)  # Walls count as seen
+    best_cell, best_size = None, 0
+
+    cell = seen.find(0)
+    while cell != -1:
+        seen[cell] = 1
+        frontier = deque([cell])
+        area = 0
+        while frontier:
+            current = frontier.popleft()
+            area += 1
+            for _, offset in neighbor_steps[neighbor_mask[current]]:
+                neighbor = current + offset
+                if not seen[neighbor]:
+                    seen[neighbor] = 1
+                    frontier.append(neighbor)
+        if area > best_size:
+            best_cell, best_size = cell, area
+        if best_size * 2 >= size:
+            break  # No other area can be larger
+        cell = seen.find(0, cell + 1)
+    return best_cell
+
+
+def landmark_path(grid, count):
+    """Cache file of the landmark table for this grid's contents."""
+    return os.path.join(mapfile.cache_dir(), 'landmarks', f"{grid.content_hash()}-{count}.alt")
+
+
+def landmark_table(grid, count=DEFAULT_LANDMARKS, persist=True):
+    """
+    Landmark table for the grid, built once per map contents. With persist
+    the table is also read from and written to the cache directory.
+    """
+    return artifact_cache.fetch('landmarks', grid, count,
+                                lambda: LandmarkTable.compute(grid, count), MAX_CACHED_TABLES,
+                                landmark_path(grid, count) if persist else None,
+                                lambda path: LandmarkTable.load(grid, path))
+
+
+def alt(grid, goals, landmarks=DEFAULT_LANDMARKS, persist=True):
+    """ALT lower bound from a cell id to the nearest goal, never below Manhattan."""
+    table = landmark_table(grid, landmarks, persist)
+    width = grid.width
+
+    def single_goal(goal):
+        goal_x, goal_y = goal
+        if not grid.in_bounds(goal):
+            return lambda cell: abs(cell % width - goal_x) + abs(cell // width - goal_y)
+        goal_cell = grid.cell_id(goal)
+        # Only landmarks in the goal's area say anything about it
+        pairs = [(field, field[goal_cell]) for field in table.distances
+                 if field[goal_cell] != UNREACHABLE]
+
+        def h(cell):
+            y, x = divmod(cell, width)
+            best = abs(x - goal_x) + abs(y - goal_y)
+            for field, goal_distance in pairs:
+                distance = field[cell]
+                if distance != UNREACHABLE:
+                    difference = abs(distance - goal_distance)
+                    if difference > best:
+                        best = difference
+            return best
+        return h
+
+    bounds = [single_goal(tuple(goal)) for goal in goals]
+    if not bounds:
+        return lambda cell: float('inf')
+    if len(bounds) == 1:
+        return bounds[0]
+
+    def nearest_goal_h(cell):
+        return min(bound(cell) for bound in bounds)
+    return nearest_goal_h
+
+
+HEURISTICS = {
+    'manhattan': manhattan,
+    'alt': alt,
+}
+
+
+def make_heuristic(name, grid, goals):
+    """h(cell) for the goals using the named heuristic."""
+    try:
+        factory = HEURISTICS[name]
+    except KeyError:
+        raise ValueError(f"Unknown heuristic '{name}', use one of: {', '.join(HEURISTICS)}") from None
+    return factory(grid, goals)
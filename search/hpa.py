@@ -0,0 +1,385 @@
+"""
+Hierarchical pathfinding (HPA*).
+
+The grid is split into square clusters. Where two neighbouring clusters
+share a run of open cells along their border an entrance is placed (one
+transition in the middle of short runs, one at each end of long runs).
+Entrance cells are the nodes of an abstract graph whose edges are the
+transitions between clusters (cost 1) and the shortest paths between
+entrance cells inside each cluster.
+
+A query connects the start and goal to the entrances of their clusters,
+runs A* on the small abstract graph and then refines only the abstract
+edges on the result into grid steps. Paths are near-optimal rather than
+optimal: routes are forced through the chosen entrance cells.
+
+Abstract graphs are built once per map contents and cluster size, cached in
+memory and in the cache directory, and update() rebuilds only the clusters
+around cells whose walls changed. When a grid's walls are changed through
+the Grid API, the next query repairs that grid's graph with update() from
+the grid's change log instead of building a new one.
+
+Saved graphs are pickles, and unpickling runs code named in the file, so a
+graph is only loaded from a file owned by the current user that nobody else
+can write to. Anything that fails to load is deleted and built again.
+"""
+import heapq
+import os
+import pickle
+from collections import deque
+
+import mapfile
+from .artifacts import artifact_cache
+from .cells import endpoints
+
+DEFAULT_CLUSTER_SIZE = 10
+
+# Entrance runs at least this long get a transition at both ends
+LONG_ENTRANCE = 6
+
+MAX_CACHED_GRAPHS = 8
+
+# Rough size of one stored distance, edge or transition in the dicts below
+ENTRY_BYTES = 100
+
+# Bumped whenever the attributes of AbstractGraph change, so older pickles are rebuilt
+GRAPH_FORMAT = 1
+
+
+class AbstractGraph:
+    def __init__(self, grid, cluster_size=DEFAULT_CLUSTER_SIZE):
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.clusters_x = -(-grid.width // cluster_size)
+        self.clusters_y = -(-grid.height // cluster_size)
+        # Border between two clusters -> list of (cell, cell) transitions
+        self.entrances = {}
+        # Cluster -> {(node, node): distance} for nodes in that cluster
+        self.intra = {}
+        # Abstract node -> {neighbour: cost}
+        self.edges = {}
+        # Grid version the graph reflects (see Grid.changes_since)
+        self.version = grid.version
+        self.format = GRAPH_FORMAT
+        self.build()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['grid']
+        return state
+
+    @property
+    def nbytes(self):
+        """Estimated memory held by the graph."""
+        entries = (sum(map(len, self.entrances.values())) + sum(map(len, self.intra.values()))
+                   + sum(map(len, self.edges.values())))
+        return entries * ENTRY_BYTES
+
+    def save(self, path):
+        with mapfile.atomic_write(path) as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, grid, path):
+        """
+        Load a saved graph for grid. Returns None if the file may have been
+        written by someone else, or if it does not hold a graph of the
+        current format, in which case it is deleted.
+        """
+        with open(path, 'rb') as f:
+            if not _private_file(f.fileno()):
+                return None
+            try:
+                graph = pickle.load(f)
+            except Exception:
+                graph = None
+        if not isinstance(graph, cls) or graph.__dict__.get('format') != GRAPH_FORMAT:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+        graph.grid = grid
+        return graph
+
+    def cluster_of(self, cell):
+        width = self.grid.width
+        return ((cell % width) // self.cluster_size, (cell // width) // self.cluster_size)
+
+    def cluster_bounds(self, cluster):
+        cx, cy = cluster
+        size = self.cluster_size
+        return (cx * size, cy * size,
+                min((cx + 1) * size, self.grid.width), min((cy + 1) * size, self.grid.height))
+
+    def borders(self, cluster):
+        """Keys (first, second) of the borders a cluster shares with its neighbours."""
+        cx, cy = cluster
+        keys = []
+        if cx + 1 < self.clusters_x:
+            keys.append((cluster, (cx + 1, cy)))
+        if cy + 1 < self.clusters_y:
+            keys.append((cluster, (cx, cy + 1)))
+        if cx > 0:
+            keys.append(((cx - 1, cy), cluster))
+        if cy > 0:
+            keys.append(((cx, cy - 1), cluster))
+        return keys
+
+    def build(self):
+        clusters = [(cx, cy) for cy in range(self.clusters_y) for cx in range(self.clusters_x)]
+        for cluster in clusters:
+            for key in self.borders(cluster):
+                if key[0] == cluster:
+                    self.entrances[key] = self._find_entrances(*key)
+        for cluster in clusters:
+            self.intra[cluster] = self._intra_distances(cluster)
+        self._link()
+
+    def update(self, cells):
+        """
+        Rebuild the entrances and intra-cluster distances of the clusters
+        containing the given cells (after their walls changed) and of their
+        neighbours, whose entrance cells may have moved.
+        """
+        touched = {self.cluster_of(cell) for cell in cells}
+        affected = set(touched)
+        for cluster in touched:
+            for key in self.borders(cluster):
+                self.entrances[key] = self._find_entrances(*key)
+                affected.update(key)
+        for cluster in affected:
+            self.intra[cluster] = self._intra_distances(cluster)
+        self._link()
+
+    def _find_entrances(self, first, second):
+        """Transitions across the border between two adjacent clusters."""
+        grid = self.grid
+        width, walls = grid.width, grid.walls
+        x0, y0, x1, y1 = self.cluster_bounds(second)
+        if first[1] == second[1]:
+            # Vertical border: first is left of second
+            pairs = [(y * width + x0 - 1, y * width + x0) for y in range(y0, y1)]
+        else:
+            # Horizontal border: first is above second
+            pairs = [(y0 * width + x - width, y0 * width + x) for x in range(x0, x1)]
+
+        # Split the border into runs where both sides are open
+        runs = [[]]
+        for a, b in pairs:
+            if not walls[a] and not walls[b]:
+                runs[-1].append((a, b))
+            elif runs[-1]:
+                runs.append([])
+
+        transitions = []
+        for run in runs:
+            if len(run) >= LONG_ENTRANCE:
+                transitions.extend([run[0], run[-1]])
+            elif run:
+                transitions.append(run[len(run) // 2])
+        return transitions
+
+    def cluster_nodes(self, cluster):
+        """Abstract nodes that lie inside a cluster."""
+        nodes = set()
+        for key in self.borders(cluster):
+            for a, b in self.entrances.get(key, []):
+                nodes.add(a if key[0] == cluster else b)
+        return nodes
+
+    def _intra_distances(self, cluster):
+        nodes = self.cluster_nodes(cluster)
+        distances = {}
+        for node in nodes:
+            dist, _ = cluster_bfs(self.grid, node, self.cluster_bounds(cluster), nodes)
+            for other in nodes:
+                if other != node and other in dist:
+                    distances[(node, other)] = dist[other]
+        return distances
+
+    def _link(self):
+        edges = {}
+        for transitions in self.entrances.values():
+            for a, b in transitions:
+                edges.setdefault(a, {})[b] = 1
+                edges.setdefault(b, {})[a] = 1
+        for distances in self.intra.values():
+            for (a, b), cost in distances.items():
+                edges.setdefault(a, {})[b] = cost
+        self.edges = edges
+
+    def find_path(self, start, goal):
+        """
+        Path from start to goal cell ids as a list of cell ids (empty if
+        none) and the number of nodes expanded by the abstract search and the
+        local searches around it.
+        """
+        grid = self.grid
+        if grid.walls[goal]:
+            return [], 0
+        if start == goal:
+            return [start], 1
+
+        start_cluster = self.cluster_of(start)
+        goal_cluster = self.cluster_of(goal)
+        expanded = 0
+
+        # Connect start and goal to the entrances of their clusters
+        start_nodes = self.cluster_nodes(start_cluster)
+        targets = start_nodes | {goal} if start_cluster == goal_cluster else start_nodes
+        dist, _ = cluster_bfs(grid, start, self.cluster_bounds(start_cluster), targets)
+        expanded += len(dist)
+        start_edges = {node: d for node, d in dist.items() if node in targets}
+
+        goal_nodes = self.cluster_nodes(goal_cluster)
+        dist, _ = cluster_bfs(grid, goal, self.cluster_bounds(goal_cluster), goal_nodes)
+        expanded += len(dist)
+        goal_edges = {node: d for node, d in dist.items() if node in goal_nodes}
+
+        abstract_path, abstract_expanded = self._abstract_search(start, goal, start_edges, goal_edges)
+        expanded += abstract_expanded
+        if not abstract_path:
+            return [], expanded
+
+        # Refine each abstract edge into grid steps
+        width = grid.width
+        path = [start]
+        for a, b in zip(abstract_path, abstract_path[1:]):
+            if abs(a % width - b % width) + abs(a // width - b // width) == 1:
+                path.append(b)
+                continue
+            cluster = self.cluster_of(a)
+            dist, parent = cluster_bfs(grid, a, self.cluster_bounds(cluster), {b})
+            expanded += len(dist)
+            segment = []
+            cell = b
+            while cell != a:
+                segment.append(cell)
+                cell = parent[cell]
+            path.extend(reversed(segment))
+        return path, expanded
+
+    def _abstract_search(self, start, goal, start_edges, goal_edges):
+        width = self.grid.width
+        gx, gy = goal % width, goal // width
+
+        def h(cell):
+            return abs(cell % width - gx) + abs(cell // width - gy)
+
+        g_score = {start: 0}
+        parent = {start: None}
+        closed = set()
+        seq = 0
+        heap = [(h(start), seq, start)]
+        while heap:
+            _, _, current = heapq.heappop(heap)
+            if current in closed:
+                continue
+            closed.add(current)
+            if current == goal:
+                path = []
+                while current is not None:
+                    path.append(current)
+                    current = parent[current]
+                path.reverse()
+                return path, len(closed)
+
+            neighbours = list(self.edges.get(current, {}).items())
+            if current == start:
+                neighbours.extend(start_edges.items())
+            if current in goal_edges:
+                neighbours.append((goal, goal_edges[current]))
+            for neighbor, cost in neighbours:
+                tentative_g = g_score[current] + cost
+                if neighbor not in g_score or tentative_g < g_score[neighbor]:
+                    g_score[neighbor] = tentative_g
+                    parent[neighbor] = current
+                    seq += 1
+                    heapq.heappush(heap, (tentative_g + h(neighbor), seq, neighbor))
+        return [], len(closed)
+
+
+def cluster_bfs(grid, source, bounds, targets):
+    """
+    BFS from source restricted to a cluster's bounds. Stops once every
+    target is reached. Returns (distances, parents) keyed by cell id.
+    """
+    x0, y0, x1, y1 = bounds
+    width = grid.width
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+
+    dist = {source: 0}
+    parent = {source: None}
+    remaining = len(targets - {source})
+    frontier = deque([source])
+    while frontier and remaining:
+        current = frontier.popleft()
+        for _, offset in neighbor_steps[neighbor_mask[current]]:
+            neighbor = current + offset
+            if neighbor in dist:
+                continue
+            x, y = neighbor % width, neighbor // width
+            if not (x0 <= x < x1 and y0 <= y < y1):
+                continue
+            dist[neighbor] = dist[current] + 1
+            parent[neighbor] = current
+            frontier.append(neighbor)
+            if neighbor in targets:
+                remaining -= 1
+    return dist, parent
+
+
+def _private_file(fd):
+    """True if an open file belongs to this user and no one else can write to it."""
+    stat = os.fstat(fd)
+    return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+
+def graph_path(grid, cluster_size):
+    return os.path.join(mapfile.cache_dir(), 'hpa', f"{grid.content_hash()}-{cluster_size}.pickle")
+
+
+def _repaired_graph(grid, cluster_size):
+    """The cached graph of this grid from before its latest wall changes, brought up to date."""
+    for key, graph in artifact_cache.entries('hpa'):
+        if graph.grid is grid and key[2] == cluster_size and graph.version != grid.version:
+            cells = grid.changes_since(graph.version)
+            if cells is None:
+                return None
+            # The graph no longer matches the contents it was cached under
+            artifact_cache.pop(key)
+            graph.update(cells)
+            artifact_cache.put('hpa', grid, cluster_size, graph, MAX_CACHED_GRAPHS)
+            return graph
+    return None
+
+
+def abstract_graph(grid, cluster_size=DEFAULT_CLUSTER_SIZE, persist=True):
+    """Abstract graph for a grid, built once per map contents and cluster size."""
+    graph = artifact_cache.get('hpa', grid, cluster_size)
+    if graph is None:
+        graph = _repaired_graph(grid, cluster_size)
+    if graph is None:
+        graph = artifact_cache.fetch('hpa', grid, cluster_size,
+                                     lambda: AbstractGraph(grid, cluster_size), MAX_CACHED_GRAPHS,
+                                     graph_path(grid, cluster_size) if persist else None,
+                                     lambda path: AbstractGraph.load(grid, path))
+    graph.version = grid.version
+    return graph
+
+
+def hpa(grid, as_generator=False, start=None, goals=None, cluster_size=DEFAULT_CLUSTER_SIZE):
+    """
+    HPA* from start (default grid.start_position) to the first goal. Returns
+    (path, nodes_expanded) like the other search functions.
+    """
+    if as_generator:
+        raise ValueError("HPA* has no step-by-step view")
+    start, goals = endpoints(grid, start, goals)
+    if not goals or not grid.in_bounds(goals[0]):
+        return [], 0
+    graph = abstract_graph(grid, cluster_size)
+    path, expanded = graph.find_path(grid.cell_id(start), grid.cell_id(goals[0]))
+    return [grid.cell_position(cell) for cell in path], expanded
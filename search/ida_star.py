@@ -1,265 +1,199 @@
-def heuristic_manhattan(current, goals):
-    """Calculate Manhattan distance to closest goal"""
-    if not goals:
-        return 0
-    return min(abs(current[0] - goal[0]) + abs(current[1] - goal[1]) for goal in goals)
+"""
+IDA*: depth-first searches bounded by f = g + h, with the bound raised to
+the smallest f that went over it after every failed iteration.
 
-def ida_star(grid, as_generator=False):
+The search runs on an explicit stack so long corridors do not hit Python's
+recursion limit. Cells on the current path are marked in a bytearray for
+O(1) cycle checks, and heuristic values are computed once per cell and kept
+across iterations.
+
+An optional transposition table stores the smallest g each cell has been
+reached with in the current iteration. Arriving again with the same or a
+larger g cannot lead anywhere new under the same bound, so that branch is
+pruned. The table holds at most table_size cells; once full, cells not in it
+are searched as without a table. table_size=0 turns it off.
+"""
+from .heuristics import DEFAULT_HEURISTIC, make_heuristic
+from .cells import endpoints, goal_cells, path_positions
+from .events import EXPAND, PUSH, POP, BOUND, PATH, position_events
+
+# IDA* explores neighbours down, right, up, left
+SEARCH_ORDER = (1, 0, 3, 2)
+
+# Default number of cells the transposition table may hold
+TABLE_SIZE = 1 << 20
+
+INFINITY = float('inf')
+
+def ida_star(grid, as_generator=False, start=None, goals=None, table_size=TABLE_SIZE,
+             heuristic=DEFAULT_HEURISTIC):
     """
     IDA* implementation that maintains the same interface as your other algorithms
     """
+    start, goals = endpoints(grid, start, goals)
     if not as_generator:
-        path, visited_count = ida_star_search(grid)
-        return path, visited_count
+        path, visited_count = ida_star_search(grid, start, goals, table_size, heuristic)
+        return path_positions(grid, path), visited_count
     else:
-        return ida_star_generator(grid)
+        return position_events(grid, ida_star_generator(grid, start, goals, table_size, heuristic))
+
+def _cached_heuristic(grid, goal_positions, heuristic=DEFAULT_HEURISTIC):
+    """h(cell) for the goals, computing each cell's value once."""
+    h = make_heuristic(heuristic, grid, goal_positions)
+    cache = {}
+
+    def cell_h(cell):
+        value = cache.get(cell)
+        if value is None:
+            value = cache[cell] = h(cell)
+        return value
+    return cell_h
+
+def _bounded_search(grid, start, goals, threshold, h, on_path, table_size, visited):
+    """
+    One f-bounded depth-first search from start.
+
+    Returns (path, next_threshold): the path to a goal, or None with the
+    smallest f that exceeded threshold (infinite if nothing did). Expanded
+    cells are added to visited.
+    """
+    neighbor_mask = grid.neighbor_mask
+    steps = grid.direction_table(SEARCH_ORDER)
+    best_g = {start: 0} if table_size else None
+    next_threshold = INFINITY
+
+    path = [start]
+    on_path[start] = 1
+    visited.add(start)
+    # One iterator over the remaining neighbour steps per cell on the path
+    stack = [iter(steps[neighbor_mask[start]])]
 
-def ida_star_search(grid):
+    try:
+        while stack:
+            step = next(stack[-1], None)
+            if step is None:
+                on_path[path.pop()] = 0
+                stack.pop()
+                continue
+
+            neighbor = path[-1] + step[1]
+            if on_path[neighbor]:
+                continue
+            g = len(path)
+            f = g + h(neighbor)
+            if f > threshold:
+                if f < next_threshold:
+                    next_threshold = f
+                continue
+            if best_g is not None:
+                seen = best_g.get(neighbor)
+                if seen is not None and seen <= g:
+                    continue
+                if seen is not None or len(best_g) < table_size:
+                    best_g[neighbor] = g
+
+            path.append(neighbor)
+            if neighbor in goals:
+                return list(path), next_threshold
+            on_path[neighbor] = 1
+            visited.add(neighbor)
+            stack.append(iter(steps[neighbor_mask[neighbor]]))
+        return None, next_threshold
+    finally:
+        for cell in path:
+            on_path[cell] = 0
+
+def ida_star_search(grid, start_position, goal_positions, table_size=TABLE_SIZE,
+                    heuristic=DEFAULT_HEURISTIC):
     """
     Standard IDA* search returning (path, visited_count)
     """
-    start = grid.start_position
-    goals = set(grid.goal_positions)
-    
-    # Initialize threshold to heuristic value of start
-    threshold = heuristic_manhattan(start, goals)
-    
+    if not goal_positions:
+        return [], 0
+    start = grid.cell_id(start_position)
+    goals = goal_cells(grid, goal_positions)
+    h = _cached_heuristic(grid, goal_positions, heuristic)
+    on_path = bytearray(grid.width * grid.height)
+
     # Track total visited nodes across all iterations
     total_visited = set()
-    
-    # Limit iterations to prevent infinite loops
-    max_iterations = 1000
-    iteration = 0
-    
-    while iteration < max_iterations:
-        # Reset path for this iteration
-        path = [start]
-        visited_this_iteration = set([start])
-        
-        # Perform threshold-limited DFS
-        result = dfs_limited(grid, start, 0, threshold, path, goals, visited_this_iteration, total_visited)
-        
-        if result == "FOUND":
+    if start in goals:
+        return [start], 1
+
+    threshold = h(start)
+    while threshold < INFINITY:
+        path, threshold = _bounded_search(grid, start, goals, threshold, h, on_path,
+                                          table_size, total_visited)
+        if path is not None:
             return path, len(total_visited)
-        elif result == float('inf'):
-            # No solution exists
-            return [], len(total_visited)
-        else:
-            # Update threshold to the minimum f-value that exceeded the previous threshold
-            threshold = result
-        
-        iteration += 1
-    
-    # Max iterations reached
+
+    # Nothing went over the bound, so every reachable cell was searched
     return [], len(total_visited)
 
-def dfs_limited(grid, node, g_cost, threshold, path, goals, visited_this_iteration, total_visited):
+def ida_star_generator(grid, start_position, goal_positions, table_size=TABLE_SIZE,
+                       heuristic=DEFAULT_HEURISTIC):
     """
-    Depth-limited DFS that returns:
-    - "FOUND" if goal is reached
-    - float('inf') if no solution possible
-    - minimum f-value > threshold otherwise
+    Generator version for GUI visualization: the same search as
+    ida_star_search as events. The frontier is the current path, so
+    extending it is a PUSH and backtracking a POP.
     """
-    # Calculate f = g + h
-    h_cost = heuristic_manhattan(node, goals)
-    f_cost = g_cost + h_cost
-    
-    # If f exceeds threshold, return f for next threshold consideration
-    if f_cost > threshold:
-        return f_cost
-    
-    # Check if we reached a goal
-    if node in goals:
-        return "FOUND"
-    
-    # Track all visited nodes
-    total_visited.add(node)
-    
-    # Explore neighbors
-    min_next_threshold = float('inf')
-    
-    # Standard 4-directional movement
-    directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]  # down, right, up, left
-    
-    for dx, dy in directions:
-        x, y = node
-        neighbor = (x + dx, y + dy)
-        
-        # Skip if invalid position, wall, or already in current path
-        if (not grid.is_valid_position(neighbor) or 
-            neighbor in path):  # Cycle detection - don't revisit nodes in current path
-            continue
-        
-        # Add neighbor to current path
-        path.append(neighbor)
-        visited_this_iteration.add(neighbor)
-        
-        # Recursive call
-        result = dfs_limited(grid, neighbor, g_cost + 1, threshold, path, goals, visited_this_iteration, total_visited)
-        
-        if result == "FOUND":
-            return "FOUND"
-        elif result != float('inf'):
-            min_next_threshold = min(min_next_threshold, result)
-        
-        # Backtrack - remove from current path
-        path.pop()
-    
-    return min_next_threshold
+    if not goal_positions:
+        return
+    start = grid.cell_id(start_position)
+    goals = goal_cells(grid, goal_positions)
+    h = _cached_heuristic(grid, goal_positions, heuristic)
+    neighbor_mask = grid.neighbor_mask
+    steps = grid.direction_table(SEARCH_ORDER)
+    on_path = bytearray(grid.width * grid.height)
 
-def ida_star_generator(grid):
-    """
-    Generator version for GUI visualization
-    """
-    start = grid.start_position
-    goals = set(grid.goal_positions)
-    
-    # Initialize threshold
-    threshold = heuristic_manhattan(start, goals)
-    
-    # Track overall visited nodes
-    all_visited = set()
-    
-    # Initial state
-    yield {
-        'visited': set([start]),
-        'frontier': [start],
-        'current_bound': threshold
-    }
-    
-    max_iterations = 1000
-    iteration = 0
-    
-    while iteration < max_iterations:
-        # Reset for this iteration
+    if start in goals:
+        yield EXPAND, start
+        yield PATH, [start]
+        return
+
+    threshold = h(start)
+    while threshold < INFINITY:
+        # Same loop as _bounded_search
+        yield BOUND, threshold
+        best_g = {start: 0} if table_size else None
+        next_threshold = INFINITY
         path = [start]
-        visited_this_iteration = set([start])
-        
-        # Generator version of DFS
-        search_gen = dfs_limited_generator(grid, start, 0, threshold, path, goals, visited_this_iteration, all_visited)
-        
-        result = None
-        min_next_threshold = float('inf')
-        
-        try:
-            while True:
-                state = next(search_gen)
-                
-                if 'result' in state:
-                    result = state['result']
-                    if result == "FOUND":
-                        # Found solution
-                        yield {
-                            'visited': all_visited,
-                            'frontier': [],
-                            'path': path,
-                            'current_bound': threshold
-                        }
-                        return
-                    elif result != float('inf'):
-                        min_next_threshold = min(min_next_threshold, result)
-                else:
-                    # Regular visualization state
-                    yield {
-                        'visited': all_visited,
-                        'frontier': state.get('frontier', []),
-                        'current_bound': threshold
-                    }
-        except StopIteration:
-            pass
-        
-        if min_next_threshold == float('inf'):
-            # No solution
-            yield {
-                'visited': all_visited,
-                'frontier': [],
-                'message': 'No solution found'
-            }
-            return
-        
-        # Update threshold
-        old_threshold = threshold
-        threshold = min_next_threshold
-        
-        yield {
-            'visited': all_visited,
-            'frontier': [],
-            'message': f'Increasing threshold from {old_threshold} to {threshold}'
-        }
-        
-        iteration += 1
-    
-    # Max iterations reached
-    yield {
-        'visited': all_visited,
-        'frontier': [],
-        'message': 'Maximum iterations reached'
-    }
+        on_path[start] = 1
+        yield PUSH, start
+        yield EXPAND, start
+        stack = [iter(steps[neighbor_mask[start]])]
 
-def dfs_limited_generator(grid, node, g_cost, threshold, path, goals, visited_this_iteration, all_visited):
-    """
-    Generator version of depth-limited DFS
-    """
-    # Calculate f = g + h
-    h_cost = heuristic_manhattan(node, goals)
-    f_cost = g_cost + h_cost
-    
-    # Add to visited
-    all_visited.add(node)
-    
-    # Yield current state for visualization
-    yield {
-        'frontier': path.copy(),
-        'visited': all_visited.copy()
-    }
-    
-    # If f exceeds threshold, return f
-    if f_cost > threshold:
-        yield {'result': f_cost}
-        return
-    
-    # Check if goal reached
-    if node in goals:
-        yield {'result': "FOUND"}
-        return
-    
-    # Explore neighbors
-    min_next_threshold = float('inf')
-    directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
-    
-    for dx, dy in directions:
-        x, y = node
-        neighbor = (x + dx, y + dy)
-        
-        # Skip invalid positions
-        if (not grid.is_valid_position(neighbor) or 
-            neighbor in path):
-            continue
-        
-        # Add to path
-        path.append(neighbor)
-        visited_this_iteration.add(neighbor)
-        
-        # Recursive generator call
-        neighbor_gen = dfs_limited_generator(grid, neighbor, g_cost + 1, threshold, path, goals, visited_this_iteration, all_visited)
-        
-        try:
-            while True:
-                state = next(neighbor_gen)
-                if 'result' in state:
-                    result = state['result']
-                    if result == "FOUND":
-                        yield {'result': "FOUND"}
-                        return
-                    elif result != float('inf'):
-                        min_next_threshold = min(min_next_threshold, result)
-                else:
-                    yield state
-        except StopIteration:
-            pass
-        
-        # Backtrack
-        path.pop()
-    
-    # Return minimum threshold found
-    yield {'result': min_next_threshold}
\ No newline at end of file
+        while stack:
+            step = next(stack[-1], None)
+            if step is None:
+                cell = path.pop()
+                on_path[cell] = 0
+                stack.pop()
+                yield POP, cell
+                continue
+
+            neighbor = path[-1] + step[1]
+            if on_path[neighbor]:
+                continue
+            g = len(path)
+            f = g + h(neighbor)
+            if f > threshold:
+                next_threshold = min(next_threshold, f)
+                continue
+            if best_g is not None:
+                seen = best_g.get(neighbor)
+                if seen is not None and seen <= g:
+                    continue
+                if seen is not None or len(best_g) < table_size:
+                    best_g[neighbor] = g
+
+            path.append(neighbor)
+            yield PUSH, neighbor
+            if neighbor in goals:
+                yield PATH, path
+                return
+            on_path[neighbor] = 1
+            stack.append(iter(steps[neighbor_mask[neighbor]]))
+            yield EXPAND, neighbor
+
+        threshold = next_threshold
@@ -1,142 +1,126 @@
-def ids(grid, as_generator=False):
-    # If as_generator is False, run through the algorithm to completion
+"""
+Iterative deepening search.
+
+Each iteration is a depth-limited DFS that remembers the smallest depth
+every cell was reached at during that iteration (a transposition table). A
+cell reached again at the same or a greater depth is not expanded again, so
+an iteration costs about one pass over the cells within the limit instead of
+one pass per path to them. Every cell ends up at its shortest depth, so the
+goal is first found in the iteration equal to its BFS distance and the path
+returned is a shortest one.
+
+Iterations stop after max_depth when a bound is given. Without one they stop
+once an iteration ends without the depth limit cutting anything off: the
+whole reachable area has been searched and no goal is in it.
+"""
+from .cells import endpoints, goal_cells, reconstruct_path, path_positions
+from .events import EXPAND, PUSH, POP, BOUND, PATH, position_events
+
+def ids(grid, as_generator=False, start=None, goals=None, max_depth=None):
+    start, goals = endpoints(grid, start, goals)
+    # If as_generator is False, run the lean search without visualization states
     if not as_generator:
-        # Create a generator
-        generator = _ids_generator(grid)
-        # Run it to completion
-        final_state = None
-        for state in generator:
-            final_state = state
-        
-        # Check if a path was found
-        if final_state and 'path' in final_state:
-            return final_state['path'], len(final_state['visited'])
-        else:
-            return [], len(final_state['visited']) if final_state else 0
-    
+        path, nodes_expanded = _ids_search(grid, start, goals, max_depth)
+        return path_positions(grid, path), nodes_expanded
+
     # If as_generator is True, return the generator directly
-    return _ids_generator(grid)
-
-def _ids_generator(grid):
-    start = grid.start_position
-    goals = set(grid.goal_positions)
-    
-    # Calculate a reasonable upper limit for max depth
-    # Use Manhattan distance from start to the farthest goal as a heuristic
-    max_depth = 0
-    for goal in goals:
-        manhattan_dist = abs(start[0] - goal[0]) + abs(start[1] - goal[1])
-        max_depth = max(max_depth, manhattan_dist)
-    
-    # Add some buffer to account for walls/obstacles
-    max_depth = max_depth * 2
-    
-    # Track overall visited nodes across all depth iterations
+    return position_events(grid, _ids_generator(grid, start, goals, max_depth))
+
+def _depth_limits(max_depth):
+    depth_limit = 0
+    while max_depth is None or depth_limit <= max_depth:
+        yield depth_limit
+        depth_limit += 1
+
+def _depth_limited_search(grid, start, goals, depth_limit, all_visited):
+    """
+    One depth-limited DFS from start. Returns (goal, parent, cut_off), where
+    goal is the goal cell reached or None and cut_off tells whether the
+    depth limit kept any cell from being reached.
+    """
+    neighbor_mask = grid.neighbor_mask
+    # Push UP, LEFT, DOWN, RIGHT so RIGHT is popped first
+    reversed_steps = grid.direction_table((3, 2, 1, 0))
+
+    stack = [(start, 0)]
+    depth = {start: 0}  # Smallest depth each cell was reached at in this iteration
+    parent = {start: None}
+    cut_off = False
+
+    while stack:
+        current, current_depth = stack.pop()
+        if depth[current] < current_depth:
+            continue  # Reached at a smaller depth after this entry was pushed
+        all_visited.add(current)
+        if current in goals:
+            return current, parent, cut_off
+
+        next_depth = current_depth + 1
+        for _, offset in reversed_steps[neighbor_mask[current]]:
+            neighbor = current + offset
+            if next_depth < depth.get(neighbor, next_depth + 1):
+                if next_depth > depth_limit:
+                    cut_off = True
+                    continue
+                depth[neighbor] = next_depth
+                parent[neighbor] = current
+                stack.append((neighbor, next_depth))
+
+    return None, parent, cut_off
+
+def _ids_search(grid, start_position, goal_positions, max_depth=None):
+    """Same search as _ids_generator without the per-step states. Returns (path, nodes_expanded)."""
+    start = grid.cell_id(start_position)
+    goals = goal_cells(grid, goal_positions)
     all_visited = set()
-    
-    # Precalculate the directions once
-    directions = [(1, 0), (0, 1), (-1, 0), (0, -1)]  # RIGHT, DOWN, LEFT, UP
-    
-    # Try increasing depth limits
-    for depth_limit in range(max_depth + 1):  # +1 to include max_depth
-        # Reset visited set for this depth iteration
-        visited = set()
-        
-        # For visualization purposes - use a list for frontier to make ordering consistent
-        frontier = []
-        frontier_set = set()  # For O(1) lookups
-        
-        # DLS - Depth Limited Search
-        stack = [(start, 0)]  # (position, depth)
-        frontier.append(start)
-        frontier_set.add(start)
-        
-        # Track parents for path reconstruction
+
+    for depth_limit in _depth_limits(max_depth):
+        goal, parent, cut_off = _depth_limited_search(grid, start, goals, depth_limit, all_visited)
+        if goal is not None:
+            return reconstruct_path(parent, goal), len(all_visited)
+        if not cut_off:
+            break
+
+    return [], len(all_visited)
+
+def _ids_generator(grid, start_position, goal_positions, max_depth=None):
+    start = grid.cell_id(start_position)
+    goals = goal_cells(grid, goal_positions)
+    neighbor_mask = grid.neighbor_mask
+    reversed_steps = grid.direction_table((3, 2, 1, 0))
+
+    for depth_limit in _depth_limits(max_depth):
+        # Same depth-limited DFS as _depth_limited_search, with events
+        yield BOUND, depth_limit
+        stack = [(start, 0)]
+        depth = {start: 0}
         parent = {start: None}
-        
-        # Make visualization more responsive
-        yield_frequency = 5  # Reduced for more frequent updates
-        
-        found_solution = False
-        
-        while stack and not found_solution:
-            current, depth = stack.pop()
-            
-            # Update frontier visualization
-            if current in frontier_set:
-                frontier_set.remove(current)
-                # Finding the item in a list is O(n), but frontier should be fairly small
-                if current in frontier:
-                    frontier.remove(current)
-            
-            # Skip if already visited in this depth-limited search
-            if current in visited:
-                # Still yield periodically for visualization
-                if len(visited) % yield_frequency == 0:
-                    yield {'visited': all_visited, 'frontier': frontier}
+        cut_off = False
+        yield PUSH, start
+
+        while stack:
+            current, current_depth = stack.pop()
+            yield POP, current
+            if depth[current] < current_depth:
                 continue
-                
-            visited.add(current)
-            all_visited.add(current)
-            
-            # If reached a goal, reconstruct path
+            yield EXPAND, current
+
             if current in goals:
-                path = []
-                while current:
-                    path.append(current)
-                    current = parent.get(current)
-                path.reverse()
-                
-                yield {'visited': all_visited, 'frontier': frontier, 'path': path}
-                found_solution = True
-                break
-            
-            # Yield state more frequently for smoother visualization
-            if len(visited) % yield_frequency == 0:
-                yield {'visited': all_visited, 'frontier': frontier}
-            
-            # If at depth limit, don't explore further
-            if depth >= depth_limit:
-                continue
-            
-            # Get valid neighbors
-            x, y = current
-            neighbors = []
-            
-            for dx, dy in directions:
-                neighbor = (x + dx, y + dy)
-                if grid.is_valid_position(neighbor) and neighbor not in visited:
-                    neighbors.append(neighbor)
-            
-            # For DFS-like behavior, add neighbors in reverse order
-            for neighbor in reversed(neighbors):
-                # Only add to stack if unvisited or would create a shorter path
-                if neighbor not in parent or depth + 1 < get_depth(parent, neighbor):
+                yield PATH, reconstruct_path(parent, current)
+                return
+
+            next_depth = current_depth + 1
+            for _, offset in reversed_steps[neighbor_mask[current]]:
+                neighbor = current + offset
+                if next_depth < depth.get(neighbor, next_depth + 1):
+                    if next_depth > depth_limit:
+                        cut_off = True
+                        continue
+                    depth[neighbor] = next_depth
                     parent[neighbor] = current
-                    stack.append((neighbor, depth + 1))
-                    
-                    # Only add to frontier if not already there
-                    if neighbor not in frontier_set:
-                        frontier.append(neighbor)
-                        frontier_set.add(neighbor)
-        
-        # Don't continue if solution found
-        if found_solution:
-            break
-            
-        # No solution found at this depth, try next depth
-        # Yield current state before moving to next depth
-        if not found_solution:
-            yield {'visited': all_visited, 'frontier': frontier}
-    
-    # No path found within max depth
-    if not found_solution:
-        yield {'visited': all_visited, 'frontier': []}
-
-def get_depth(parent_dict, node):
-    depth = 0
-    current = node
-    while current in parent_dict and parent_dict[current] is not None:
-        depth += 1
-        current = parent_dict[current]
-    return depth
\ No newline at end of file
+                    stack.append((neighbor, next_depth))
+                    yield PUSH, neighbor
+
+        # Without a cut off the whole reachable area was searched
+        if not cut_off:
+            return
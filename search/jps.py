@@ -0,0 +1,186 @@
+"""
+Jump Point Search for 4-connected uniform-cost grids.
+
+Instead of pushing every neighbour, JPS jumps in a straight line until it
+reaches a cell where the path could turn (a jump point) and only pushes
+those. Symmetric paths through open space collapse into a few jump points,
+so far fewer nodes are expanded than in A* while path lengths stay optimal.
+
+Pruning rules for moves without diagonals:
+- moving horizontally, stop where a cell above or below becomes open while
+  the cell behind it was blocked (a forced neighbour);
+- moving vertically, stop on the same condition to the left and right, and
+  also where a horizontal jump from the current cell finds a jump point.
+From a jump point, horizontal arrivals continue forwards, up and down, and
+vertical arrivals continue forwards, left and right.
+"""
+import heapq
+from .heuristics import manhattan_to
+from .cells import endpoints, goal_cells, path_positions
+from .events import EXPAND, PUSH, POP, PATH, position_events
+
+def jps(grid, as_generator=False, start=None, goals=None):
+    start, goals = endpoints(grid, start, goals)
+    if not as_generator:
+        path, nodes_expanded = _jps_search(grid, start, goals)
+        return path_positions(grid, path), nodes_expanded
+    return position_events(grid, _jps_generator(grid, start, goals))
+
+def _jump_rules(grid, goals):
+    """The jump and successor_directions functions for a grid and set of goal cells."""
+    width, height, walls = grid.width, grid.height, grid.walls
+
+    def walkable(x, y):
+        return 0 <= x < width and 0 <= y < height and not walls[y * width + x]
+
+    def jump(x, y, dx, dy):
+        """Walk from (x, y) in direction (dx, dy); return the first jump point or None."""
+        while True:
+            if not walkable(x, y):
+                return None
+            if y * width + x in goals:
+                return (x, y)
+            if dx != 0:
+                if ((walkable(x, y - 1) and not walkable(x - dx, y - 1)) or
+                        (walkable(x, y + 1) and not walkable(x - dx, y + 1))):
+                    return (x, y)
+            else:
+                if ((walkable(x - 1, y) and not walkable(x - 1, y - dy)) or
+                        (walkable(x + 1, y) and not walkable(x + 1, y - dy))):
+                    return (x, y)
+                # When moving vertically, stop where a horizontal jump would find something
+                if jump(x + 1, y, 1, 0) is not None or jump(x - 1, y, -1, 0) is not None:
+                    return (x, y)
+            x += dx
+            y += dy
+
+    def successor_directions(x, y, parent):
+        """Directions to jump in from (x, y), pruned by the direction of arrival."""
+        if parent is None:
+            return [(1, 0), (0, 1), (-1, 0), (0, -1)]  # RIGHT, DOWN, LEFT, UP
+        px, py = parent % width, parent // width
+        dx = (x > px) - (x < px)
+        dy = (y > py) - (y < py)
+        if dx != 0:
+            return [(dx, 0), (0, 1), (0, -1)]
+        return [(0, dy), (1, 0), (-1, 0)]
+
+    return jump, successor_directions
+
+def _jps_search(grid, start_position, goal_positions):
+    """Same search as _jps_generator without the per-step states. Returns (path, nodes_expanded)."""
+    if not goal_positions:
+        return [], 0
+
+    width = grid.width
+    goals = goal_cells(grid, goal_positions)
+    jump, successor_directions = _jump_rules(grid, goals)
+    heuristic = manhattan_to(goal_positions)
+    heappush, heappop = heapq.heappush, heapq.heappop
+
+    start = grid.cell_id(start_position)
+    visited = set()
+    parent = {start: None}
+    g_score = {start: 0}
+    h_score = heuristic(*start_position)
+    heap = [(h_score, h_score, 0, start)]
+    seq = 1
+
+    while heap:
+        current = heappop(heap)[3]
+        if current in visited:
+            continue
+        visited.add(current)
+        if current in goals:
+            return _expand_path(parent, current, width), len(visited)
+
+        y, x = divmod(current, width)
+        current_g = g_score[current]
+        for dx, dy in successor_directions(x, y, parent[current]):
+            point = jump(x + dx, y + dy, dx, dy)
+            if point is None:
+                continue
+            jx, jy = point
+            neighbor = jy * width + jx
+            if neighbor in visited:
+                continue
+            tentative_g = current_g + abs(jx - x) + abs(jy - y)
+            if neighbor not in g_score or tentative_g < g_score[neighbor]:
+                parent[neighbor] = current
+                g_score[neighbor] = tentative_g
+                new_h = heuristic(jx, jy)
+                heappush(heap, (tentative_g + new_h, new_h, seq, neighbor))
+                seq += 1
+
+    return [], len(visited)
+
+def _jps_generator(grid, start_position, goal_positions):
+    if not goal_positions:
+        return
+
+    width = grid.width
+    goals = goal_cells(grid, goal_positions)
+    jump, successor_directions = _jump_rules(grid, goals)
+    heuristic = manhattan_to(goal_positions)
+
+    start = grid.cell_id(start_position)
+    visited = set()
+    parent = {start: None}
+    g_score = {start: 0}
+    seq = 0  # Sequence number for tie-breaking
+
+    h_score = heuristic(*start_position)
+    heap = [(h_score, (h_score, seq), start)]
+    yield PUSH, start
+    seq += 1
+
+    while heap:
+        f, _, current = heapq.heappop(heap)
+        yield POP, current
+        if current in visited:
+            continue
+        visited.add(current)
+        yield EXPAND, current
+
+        if current in goals:
+            yield PATH, _expand_path(parent, current, width)
+            return
+
+        x, y = current % width, current // width
+        current_g = g_score[current]
+        for dx, dy in successor_directions(x, y, parent[current]):
+            point = jump(x + dx, y + dy, dx, dy)
+            if point is None:
+                continue
+            jx, jy = point
+            neighbor = jy * width + jx
+            if neighbor in visited:
+                continue
+            tentative_g = current_g + abs(jx - x) + abs(jy - y)
+            if neighbor not in g_score or tentative_g < g_score[neighbor]:
+                parent[neighbor] = current
+                g_score[neighbor] = tentative_g
+                new_h = heuristic(jx, jy)
+                heapq.heappush(heap, (tentative_g + new_h, (new_h, seq), neighbor))
+                yield PUSH, neighbor
+                seq += 1
+
+def _expand_path(parent, cell, width):
+    """Fill in the straight runs between consecutive jump points."""
+    jump_points = []
+    while cell is not None:
+        jump_points.append(cell)
+        cell = parent[cell]
+    jump_points.reverse()
+
+    path = [jump_points[0]]
+    for target in jump_points[1:]:
+        current = path[-1]
+        if target // width == current // width:
+            step = 1 if target > current else -1
+        else:
+            step = width if target > current else -width
+        while current != target:
+            current += step
+            path.append(current)
+    return path
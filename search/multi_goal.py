@@ -0,0 +1,91 @@
+"""
+One-to-many search: a single expansion from the start that keeps running
+until every goal has been settled.
+
+BFS and DFS expand cells in an order that does not depend on the goal, so
+the shared search tree gives each goal exactly the path and node count a
+separate search for that goal would report.
+"""
+from collections import deque
+from .cells import endpoints, reconstruct_path, path_positions
+
+# Methods whose expansion order is independent of the goal
+MULTI_GOAL_METHODS = ('bfs', 'dfs')
+
+
+def _bfs_order(grid, start):
+    """Yield cells in BFS expansion order, with the parent map being built."""
+    frontier = deque([start])
+    parent = {start: None}
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+
+    while frontier:
+        current = frontier.popleft()
+        yield current, parent
+
+        # Process neighbors in RIGHT, DOWN, LEFT, UP order
+        for _, offset in neighbor_steps[neighbor_mask[current]]:
+            neighbor = current + offset
+            if neighbor not in parent:
+                parent[neighbor] = current
+                frontier.append(neighbor)
+
+
+def _dfs_order(grid, start):
+    """Yield cells in DFS expansion order, with the parent map being built."""
+    frontier = [start]
+    parent = {start: None}
+    visited = set()
+    neighbor_mask = grid.neighbor_mask
+    # Push UP, LEFT, DOWN, RIGHT so RIGHT is popped first
+    reversed_steps = grid.direction_table((3, 2, 1, 0))
+
+    while frontier:
+        current = frontier.pop()
+        if current in visited:
+            continue
+        visited.add(current)
+        yield current, parent
+
+        for _, offset in reversed_steps[neighbor_mask[current]]:
+            neighbor = current + offset
+            if neighbor not in parent:
+                parent[neighbor] = current
+                frontier.append(neighbor)
+
+
+def multi_goal_search(grid, method, goals=None, start=None):
+    """
+    Search from start (default grid.start_position) until every goal is settled.
+
+    Returns a list of (path, nodes_expanded) in the order of goals (default
+    grid.goal_positions). Unreachable goals get an empty path and the number
+    of cells expanded before the search ran out.
+    """
+    if method not in MULTI_GOAL_METHODS:
+        raise ValueError(f"Multi-goal search is not supported for '{method}'")
+    start, goals = endpoints(grid, start, goals)
+
+    # Goal cell -> indices into goals (the same cell may be listed twice)
+    pending = {}
+    for idx, goal in enumerate(goals):
+        if grid.in_bounds(goal):
+            pending.setdefault(grid.cell_id(goal), []).append(idx)
+
+    results = [None] * len(goals)
+    order = _bfs_order if method == 'bfs' else _dfs_order
+    expanded = 0
+    for cell, parent in order(grid, grid.cell_id(start)):
+        expanded += 1
+        if cell in pending:
+            path = path_positions(grid, reconstruct_path(parent, cell))
+            for idx in pending.pop(cell):
+                results[idx] = (path, expanded)
+            if not pending:
+                break
+
+    for idx, result in enumerate(results):
+        if result is None:
+            results[idx] = ([], expanded)
+    return results
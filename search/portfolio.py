@@ -0,0 +1,145 @@
+"""
+Portfolio search: race several methods on the same query and keep the
+first answer.
+
+Which method is fastest depends on the map (GBFS on open floors, BFS or
+IDA* on mazes), so instead of choosing one per map the portfolio starts
+every candidate in its own process, takes the first result that arrives,
+terminates the others and logs which method won. With optimal=True only
+methods that always return a shortest path are raced, so the first answer
+is also a shortest one. Some methods only search for the first goal (see
+FIRST_GOAL_METHODS) while the rest look for the nearest, so with more than
+one goal those are left out of the race: every runner answers the same
+question.
+
+Every candidate is complete, so an empty path is an answer as well: the
+goal is unreachable. A candidate that raises is ignored unless all of them
+do. The grid reaches the workers without copying (see Grid.shared).
+"""
+import logging
+import multiprocessing
+import time
+from collections import namedtuple
+from multiprocessing.connection import wait
+
+from .cells import endpoints
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CANDIDATES = ('bfs', 'dfs', 'gbfs', 'as', 'ids', 'ida_star')
+
+# Methods whose paths are always shortest ones
+OPTIMAL_METHODS = ('bfs', 'as', 'ids', 'ida_star', 'bi_bfs', 'bi_as', 'jps', 'df', 'wave', 'dstar')
+
+# Methods that search for goals[0] only, not the nearest goal
+FIRST_GOAL_METHODS = ('as', 'was', 'ara', 'df', 'hpa')
+
+RaceResult = namedtuple('RaceResult', ['method', 'path', 'nodes_expanded', 'elapsed'])
+
+
+def _race_worker(connection, grid, method, start, goals, options):
+    # Imported here since the method table itself lists the portfolio
+    from . import SEARCH_METHODS
+    started = time.perf_counter()
+    try:
+        path, nodes = SEARCH_METHODS[method](grid, as_generator=False, start=start, goals=goals,
+                                             **options.get(method, {}))
+        connection.send(RaceResult(method, path, nodes, time.perf_counter() - started))
+    except Exception as e:
+        connection.send(e)
+    finally:
+        connection.close()
+
+
+def race(grid, candidates=DEFAULT_CANDIDATES, start=None, goals=None, optimal=False, deadline=None,
+         options=None):
+    """
+    Run the candidate methods in parallel and return the RaceResult of the
+    first to finish, or None if none finished within deadline seconds.
+    options maps a method name to extra keyword options for it. With more
+    than one goal the FIRST_GOAL_METHODS are not raced.
+    """
+    from . import SEARCH_METHODS
+    unknown = [method for method in candidates if method not in SEARCH_METHODS or method == 'portfolio']
+    if unknown:
+        raise ValueError(f"Unknown portfolio method(s): {', '.join(unknown)}")
+    start, goals = endpoints(grid, start, goals)
+    if optimal:
+        candidates = [method for method in candidates if method in OPTIMAL_METHODS]
+    if len(goals) > 1:
+        skipped = [method for method in candidates if method in FIRST_GOAL_METHODS]
+        if skipped:
+            logger.info("portfolio: not racing %s, which only search for the first goal", ', '.join(skipped))
+            candidates = [method for method in candidates if method not in FIRST_GOAL_METHODS]
+    if not candidates:
+        raise ValueError("No portfolio methods to race")
+    options = options or {}
+    stop_at = time.perf_counter() + deadline if deadline is not None else None
+
+    with grid.shared():
+        running = {}
+        for method in candidates:
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_race_worker,
+                                              args=(sender, grid, method, start, goals, options), daemon=True)
+            process.start()
+            sender.close()
+            running[receiver] = (method, process)
+
+        winner = None
+        errors = []
+        try:
+            while running and winner is None:
+                timeout = None if stop_at is None else max(stop_at - time.perf_counter(), 0)
+                ready = wait(list(running), timeout)
+                if not ready:
+                    break  # Out of time
+                for receiver in ready:
+                    method, process = running.pop(receiver)
+                    try:
+                        result = receiver.recv()
+                    except EOFError:
+                        result = RuntimeError(f"{method} exited without a result")
+                    process.join()
+                    if isinstance(result, Exception):
+                        logger.info("portfolio: %s failed: %s", method, result)
+                        errors.append(result)
+                    elif winner is None:
+                        winner = result
+        finally:
+            for _, process in running.values():
+                process.terminate()
+            for _, process in running.values():
+                process.join()
+
+    cancelled = ', '.join(method for method, _ in running.values()) or 'none'
+    if winner is not None:
+        logger.info("portfolio: %s won in %.1f ms (cancelled: %s)", winner.method, winner.elapsed * 1000, cancelled)
+    elif running:
+        logger.warning("portfolio: no method finished within %.3f s (cancelled: %s)", deadline, cancelled)
+    elif errors:
+        raise errors[0]
+    return winner
+
+
+def portfolio(grid, as_generator=False, start=None, goals=None, candidates=DEFAULT_CANDIDATES,
+              optimal=False, deadline=None, frontier=None, heuristic=None):
+    """
+    Race the candidate methods and return the winner's (path, nodes_expanded).
+    Returns no path if none finished within deadline seconds. frontier and
+    heuristic, when given, go to the candidates that take them.
+    """
+    if as_generator:
+        raise ValueError("The portfolio has no step-by-step view")
+    from . import METHOD_OPTIONS
+    given = {'frontier': frontier, 'heuristic': heuristic}
+    options = {}
+    for method in candidates:
+        taken = {name: value for name, value in given.items()
+                 if value is not None and name in METHOD_OPTIONS.get(method, ())}
+        if taken:
+            options[method] = taken
+    result = race(grid, candidates, start, goals, optimal, deadline, options)
+    if result is None:
+        return [], 0
+    return result.path, result.nodes_expanded
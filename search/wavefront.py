@@ -0,0 +1,136 @@
+"""
+Wavefront BFS: breadth-first search one whole layer at a time.
+
+Each step takes every cell of the current layer, gathers their open
+neighbours through the grid's neighbour masks, keeps the ones without a
+distance yet and gives them the next layer number. Once a goal gets a
+distance, the path is rebuilt by walking back from it through cells whose
+layer is one lower each step.
+
+With NumPy installed the layer step is a handful of array operations over
+the whole frontier (kept as an array of cell ids, so a layer costs its own
+size rather than the grid's area), which removes the per-cell Python loop
+on very large grids. Without NumPy, or with engine='python', the same
+layers are computed in plain Python. Both engines return the same paths and
+node counts; the path has the same length as bfs's, though it may take a
+different route among equally short ones.
+
+Nodes expanded are the cells of the layers before the goal's, plus the goal.
+"""
+from array import array
+
+from grid import DIRECTIONS
+from .cells import endpoints, goal_cells
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ENGINES = ('numpy', 'python')
+
+
+def wavefront_bfs(grid, as_generator=False, start=None, goals=None, engine=None):
+    """
+    BFS from start to the nearest goal by whole layers. engine is 'numpy',
+    'python' or None for NumPy when it is installed.
+    """
+    if as_generator:
+        raise ValueError("Wavefront BFS has no step-by-step view")
+    if engine is None:
+        engine = 'numpy' if np is not None else 'python'
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', use one of: {', '.join(ENGINES)}")
+    if engine == 'numpy' and np is None:
+        raise ValueError("The numpy engine needs NumPy installed")
+
+    start, goals = endpoints(grid, start, goals)
+    start = grid.cell_id(start)
+    goals = goal_cells(grid, goals)
+    if start in goals:
+        return [grid.cell_position(start)], 1
+
+    layers = _numpy_layers if engine == 'numpy' else _python_layers
+    distances, goal, expanded = layers(grid, start, goals)
+    if goal is None:
+        return [], expanded
+    path = _descend(grid, distances, goal)
+    return [grid.cell_position(cell) for cell in path], expanded + 1
+
+
+def _python_layers(grid, start, goals):
+    """Layer numbers per cell id, the goal reached (or None) and the cells expanded."""
+    distances = array('i', [-1]) * (grid.width * grid.height)
+    distances[start] = 0
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+
+    frontier = [start]
+    layer = 0
+    expanded = 0
+    while frontier:
+        expanded += len(frontier)
+        layer += 1
+        next_frontier = []
+        for cell in frontier:
+            for _, offset in neighbor_steps[neighbor_mask[cell]]:
+                neighbor = cell + offset
+                if distances[neighbor] < 0:
+                    distances[neighbor] = layer
+                    next_frontier.append(neighbor)
+        reached = [cell for cell in next_frontier if cell in goals]
+        if reached:
+            return distances, min(reached), expanded
+        frontier = next_frontier
+    return distances, None, expanded
+
+
+def _numpy_layers(grid, start, goals):
+    """Same as _python_layers with each layer done by array operations."""
+    cells = grid.width * grid.height
+    neighbor_mask = np.frombuffer(grid.neighbor_mask, dtype=np.uint8)
+    distances = np.full(cells, -1, dtype=np.int32)
+    distances[start] = 0
+    is_goal = np.zeros(cells, dtype=bool)
+    is_goal[list(goals)] = True
+
+    frontier = np.array([start], dtype=np.intp)
+    layer = 0
+    expanded = 0
+    while frontier.size:
+        expanded += frontier.size
+        layer += 1
+        masks = neighbor_mask[frontier]
+        candidates = np.concatenate([frontier[(masks & (1 << direction)) != 0] + offset
+                                     for direction, offset in enumerate(grid.offsets)])
+        candidates = candidates[distances[candidates] < 0]
+        # A cell reached from two sides appears twice: tag each entry with its
+        # index (the last write wins) and keep the entries that kept their tag
+        tags = -2 - np.arange(candidates.size, dtype=np.int32)
+        distances[candidates] = tags
+        candidates = candidates[distances[candidates] == tags]
+        distances[candidates] = layer
+        reached = candidates[is_goal[candidates]]
+        if reached.size:
+            return distances, int(reached.min()), expanded
+        frontier = candidates
+    return distances, None, expanded
+
+
+def _descend(grid, distances, goal):
+    """Cells from the start to the goal, stepping to a neighbour one layer lower each time."""
+    width, height = grid.width, grid.height
+    path = [goal]
+    current = goal
+    remaining = int(distances[goal])
+    while remaining > 0:
+        y, x = divmod(current, width)
+        for dx, dy in DIRECTIONS:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height and distances[ny * width + nx] == remaining - 1:
+                current = ny * width + nx
+                break
+        path.append(current)
+        remaining -= 1
+    path.reverse()
+    return path
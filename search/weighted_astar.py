@@ -0,0 +1,216 @@
+"""
+Weighted A* and its anytime form, ARA*.
+
+Weighted A* orders the frontier by f = g + w * h with a weight w >= 1. The
+inflated heuristic pulls the search towards the goal, so it expands far
+fewer cells than A*, and the path it returns is at most w times longer than
+the shortest one.
+
+ARA* (anytime repairing A*) starts the same way and then keeps improving
+its path: each pass lowers the weight by weight_step and repairs the
+previous search instead of starting over. g-values and parents are kept,
+cells that got a cheaper g after being expanded are queued again, and the
+remaining frontier is reordered under the new weight. The pass with weight 1
+ends with a shortest path. The search stops early when the deadline (in
+seconds) or the budget of expansions runs out, returning the best path
+found so far, or no path if the first pass did not finish.
+
+Weights are applied as fractions p/q (denominator at most 100, so weights
+with up to two decimals are exact) and cells are queued on q * g + p * h,
+which orders them like g + w * h while keeping priorities integral for the
+bucket frontier.
+"""
+from fractions import Fraction
+from time import perf_counter
+
+from .heuristics import DEFAULT_HEURISTIC, make_heuristic
+from .cells import endpoints, reconstruct_path, path_positions
+from .events import EXPAND, PUSH, POP, BOUND, PATH, position_events
+from .frontier import DEFAULT_FRONTIER, make_frontier
+
+DEFAULT_WEIGHT = 2.0
+DEFAULT_WEIGHT_STEP = 0.5
+
+
+def weighted_astar(grid, as_generator=False, start=None, goals=None, weight=DEFAULT_WEIGHT,
+                   frontier=DEFAULT_FRONTIER, heuristic=DEFAULT_HEURISTIC):
+    start, goals = endpoints(grid, start, goals)
+    weights = [_scaled_weight(weight)]
+    if not as_generator:
+        path, nodes_expanded = _ara_search(grid, start, goals, weights, frontier=frontier, heuristic=heuristic)
+        return path_positions(grid, path), nodes_expanded
+    return position_events(grid, _ara_generator(grid, start, goals, weights, frontier=frontier,
+                                                heuristic=heuristic))
+
+
+def ara_star(grid, as_generator=False, start=None, goals=None, weight=DEFAULT_WEIGHT,
+             weight_step=DEFAULT_WEIGHT_STEP, deadline=None, max_nodes=None,
+             frontier=DEFAULT_FRONTIER, heuristic=DEFAULT_HEURISTIC):
+    start, goals = endpoints(grid, start, goals)
+    weights = _weight_schedule(weight, weight_step)
+    if not as_generator:
+        path, nodes_expanded = _ara_search(grid, start, goals, weights, deadline, max_nodes, frontier, heuristic)
+        return path_positions(grid, path), nodes_expanded
+    # The deadline also counts the time the consumer spends between events
+    return position_events(grid, _ara_generator(grid, start, goals, weights, deadline, max_nodes,
+                                                frontier, heuristic))
+
+
+def _scaled_weight(weight):
+    """(g_scale, h_scale) with h_scale / g_scale equal to the weight."""
+    fraction = Fraction(weight).limit_denominator(100)
+    if fraction < 1:
+        raise ValueError(f"Weight must be at least 1, got {weight}")
+    return fraction.denominator, fraction.numerator
+
+
+def _weight_schedule(weight, weight_step):
+    """Scaled weights from weight down to 1 in steps of weight_step."""
+    if weight_step <= 0:
+        raise ValueError(f"Weight step must be positive, got {weight_step}")
+    weights = [_scaled_weight(weight)]
+    while weights[-1][1] != weights[-1][0]:
+        weights.append(_scaled_weight(max(1, weights[-1][1] / weights[-1][0] - weight_step)))
+    return weights
+
+
+def _ara_search(grid, start_position, goal_positions, weights, deadline=None, max_nodes=None,
+                frontier=DEFAULT_FRONTIER, heuristic=DEFAULT_HEURISTIC):
+    """Same search as _ara_generator without the events. Returns (path, nodes_expanded)."""
+    current_goal = goal_positions[0] if goal_positions else None
+    if not current_goal:
+        return [], 0
+
+    goal_cell = grid.cell_id(current_goal) if grid.in_bounds(current_goal) else None
+    start = grid.cell_id(start_position)
+    h = make_heuristic(heuristic, grid, [current_goal])
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+    stop_at = perf_counter() + deadline if deadline is not None else None
+
+    open_cells = make_frontier(frontier)
+    push, pop = open_cells.push, open_cells.pop
+    parent = {start: None}
+    g_score = {start: 0}
+    expanded = set()
+    expansions = 0
+    best_path = []
+    # Cells to queue at the start of the next pass
+    inconsistent = {start: None}
+
+    for g_scale, h_scale in weights:
+        # Reorder the frontier under the new weight, adding the inconsistent cells
+        while open_cells:
+            inconsistent[pop()[0]] = None
+        for cell in inconsistent:
+            cell_h = h(cell)
+            push(cell, g_score[cell] * g_scale + cell_h * h_scale, cell_h)
+        inconsistent = {}
+        closed = set()
+
+        while open_cells:
+            current, (priority, tie) = pop()
+            goal_g = g_score.get(goal_cell)
+            if goal_g is not None and priority >= goal_g * g_scale:
+                # Nothing left on the frontier can improve the path to the goal
+                if current == goal_cell:
+                    expanded.add(current)
+                else:
+                    push(current, priority, tie)
+                break
+            if ((stop_at is not None and perf_counter() > stop_at) or
+                    (max_nodes is not None and expansions >= max_nodes)):
+                return best_path, len(expanded)
+            closed.add(current)
+            expanded.add(current)
+            expansions += 1
+
+            tentative_g = g_score[current] + 1
+            for _, offset in neighbor_steps[neighbor_mask[current]]:
+                neighbor = current + offset
+                if tentative_g < g_score.get(neighbor, tentative_g + 1):
+                    parent[neighbor] = current
+                    g_score[neighbor] = tentative_g
+                    if neighbor in closed:
+                        inconsistent[neighbor] = None
+                    else:
+                        new_h = h(neighbor)
+                        push(neighbor, tentative_g * g_scale + new_h * h_scale, new_h)
+
+        if goal_cell not in g_score:
+            return [], len(expanded)  # The frontier ran out: no path
+        best_path = reconstruct_path(parent, goal_cell)
+
+    return best_path, len(expanded)
+
+
+def _ara_generator(grid, start_position, goal_positions, weights, deadline=None, max_nodes=None,
+                   frontier=DEFAULT_FRONTIER, heuristic=DEFAULT_HEURISTIC):
+    current_goal = goal_positions[0] if goal_positions else None
+    if not current_goal:
+        return
+
+    goal_cell = grid.cell_id(current_goal) if grid.in_bounds(current_goal) else None
+    start = grid.cell_id(start_position)
+    h = make_heuristic(heuristic, grid, [current_goal])
+    neighbor_mask = grid.neighbor_mask
+    neighbor_steps = grid.neighbor_steps
+    stop_at = perf_counter() + deadline if deadline is not None else None
+
+    open_cells = make_frontier(frontier)
+    parent = {start: None}
+    g_score = {start: 0}
+    expansions = 0
+    best_path = None
+    inconsistent = {start: None}
+
+    for g_scale, h_scale in weights:
+        # Each pass starts by queueing the old frontier and the inconsistent cells again
+        yield BOUND, h_scale / g_scale
+        while open_cells:
+            inconsistent[open_cells.pop()[0]] = None
+        for cell in inconsistent:
+            cell_h = h(cell)
+            open_cells.push(cell, g_score[cell] * g_scale + cell_h * h_scale, cell_h)
+            yield PUSH, cell
+        inconsistent = {}
+        closed = set()
+
+        while open_cells:
+            current, (priority, tie) = open_cells.pop()
+            yield POP, current
+            goal_g = g_score.get(goal_cell)
+            if goal_g is not None and priority >= goal_g * g_scale:
+                if current == goal_cell:
+                    yield EXPAND, current
+                else:
+                    open_cells.push(current, priority, tie)
+                    yield PUSH, current
+                break
+            if ((stop_at is not None and perf_counter() > stop_at) or
+                    (max_nodes is not None and expansions >= max_nodes)):
+                if best_path is not None:
+                    yield PATH, best_path
+                return
+            closed.add(current)
+            expansions += 1
+            yield EXPAND, current
+
+            tentative_g = g_score[current] + 1
+            for _, offset in neighbor_steps[neighbor_mask[current]]:
+                neighbor = current + offset
+                if tentative_g < g_score.get(neighbor, tentative_g + 1):
+                    parent[neighbor] = current
+                    g_score[neighbor] = tentative_g
+                    if neighbor in closed:
+                        inconsistent[neighbor] = None
+                    else:
+                        new_h = h(neighbor)
+                        open_cells.push(neighbor, tentative_g * g_scale + new_h * h_scale, new_h)
+                        yield PUSH, neighbor
+
+        if goal_cell not in g_score:
+            return
+        best_path = reconstruct_path(parent, goal_cell)
+
+    yield PATH, best_path
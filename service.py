@@ -0,0 +1,519 @@
+"""
+Resident solver service.
+
+Starting Python and loading a map costs more than most queries, so this
+keeps both warm: an asyncio server answers JSON requests over HTTP on
+localhost (or on a Unix socket) and runs each query on a pool of worker
+processes. Every worker keeps the grids it loaded recently in a least
+recently used cache bounded by the size of their cell arrays and of what
+was built for them (distance fields, landmark tables, HPA's abstract
+graph), which goes with them, so repeated queries on the same map skip
+loading altogether. A map whose file changed is
+loaded again. Queries answered before come from the persistent result cache
+(see resultcache) unless the service runs with --no-cache or the request
+sets "cache": false.
+
+Usage:
+    python3 service.py [--host 127.0.0.1] [--port 8765] [--unix PATH] [--workers N] [--cache-mb 256]
+                       [--no-cache] [--map-dir DIR ...]
+
+Endpoints:
+    POST /solve     {"map": "maze_15x20.txt", "method": "as", "start": [x, y], "goals": [[x, y]],
+                     "per_goal": false, "cache": true, "options": {"heuristic": "manhattan"}}
+                    start and goals default to the map's own; options are the
+                    command line options of main.py (deadline in milliseconds).
+                    "map" names a file inside one of the map directories
+                    (--map-dir, default map/); nothing outside them is served
+    GET  /methods   the search methods and the options each accepts
+    GET  /health    status, uptime and queue depth
+    GET  /metrics   queue depth, grid cache hit rates and per-method counts and times
+
+    curl -s localhost:8765/solve -d '{"map": "small.txt", "method": "bfs"}'
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import time
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+
+from grid import Grid
+from main import method_options
+from resultcache import cacheable, cached_results, process_cache
+from search import SEARCH_METHODS, METHOD_OPTIONS
+from search.artifacts import artifact_cache
+from search.cells import path_to_moves
+from search.multi_goal import multi_goal_search, MULTI_GOAL_METHODS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_MB = 256
+
+# Largest request body accepted, in bytes
+MAX_BODY = 1 << 20
+
+# Directories requests may load maps from, unless the service is given others
+DEFAULT_MAP_DIRS = ('map',)
+
+# JSON types each method option accepts (see main.add_method_arguments)
+OPTION_TYPES = {
+    'max_depth': int,
+    'max_nodes': int,
+    'weight': (int, float),
+    'deadline': (int, float),
+    'frontier': str,
+    'heuristic': str,
+    'engine': str,
+    'candidates': list,
+    'optimal': bool,
+}
+
+
+class GridCache:
+    """
+    Grids by map file, least recently used first. The bound counts their
+    cell arrays and the artifacts built for their contents (distance fields,
+    landmark tables, HPA graphs; see search.artifacts), which are dropped
+    together with the last grid of those contents.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.grid_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Map path -> (file mtime and size, grid, bytes)
+        self._grids = OrderedDict()
+
+    @property
+    def artifact_bytes(self):
+        hashes = {grid.content_hash() for _, grid, _ in self._grids.values()}
+        return sum(artifact_cache.bytes_for(content_hash) for content_hash in hashes)
+
+    @property
+    def bytes(self):
+        return self.grid_bytes + self.artifact_bytes
+
+    def get(self, map_path):
+        """(grid, hit) for a map file, loading it again if the file changed since."""
+        stat = os.stat(map_path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        entry = self._grids.pop(map_path, None)
+        if entry is not None and entry[0] == stamp:
+            self._grids[map_path] = entry
+            self.hits += 1
+            return entry[1], True
+        if entry is not None:
+            self._forget(entry)
+
+        self.misses += 1
+        grid = Grid(map_path)
+        grid.content_hash()  # Keys the artifacts built for this map, such as HPA's graph
+        size = 2 * grid.width * grid.height  # Walls and neighbour masks
+        self._grids[map_path] = (stamp, grid, size)
+        self.grid_bytes += size
+        self.trim()
+        return grid, False
+
+    def trim(self):
+        """
+        Evict the least recently used grids and their artifacts until within
+        max_bytes. Queries build artifacts after get(), so this runs again
+        once they are done. The newest grid always stays, even if it alone
+        is over the limit.
+        """
+        while len(self._grids) > 1 and self.bytes > self.max_bytes:
+            _, entry = self._grids.popitem(last=False)
+            self._forget(entry)
+            self.evictions += 1
+
+    def _forget(self, entry):
+        _, grid, size = entry
+        self.grid_bytes -= size
+        content_hash = grid.content_hash()
+        if all(other.content_hash() != content_hash for _, other, _ in self._grids.values()):
+            artifact_cache.discard(content_hash)
+
+    def stats(self):
+        return {'entries': len(self._grids), 'bytes': self.bytes, 'artifact_bytes': self.artifact_bytes,
+                'evictions': self.evictions}
+
+
+# Grid cache of each worker process, set up by the pool initializer
+_worker_cache = None
+
+
+def _init_worker(max_bytes):
+    global _worker_cache
+    _worker_cache = GridCache(max_bytes)
+    # Forked from the event loop: drop its signal handlers and wakeup fd, or a
+    # SIGTERM to any process below this one (a cancelled portfolio candidate)
+    # would reach the loop as a SIGTERM to the service. Ctrl-C is the
+    # service's to handle.
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _solve_query(map_path, method, start, goals, per_goal, options, use_cache):
+    """
+    Run one /solve query in a worker, the way main.py would. Returns the
+    response body, whether the grid was cached, and the worker's cache stats.
+    """
+    started = time.perf_counter()
+    grid, hit = _worker_cache.get(map_path)
+    load_time = time.perf_counter() - started
+
+    start = tuple(start) if start is not None else grid.start_position
+    goals = [tuple(goal) for goal in goals] if goals is not None else list(grid.goal_positions)
+    for position in [start] + goals:
+        if not grid.in_bounds(position):
+            raise ValueError(f"Position {list(position)} is outside the {grid.width}x{grid.height} grid")
+
+    def solve(goals):
+        if method in MULTI_GOAL_METHODS and not per_goal:
+            return multi_goal_search(grid, method, goals, start)
+        search = SEARCH_METHODS[method]
+        return [search(grid, as_generator=False, start=start, goals=[goal], **options) for goal in goals]
+
+    started = time.perf_counter()
+    results_cache = process_cache() if use_cache else None
+    if results_cache is not None:
+        hits = results_cache.hits
+        results = list(cached_results(results_cache, grid, method, start, goals, options, solve))
+        cached = results_cache.hits - hits
+    else:
+        results = solve(goals)
+        cached = 0
+    search_time = time.perf_counter() - started
+
+    body = {
+        'start': start,
+        'results': [{'goal': goal, 'nodes_expanded': nodes, 'path_length': len(path) - 1 if path else None,
+                     'path': path, 'moves': path_to_moves(path)}
+                    for goal, (path, nodes) in zip(goals, results)],
+        'load_time': load_time,
+        'search_time': search_time,
+        'cache_hit': hit,
+        'cached': cached,
+    }
+    _worker_cache.trim()
+    return body, hit, os.getpid(), _worker_cache.stats()
+
+
+def _position(value, name):
+    if (not isinstance(value, (list, tuple)) or len(value) != 2 or
+            not all(isinstance(v, int) and not isinstance(v, bool) for v in value)):
+        raise ValueError(f"'{name}' must be an [x, y] pair of integers")
+    return tuple(value)
+
+
+def resolve_map(name, map_dirs=DEFAULT_MAP_DIRS):
+    """
+    Path of a requested map, taken as given or relative to one of map_dirs,
+    or None if there is no such file inside map_dirs. Links are followed
+    before checking, so neither '..' nor a link leads out of them.
+    """
+    roots = [os.path.realpath(directory) for directory in map_dirs]
+    for candidate in [name] + [os.path.join(directory, name) for directory in map_dirs]:
+        real = os.path.realpath(candidate)
+        if os.path.isfile(real) and any(os.path.commonpath([real, root]) == root for root in roots):
+            return candidate
+    return None
+
+
+def _check_options(options):
+    for name, value in options.items():
+        expected = OPTION_TYPES.get(name)
+        if expected is None:
+            continue
+        # JSON true and false are ints to Python
+        valid = isinstance(value, expected) and (expected is bool or not isinstance(value, bool))
+        if name == 'candidates':
+            valid = valid and all(isinstance(method, str) for method in value)
+        if not valid:
+            raise ValueError(f"Option '{name}' has the wrong type: {json.dumps(value)}")
+
+
+def parse_query(request, map_dirs=DEFAULT_MAP_DIRS):
+    """
+    Validate a /solve request body. Returns the arguments of _solve_query.
+    Raises ValueError for a bad request and LookupError for a map that is
+    not in map_dirs.
+    """
+    if not isinstance(request, dict):
+        raise ValueError("Expected a JSON object")
+    method = str(request.get('method', '')).lower()
+    if method not in SEARCH_METHODS:
+        raise ValueError(f"Unknown method '{method}', use one of: {', '.join(SEARCH_METHODS)}")
+    if not request.get('map'):
+        raise ValueError("Missing 'map'")
+    map_path = resolve_map(str(request['map']), map_dirs)
+    if map_path is None:
+        raise LookupError(f"Map '{request['map']}' not found")
+
+    start = _position(request['start'], 'start') if request.get('start') is not None else None
+    goals = request.get('goals')
+    if request.get('goal') is not None:
+        goals = [request['goal']]
+    if goals is not None:
+        if not isinstance(goals, list):
+            raise ValueError("'goals' must be a list of [x, y] pairs")
+        goals = [_position(goal, 'goals') for goal in goals]
+
+    options = request.get('options') or {}
+    if not isinstance(options, dict):
+        raise ValueError("'options' must be an object")
+    unknown = sorted(set(options) - set(METHOD_OPTIONS.get(method, ())))
+    if unknown:
+        raise ValueError(f"Option(s) {', '.join(unknown)} do not apply to {method}")
+    _check_options(options)
+    options = method_options(method, argparse.Namespace(**options))
+    use_cache = request.get('cache', True) is not False
+    return map_path, method, start, goals, bool(request.get('per_goal')), options, use_cache
+
+
+class SolverService:
+    def __init__(self, workers=None, cache_bytes=DEFAULT_CACHE_MB << 20, max_queue=None, use_cache=True,
+                 map_dirs=DEFAULT_MAP_DIRS):
+        self.workers = workers or os.cpu_count() or 1
+        # The only directories maps are served from
+        self.map_dirs = tuple(map_dirs)
+        self.cache_bytes = cache_bytes
+        # Whether queries may use the persistent result cache at all
+        self.use_cache = use_cache
+        # Queries allowed to wait for a worker before new ones are turned away
+        self.max_queue = max_queue if max_queue is not None else 64 * self.workers
+        self.pool = None
+        self.started = time.time()
+        self.waiting = 0
+        self.running = 0
+        self.responses = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.result_hits = 0
+        self.result_misses = 0
+        self.method_stats = defaultdict(lambda: {'queries': 0, 'errors': 0, 'search_time': 0.0, 'nodes_expanded': 0})
+        # Latest grid cache stats reported by each worker process
+        self.worker_caches = {}
+        self._slots = None
+
+    def start(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                        initargs=(self.cache_bytes,))
+        self._slots = asyncio.Semaphore(self.workers)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'uptime': time.time() - self.started,
+            'workers': self.workers,
+            'queue_depth': self.waiting,
+            'running': self.running,
+        }
+
+    def metrics(self):
+        lookups = self.cache_hits + self.cache_misses
+        results = self.result_hits + self.result_misses
+        caches = self.worker_caches.values()
+        return {
+            'uptime': time.time() - self.started,
+            'workers': self.workers,
+            'queue_depth': self.waiting,
+            'running': self.running,
+            'max_queue': self.max_queue,
+            'responses': {str(status): count for status, count in sorted(self.responses.items())},
+            'grid_cache': {
+                'hits': self.cache_hits,
+                'misses': self.cache_misses,
+                'hit_rate': self.cache_hits / lookups if lookups else None,
+                'entries': sum(cache['entries'] for cache in caches),
+                'bytes': sum(cache['bytes'] for cache in caches),
+                'artifact_bytes': sum(cache['artifact_bytes'] for cache in caches),
+                'evictions': sum(cache['evictions'] for cache in caches),
+                'max_bytes_per_worker': self.cache_bytes,
+            },
+            'result_cache': {
+                'enabled': self.use_cache,
+                'hits': self.result_hits,
+                'misses': self.result_misses,
+                'hit_rate': self.result_hits / results if results else None,
+            },
+            'methods': dict(self.method_stats),
+        }
+
+    async def solve(self, body):
+        """Answer a /solve request body with (status, response)."""
+        try:
+            query = parse_query(json.loads(body or b'null'), self.map_dirs)
+        except LookupError as e:
+            return HTTPStatus.NOT_FOUND, {'error': str(e)}
+        except (ValueError, TypeError) as e:
+            return HTTPStatus.BAD_REQUEST, {'error': str(e)}
+        if self.waiting >= self.max_queue:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {'error': "Too many queued queries"}
+
+        if not self.use_cache:
+            query = query[:-1] + (False,)
+        map_path, method, options, use_cache = query[0], query[1], query[5], query[6]
+        stats = self.method_stats[method]
+        stats['queries'] += 1
+        self.waiting += 1
+        pool = self.pool
+        try:
+            async with self._slots:
+                self.waiting -= 1
+                self.running += 1
+                try:
+                    loop = asyncio.get_running_loop()
+                    response, hit, pid, cache = await loop.run_in_executor(pool, _solve_query, *query)
+                finally:
+                    self.running -= 1
+        except ValueError as e:
+            stats['errors'] += 1
+            return HTTPStatus.BAD_REQUEST, {'error': str(e)}
+        except BrokenProcessPool:
+            if pool is self.pool:  # Restart once, however many queries it took down
+                logger.error("service: a worker died, restarting the pool")
+                pool.shutdown(wait=False)
+                self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                initargs=(self.cache_bytes,))
+            stats['errors'] += 1
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Worker crashed"}
+        except Exception as e:
+            stats['errors'] += 1
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"{method} failed: {e}"}
+
+        if hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+        self.worker_caches[pid] = cache
+        if use_cache and cacheable(method, options):
+            self.result_hits += response['cached']
+            self.result_misses += len(response['results']) - response['cached']
+        stats['search_time'] += response['search_time']
+        stats['nodes_expanded'] += sum(result['nodes_expanded'] for result in response['results'])
+        return HTTPStatus.OK, {'map': map_path, 'method': method, **response}
+
+    async def route(self, verb, target, body):
+        path = target.split('?', 1)[0]
+        if path == '/solve':
+            if verb != 'POST':
+                return HTTPStatus.METHOD_NOT_ALLOWED, {'error': "Use POST"}
+            return await self.solve(body)
+        pages = {
+            '/health': self.health,
+            '/metrics': self.metrics,
+            '/methods': lambda: {method: list(METHOD_OPTIONS.get(method, ())) for method in SEARCH_METHODS},
+        }
+        if path not in pages:
+            return HTTPStatus.NOT_FOUND, {'error': f"No endpoint {path}"}
+        if verb != 'GET':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': "Use GET"}
+        return HTTPStatus.OK, pages[path]()
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one connection until the client closes it."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    verb, target, version = request_line.decode('latin-1').split()
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    status, response, keep_alive = HTTPStatus.BAD_REQUEST, {'error': "Malformed request"}, False
+                else:
+                    keep_alive = keep_alive and version == 'HTTP/1.1'
+                    if length > MAX_BODY:
+                        status, response, keep_alive = (HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                                        {'error': "Request body too large"}, False)
+                    else:
+                        body = await reader.readexactly(length) if length > 0 else b''
+                        status, response = await self.route(verb.upper(), target, body)
+
+                self.responses[int(status)] += 1
+                payload = json.dumps(response).encode() + b'\n'
+                writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                             f"Content-Type: application/json\r\n"
+                             f"Content-Length: {len(payload)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1')
+                             + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # The client went away
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT, unix=None):
+        """Serve until SIGINT or SIGTERM."""
+        self.start()
+        if unix:
+            server = await asyncio.start_unix_server(self.handle_connection, path=unix)
+            logger.info("service: listening on %s", unix)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+            logger.info("service: listening on http://%s:%d", host, port)
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            self.close()
+            if unix and os.path.exists(unix):
+                os.unlink(unix)
+        logger.info("service: stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve search queries over HTTP from resident worker processes.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port to listen on (default: %(default)s)")
+    parser.add_argument('--unix', help="listen on this Unix socket instead of a port")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument('--cache-mb', type=float, default=DEFAULT_CACHE_MB,
+                        help="grid cache size per worker in MiB, artifacts included (default: %(default)s)")
+    parser.add_argument('--max-queue', type=int, default=None,
+                        help="queries that may wait for a worker before others get 503 (default: 64 per worker)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="neither read nor store results in the persistent result cache")
+    parser.add_argument('--map-dir', action='append', dest='map_dirs', default=None,
+                        help="directory requests may load maps from; repeat for several (default: map)")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(message)s', level=logging.INFO)
+    service = SolverService(args.workers, int(args.cache_mb * (1 << 20)), args.max_queue, not args.no_cache,
+                            args.map_dirs or DEFAULT_MAP_DIRS)
+    asyncio.run(service.serve(args.host, args.port, args.unix))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import glob
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from grid import Grid  # noqa: E402
+from search.artifacts import artifact_cache  # noqa: E402
+
+MAPS = sorted(glob.glob(os.path.join(ROOT, 'map', '*.txt')))
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """
+    Keep compiled maps and saved artifacts out of the user's cache directory,
+    and start every test without artifacts in memory.
+    """
+    directory = tmp_path / 'cache'
+    monkeypatch.setenv('ROBOTNAV_CACHE_DIR', str(directory))
+    artifact_cache.clear()
+    return directory
+
+
+def write_random_map(path, width, height, density, goal_count, seed):
+    """Text map with seeded random walls; the start and goals are kept open."""
+    rng = random.Random(seed)
+    cells = [(x, y) for y in range(height) for x in range(width)]
+    start, *goals = rng.sample(cells, goal_count + 1)
+    walls = [cell for cell in cells if cell not in goals and cell != start and rng.random() < density]
+    with open(path, 'w') as f:
+        f.write(f"{width}x{height}\n{start[0]},{start[1]}\n")
+        f.write('; '.join(f"{x},{y}" for x, y in goals) + '\n')
+        for x, y in walls:
+            f.write(f"{x},{y}\n")
+    return path
+
+
+@pytest.fixture
+def random_grid(tmp_path):
+    """Factory for seeded random grids: random_grid(seed, width=30, height=20, density=0.3, goals=1)."""
+    def make(seed, width=30, height=20, density=0.3, goals=1):
+        path = write_random_map(tmp_path / f"random-{seed}.txt", width, height, density, goals, seed)
+        return Grid(str(path), use_cache=False)
+    return make
+
+
+def toggle_random_walls(grid, count, rng, keep=None):
+    """
+    Flip count random cells with set_wall(), never one in keep (default the
+    start and goals). Returns the cell ids flipped, in order.
+    """
+    if keep is None:
+        keep = {grid.start_position, *grid.goal_positions}
+    cells = []
+    while len(cells) < count:
+        position = (rng.randrange(grid.width), rng.randrange(grid.height))
+        if position not in keep:
+            grid.set_wall(position, not grid.is_wall(position))
+            cells.append(grid.cell_id(position))
+    return cells
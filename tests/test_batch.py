@@ -0,0 +1,35 @@
+import pytest
+
+from grid import Grid
+from batch import solve_batch, solve_maps
+from search.bfs import bfs
+from conftest import MAPS
+
+FIVE_GOALS = next(path for path in MAPS if path.endswith('5goals.txt'))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_failed_queries_do_not_stop_the_batch(workers):
+    grid = Grid(FIVE_GOALS, use_cache=False)
+    queries = [(grid.start_position, goal) for goal in grid.goal_positions]
+    results = list(solve_batch(grid, queries, 'was', workers=workers, chunk_size=1, weight=0.5))
+    assert [result.goal for result in results] == list(grid.goal_positions)
+    for result in results:
+        assert result.path is None
+        assert 'Weight' in result.error
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_results_match_single_searches(workers):
+    grid = Grid(FIVE_GOALS, use_cache=False)
+    queries = [(grid.start_position, goal) for goal in grid.goal_positions]
+    for result in solve_batch(grid, queries, 'bfs', workers=workers, chunk_size=2):
+        assert result.error is None
+        assert result.path == bfs(grid, start=result.start, goals=[result.goal])[0]
+
+
+def test_pattern_matching_nothing_yields_an_error_record(tmp_path):
+    missing = str(tmp_path / 'none' / '*.txt')
+    records = list(solve_maps([missing, FIVE_GOALS], ['bfs'], workers=1, use_cache=False))
+    assert records[0] == {'map': missing, 'status': 'error', 'error': 'no maps matched'}
+    assert [record['status'] for record in records[1:]] == ['ok'] * 5
@@ -0,0 +1,79 @@
+import os
+import random
+import shutil
+
+import pytest
+
+from grid import Grid
+from search.artifacts import artifact_cache
+from search.bfs import bfs
+from search.distance_field import UNREACHABLE, distance_field, field_path
+from conftest import MAPS
+
+
+def open_cells(grid):
+    return [grid.cell_position(cell) for cell in range(grid.width * grid.height) if not grid.walls[cell]]
+
+
+def assert_matches_bfs(grid, goal, starts):
+    field = distance_field(grid, goal, persist=False)
+    for start in starts:
+        expected, _ = bfs(grid, start=start, goals=[goal])
+        path = field.path_from(start)
+        assert len(path) == len(expected)
+        assert field.distance(start) == (len(expected) - 1 if expected else UNREACHABLE)
+        if path:
+            assert path[0] == start and path[-1] == tuple(goal)
+            for (x, y), (next_x, next_y) in zip(path, path[1:]):
+                assert abs(next_x - x) + abs(next_y - y) == 1
+                assert not grid.is_wall((next_x, next_y))
+
+
+@pytest.mark.parametrize('map_path', MAPS)
+def test_path_from_matches_bfs_on_maps(map_path):
+    grid = Grid(map_path, use_cache=False)
+    rng = random.Random(0)
+    cells = open_cells(grid)
+    for goal in grid.goal_positions:
+        assert_matches_bfs(grid, goal, rng.sample(cells, min(len(cells), 15)) + [grid.start_position])
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_path_from_matches_bfs_on_random_grids(random_grid, seed):
+    grid = random_grid(seed, density=0.35, goals=2)
+    assert_matches_bfs(grid, grid.goal_positions[0], open_cells(grid))
+
+
+def test_fields_are_keyed_by_map_contents(tmp_path):
+    source = next(path for path in MAPS if path.endswith('maze_15x20.txt'))
+    copy = shutil.copy(source, tmp_path / 'copy.txt')
+    grid, twin = Grid(source, use_cache=False), Grid(str(copy), use_cache=False)
+    goal = grid.goal_positions[0]
+
+    field = distance_field(grid, goal, persist=False)
+    # Same contents under another file: the same field, bound to the grid asking
+    assert distance_field(twin, goal, persist=False) is field
+    assert field.grid is twin
+
+    # Changed walls: a different field that sees them
+    blocked = field.path_from(grid.start_position)[1]
+    twin.set_wall(blocked)
+    changed = distance_field(twin, goal, persist=False)
+    assert changed is not field
+    assert changed.path_from(twin.start_position)[1:2] != [blocked]
+    assert distance_field(grid, goal, persist=False) is field
+
+
+def test_saved_field_is_found_by_content_hash(tmp_path):
+    source = next(path for path in MAPS if path.endswith('maze_15x20.txt'))
+    grid = Grid(source, use_cache=False)
+    goal = grid.goal_positions[0]
+    built = distance_field(grid, goal, persist=True)
+    assert built.cells_settled > 0
+    assert os.path.isfile(field_path(grid, goal))
+
+    artifact_cache.clear()  # Only the file is left
+    copy = Grid(str(shutil.copy(source, tmp_path / 'copy.txt')), use_cache=False)
+    loaded = distance_field(copy, goal, persist=True)
+    assert loaded.cells_settled == 0  # Read from the file, not searched
+    assert list(loaded.distances) == list(built.distances)
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+import grid as grid_module
+from grid import Grid
+from search.bfs import bfs
+from search.dstar_lite import DStarLite
+from conftest import MAPS, toggle_random_walls
+
+
+def assert_valid_path(grid, path, start, goals):
+    assert path[0] == start
+    assert path[-1] in goals
+    for (x, y), (next_x, next_y) in zip(path, path[1:]):
+        assert abs(next_x - x) + abs(next_y - y) == 1
+        assert not grid.is_wall((next_x, next_y))
+
+
+def assert_matches_fresh_search(grid, path, start, goals):
+    """The replanned path is as short as a search from scratch finds."""
+    expected, _ = bfs(grid, start=start, goals=goals)
+    assert len(path) == len(expected)
+    if path:
+        assert_valid_path(grid, path, start, goals)
+    fresh, _ = DStarLite(grid, start, goals).plan()
+    assert len(fresh) == len(expected)
+
+
+def replan_rounds(grid, seed, rounds=6, changes=5):
+    rng = random.Random(seed)
+    goals = list(grid.goal_positions)
+    start = grid.start_position
+    planner = DStarLite(grid, start, goals)
+    path, _ = planner.plan()
+    assert_matches_fresh_search(grid, path, start, goals)
+    for _ in range(rounds):
+        if len(path) > 2:
+            start = path[rng.randrange(1, len(path) - 1)]
+            planner.move_to(start)
+        toggle_random_walls(grid, changes, rng, {start, *goals})
+        path, _ = planner.plan()
+        assert_matches_fresh_search(grid, path, start, goals)
+
+
+@pytest.mark.parametrize('map_path', MAPS)
+def test_replans_match_fresh_search_on_maps(map_path):
+    replan_rounds(Grid(map_path, use_cache=False), seed=1)
+
+
+@pytest.mark.parametrize('goals', [1, 4])
+@pytest.mark.parametrize('seed', range(8))
+def test_replans_match_fresh_search_on_random_grids(random_grid, seed, goals):
+    replan_rounds(random_grid(seed, width=25, height=25, density=0.25, goals=goals), seed)
+
+
+def test_replan_after_change_log_overflow(random_grid, monkeypatch):
+    monkeypatch.setattr(grid_module, 'MAX_CHANGE_LOG', 4)
+    replan_rounds(random_grid(3), seed=3, rounds=3, changes=10)
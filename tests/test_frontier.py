@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from search.frontier import FRONTIERS, BucketQueue, make_frontier
+
+
+def run_operations(frontier, seed, steps=3000, items=60, max_priority=40):
+    """Apply a seeded mix of push, re-push, discard and pop; return every observable result."""
+    rng = random.Random(seed)
+    log = []
+    for _ in range(steps):
+        op = rng.random()
+        if op < 0.55:
+            item = rng.randrange(items)
+            frontier.push(item, rng.randrange(max_priority), rng.randrange(4))
+        elif op < 0.65:
+            item = rng.randrange(items)
+            frontier.discard(item)
+            log.append(('discard', item, item in frontier))
+        elif frontier:
+            log.append(('pop', frontier.pop()))
+        log.append(('len', len(frontier)))
+    while frontier:
+        log.append(('pop', frontier.pop()))
+    return log
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_backends_pop_in_the_same_order(seed):
+    logs = {name: run_operations(make_frontier(name), seed) for name in FRONTIERS}
+    reference = logs.pop('heap')
+    for name, log in logs.items():
+        assert log == reference, name
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_bucket_overflow_pops_in_heap_order(seed):
+    reference = run_operations(make_frontier('heap'), seed, max_priority=400)
+    assert run_operations(BucketQueue(max_priority=150), seed, max_priority=400) == reference
+
+
+def test_huge_priorities_do_not_allocate_buckets():
+    frontier = BucketQueue()
+    frontier.push('far', 10 ** 12)
+    frontier.push('near', 3)
+    frontier.push('farther', 10 ** 15, 1)
+    assert len(frontier._buckets) == 4
+    assert [frontier.pop() for _ in range(3)] == [('near', (3, 0)), ('far', (10 ** 12, 0)),
+                                                 ('farther', (10 ** 15, 1))]
+
+
+def test_ties_and_insertion_order():
+    for name in FRONTIERS:
+        frontier = make_frontier(name)
+        frontier.push('a', 3, 1)
+        frontier.push('b', 3, 0)
+        frontier.push('c', 3, 0)
+        frontier.push('d', 2, 5)
+        frontier.push('a', 3, 0)  # Moved: it now queues behind c
+        assert [frontier.pop()[0] for _ in range(4)] == ['d', 'b', 'c', 'a'], name
+        with pytest.raises(IndexError):
+            frontier.pop()
+
+
+def test_unknown_frontier():
+    with pytest.raises(ValueError):
+        make_frontier('fibonacci')
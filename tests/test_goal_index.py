@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from search.heuristics import INDEX_MIN_GOALS, GoalIndex, heuristic_manhattan, manhattan, manhattan_to
+
+
+def brute_force(x, y, goals):
+    return min(abs(x - goal_x) + abs(y - goal_y) for goal_x, goal_y in goals)
+
+
+def query_points(rng, count=400, low=-15, high=75):
+    return [(rng.randint(low, high), rng.randint(low, high)) for _ in range(count)]
+
+
+@pytest.mark.parametrize('block_size', [None, 1, 3, 16])
+@pytest.mark.parametrize('goal_count', [1, 2, 40, 300])
+@pytest.mark.parametrize('seed', range(3))
+def test_nearest_distance_matches_brute_force(seed, goal_count, block_size):
+    rng = random.Random(seed)
+    goals = [(rng.randrange(60), rng.randrange(60)) for _ in range(goal_count)]
+    index = GoalIndex(goals, block_size)
+    for x, y in query_points(rng):
+        assert index.nearest_distance(x, y) == brute_force(x, y, goals)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_goals_outside_the_grid(seed):
+    rng = random.Random(seed)
+    # Clustered goals with some far outside a 60x60 grid, on every side
+    goals = [(rng.randrange(20, 30), rng.randrange(20, 30)) for _ in range(50)]
+    goals += [(-40, 10), (150, -3), (30, 500), (-1000, -1000)]
+    index = GoalIndex(goals)
+    for x, y in query_points(rng, low=0, high=59):
+        assert index.nearest_distance(x, y) == brute_force(x, y, goals)
+
+
+def test_single_goal_and_duplicates():
+    index = GoalIndex([(5, 7), (5, 7)])
+    for x, y in [(5, 7), (0, 0), (-3, 20), (100, 7)]:
+        assert index.nearest_distance(x, y) == abs(x - 5) + abs(y - 7)
+    with pytest.raises(ValueError):
+        GoalIndex([])
+
+
+def test_heuristics_agree_with_brute_force(random_grid):
+    grid = random_grid(2, width=40, height=40)
+    rng = random.Random(2)
+    goals = [(rng.randrange(-5, 45), rng.randrange(-5, 45)) for _ in range(INDEX_MIN_GOALS * 2)]
+    h = manhattan_to(goals)
+    cell_h = manhattan(grid, goals)
+    for cell in range(0, grid.width * grid.height, 7):
+        x, y = grid.cell_position(cell)
+        expected = brute_force(x, y, goals)
+        assert h(x, y) == cell_h(cell) == heuristic_manhattan((x, y), goals) == expected
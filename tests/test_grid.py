@@ -0,0 +1,49 @@
+import pytest
+
+from grid import Grid
+
+
+def write_map(path, width, height, wall_lines):
+    with open(path, 'w') as f:
+        f.write(f"{width}x{height}\n0,0\n{width - 1},{height - 1}\n")
+        for line in wall_lines:
+            f.write(line + '\n')
+    return Grid(str(path), use_cache=False)
+
+
+def cells_map(tmp_path, width, height, cells):
+    """The same map with every wall cell on its own x,y line."""
+    return write_map(tmp_path / 'cells.txt', width, height, [f"{x},{y}" for x, y in sorted(cells)])
+
+
+def assert_same_walls(grid, expected):
+    assert bytes(grid.walls) == bytes(expected.walls)
+    assert bytes(grid.neighbor_mask) == bytes(expected.neighbor_mask)
+
+
+def test_rectangles_are_clipped_at_the_edges(tmp_path):
+    grid = write_map(tmp_path / 'rects.txt', 10, 8, ["-2,-1,4,3", "8,6,5,5", "3,3,2,2", "20,20,2,2"])
+    cells = {(x, y) for x in range(0, 2) for y in range(0, 2)}
+    cells |= {(x, y) for x in range(8, 10) for y in range(6, 8)}
+    cells |= {(x, y) for x in range(3, 5) for y in range(3, 5)}
+    assert_same_walls(grid, cells_map(tmp_path, 10, 8, cells))
+
+
+def test_runs_are_clipped_and_rows_out_of_range_ignored(tmp_path):
+    grid = write_map(tmp_path / 'runs.txt', 10, 6, ["0:2,3,1,2", "2:0,4", "4:7,9", "-1:0,10", "6:0,10"])
+    cells = {(x, 0) for x in (2, 3, 4, 6, 7)}
+    cells |= {(x, 2) for x in range(0, 4)}
+    cells |= {(x, 4) for x in range(7, 10)}
+    assert_same_walls(grid, cells_map(tmp_path, 10, 6, cells))
+
+
+def test_mixed_wall_lines_match_single_cells(tmp_path):
+    grid = write_map(tmp_path / 'mixed.txt', 12, 12, ["1,1", "2,2,3,1", "5:1,1,2,3", "11,11,1,1"])
+    cells = {(1, 1), (2, 2), (3, 2), (4, 2), (1, 5), (4, 5), (5, 5), (6, 5), (11, 11)}
+    assert_same_walls(grid, cells_map(tmp_path, 12, 12, cells))
+
+
+@pytest.mark.parametrize('line', ["1,2,3", "1,2,3,4,5", "a,b", "1:x", "1:2:3", "1;2"])
+def test_malformed_wall_line_raises(tmp_path, line):
+    with pytest.raises(ValueError):
+        write_map(tmp_path / 'bad.txt', 5, 5, [line])
@@ -0,0 +1,83 @@
+import os
+import pickle
+import random
+
+import pytest
+
+from grid import Grid
+from search.artifacts import artifact_cache
+from search.hpa import AbstractGraph, graph_path, hpa
+from conftest import MAPS, toggle_random_walls
+
+
+def assert_same_graph(updated, rebuilt):
+    assert updated.entrances == rebuilt.entrances
+    assert updated.intra == rebuilt.intra
+    assert updated.edges == rebuilt.edges
+
+
+@pytest.mark.parametrize('map_path', MAPS)
+@pytest.mark.parametrize('cluster_size', [4, 10])
+def test_update_matches_rebuild_on_maps(map_path, cluster_size):
+    grid = Grid(map_path, use_cache=False)
+    graph = AbstractGraph(grid, cluster_size)
+    for round_ in range(3):
+        graph.update(toggle_random_walls(grid, 5, random.Random(round_)))
+        assert_same_graph(graph, AbstractGraph(grid, cluster_size))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_update_matches_rebuild_on_random_grids(random_grid, seed):
+    grid = random_grid(seed, width=47, height=31)
+    graph = AbstractGraph(grid, 8)
+    graph.update(toggle_random_walls(grid, 20, random.Random(seed)))
+    assert_same_graph(graph, AbstractGraph(grid, 8))
+
+
+def test_query_after_wall_change_matches_fresh_graph(random_grid):
+    grid = random_grid(3, width=40, height=40, density=0.2)
+    hpa(grid)  # Builds and caches the graph for the original walls
+    toggle_random_walls(grid, 30, random.Random(3))
+    # hpa() repairs the cached graph from the grid's change log
+    path, nodes = hpa(grid)
+    fresh_path, fresh_nodes = AbstractGraph(grid).find_path(grid.cell_id(grid.start_position),
+                                                            grid.cell_id(grid.goal_positions[0]))
+    assert path == [grid.cell_position(cell) for cell in fresh_path]
+    assert nodes == fresh_nodes
+
+
+def old_format_graph(grid):
+    graph = AbstractGraph(grid)
+    del graph.format
+    return pickle.dumps(graph)
+
+
+@pytest.mark.parametrize('contents', [
+    lambda grid: b'not a pickle',
+    lambda grid: b'',
+    lambda grid: pickle.dumps({'edges': {}}),
+    lambda grid: b'cmissing_module_for_test\nGraph\n.',
+    old_format_graph,
+])
+def test_bad_saved_graph_is_deleted_and_rebuilt(random_grid, contents):
+    grid = random_grid(4, width=40, height=30)
+    expected = hpa(grid)
+    path = graph_path(grid, 10)
+    with open(path, 'wb') as f:
+        f.write(contents(grid))
+    artifact_cache.clear()
+
+    assert AbstractGraph.load(grid, path) is None
+    assert not os.path.exists(path)
+    assert hpa(grid) == expected
+    assert AbstractGraph.load(grid, path) is not None  # Saved again
+
+
+def test_graph_writable_by_others_is_not_loaded(random_grid):
+    grid = random_grid(5, width=40, height=30)
+    hpa(grid)
+    path = graph_path(grid, 10)
+    os.chmod(path, 0o666)
+    assert AbstractGraph.load(grid, path) is None
+    os.chmod(path, 0o644)
+    assert AbstractGraph.load(grid, path) is not None
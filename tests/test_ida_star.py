@@ -0,0 +1,37 @@
+import pytest
+
+from grid import Grid
+from search import SEARCH_METHODS
+from search.bfs import bfs
+from search.events import run_to_completion
+from search.ida_star import ida_star, ida_star_generator
+from conftest import MAPS
+
+MAZES = [path for path in MAPS if 'maze_' in path]
+
+
+@pytest.mark.parametrize('heuristic', ['manhattan', 'alt'])
+@pytest.mark.parametrize('map_path', MAZES)
+def test_shortest_paths_on_mazes(map_path, heuristic):
+    grid = Grid(map_path, use_cache=False)
+    for goal in grid.goal_positions:
+        path, _ = ida_star(grid, goals=[goal], heuristic=heuristic)
+        assert len(path) == len(bfs(grid, goals=[goal])[0])
+
+
+@pytest.mark.parametrize('table_size', [0, 64])
+def test_small_or_no_transposition_table(table_size):
+    grid = Grid(next(path for path in MAZES if path.endswith('maze_30x50.txt')), use_cache=False)
+    for goal in grid.goal_positions:
+        path, _ = ida_star(grid, goals=[goal], table_size=table_size)
+        assert len(path) == len(bfs(grid, goals=[goal])[0])
+
+
+def test_start_on_goal_counts_one_node_like_the_other_methods():
+    grid = Grid(MAZES[0], use_cache=False)
+    start = grid.start_position
+    assert ida_star(grid, goals=[start]) == ([start], 1)
+    cell = grid.cell_id(start)
+    assert run_to_completion(ida_star_generator(grid, start, [start])) == ([cell], 1)
+    for method in ('bfs', 'ids', 'as', 'hpa'):
+        assert SEARCH_METHODS[method](grid, goals=[start]) == ([start], 1)
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from grid import Grid
+from search.bfs import bfs
+from search.ids import ids
+from conftest import MAPS, ROOT
+
+# Goals this many moves from the start keep ids fast on the largest maps
+NEAR_DEPTH = 40
+
+
+def test_unreachable_goal_within_bound(random_grid):
+    grid = random_grid(1, width=12, height=12, density=0.0)
+    goal = (11, 11) if grid.start_position != (11, 11) else (0, 0)
+    # Walled into its corner: the goal cannot be reached at any depth
+    for dx, dy in ((-1, 0), (0, -1), (1, 0), (0, 1)):
+        if grid.in_bounds((goal[0] + dx, goal[1] + dy)):
+            grid.set_wall((goal[0] + dx, goal[1] + dy))
+    path, nodes = ids(grid, goals=[goal], max_depth=40)
+    assert path == []
+    assert nodes == 12 * 12 - 3  # Every other open cell
+    assert ids(grid, goals=[goal]) == (path, nodes)  # The bound is not what stops it
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_goal_exactly_at_bound(random_grid, seed):
+    grid = random_grid(seed, density=0.25)
+    expected, _ = bfs(grid)
+    if not expected:
+        pytest.skip("goal unreachable on this grid")
+    depth = len(expected) - 1
+    path, _ = ids(grid, max_depth=depth)
+    assert len(path) == len(expected)
+    if depth > 0:
+        assert ids(grid, max_depth=depth - 1)[0] == []
+
+
+@pytest.mark.parametrize('map_path', MAPS)
+def test_shortest_path_to_a_near_goal_on_maps(map_path):
+    grid = Grid(map_path, use_cache=False)
+    for goal in grid.goal_positions:
+        expected, _ = bfs(grid, goals=[goal])
+        if len(expected) > NEAR_DEPTH:
+            # Aim at the cell NEAR_DEPTH moves along the shortest path instead
+            goal = expected[NEAR_DEPTH]
+            expected = expected[:NEAR_DEPTH + 1]
+        path, _ = ids(grid, goals=[goal])
+        assert len(path) == len(expected)
+
+
+def run_main(*args):
+    result = subprocess.run([sys.executable, os.path.join(ROOT, 'main.py'), *args, '--no-cache'],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return result.stdout
+
+
+def test_cli_max_depth():
+    grid = Grid(os.path.join(ROOT, 'map', 'small.txt'), use_cache=False)
+    length = len(bfs(grid, goals=grid.goal_positions[:1])[0]) - 1
+    assert "No solution found." in run_main('map/small.txt', 'ids', '--max-depth', str(length - 1))
+    assert f"Path length: {length}" in run_main('map/small.txt', 'ids', '--max-depth', str(length))
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+import mapfile
+from grid import Grid
+from conftest import MAPS, write_random_map
+
+
+def assert_same_grid(loaded, parsed):
+    assert (loaded.width, loaded.height) == (parsed.width, parsed.height)
+    assert tuple(loaded.start_position) == tuple(parsed.start_position)
+    assert [tuple(goal) for goal in loaded.goal_positions] == [tuple(goal) for goal in parsed.goal_positions]
+    assert bytes(loaded.walls) == bytes(parsed.walls)
+    assert bytes(loaded.neighbor_mask) == bytes(parsed.neighbor_mask)
+
+
+@pytest.mark.parametrize('map_path', MAPS)
+def test_compiled_map_round_trip(map_path, tmp_path):
+    parsed = Grid(map_path, use_cache=False)
+    compiled = str(tmp_path / 'map.rnav')
+    mapfile.write_compiled(compiled, parsed, os.stat(map_path))
+    assert mapfile.is_compiled(compiled)
+    assert_same_grid(Grid(compiled), parsed)
+
+
+def test_text_map_is_compiled_into_the_cache(tmp_path):
+    source = str(write_random_map(tmp_path / 'random.txt', 40, 30, 0.3, 3, seed=1))
+    first = Grid(source)
+    assert first.compiled_path == mapfile.cache_path(source)
+    assert mapfile.is_fresh(first.compiled_path, source)
+    again = Grid(source)
+    assert again.compiled_path == first.compiled_path
+    assert_same_grid(again, Grid(source, use_cache=False))
+
+
+def test_edited_text_map_is_stale(tmp_path):
+    source = str(write_random_map(tmp_path / 'random.txt', 20, 20, 0.3, 1, seed=2))
+    compiled = Grid(source).compiled_path
+    with open(source, 'a') as f:
+        f.write("0,0,20,1\n")
+    assert not mapfile.is_fresh(compiled, source)
+    reloaded = Grid(source)
+    assert bytes(reloaded.walls[:20]) == b'\x01' * 20
+    assert mapfile.is_fresh(compiled, source)
+
+
+@pytest.mark.parametrize('damage', ['truncate_cells', 'truncate_header', 'empty', 'bad_magic'])
+def test_damaged_compiled_map_is_rebuilt(tmp_path, damage):
+    source = str(write_random_map(tmp_path / 'random.txt', 30, 20, 0.3, 2, seed=3))
+    compiled = Grid(source).compiled_path
+    with open(compiled, 'rb') as f:
+        data = f.read()
+    damaged = {
+        'truncate_cells': data[:-10],
+        'truncate_header': data[:mapfile.HEADER.size - 4],
+        'empty': b'',
+        'bad_magic': b'XXXX' + data[4:],
+    }[damage]
+    with open(compiled, 'wb') as f:
+        f.write(damaged)
+
+    if damage != 'bad_magic' and len(damaged) >= mapfile.HEADER.size:
+        with pytest.raises(ValueError):
+            mapfile.load_compiled(compiled)
+    assert_same_grid(Grid(source), Grid(source, use_cache=False))
+    with open(compiled, 'rb') as f:
+        assert f.read() == data
+
+
+def test_atomic_write_leaves_no_temp_file_after_failure(tmp_path):
+    target = tmp_path / 'sub' / 'file.bin'
+    with mapfile.atomic_write(str(target)) as f:
+        f.write(b'old')
+    with pytest.raises(RuntimeError):
+        with mapfile.atomic_write(str(target)) as f:
+            f.write(b'partial')
+            raise RuntimeError("write failed")
+    assert os.listdir(tmp_path / 'sub') == ['file.bin']
+    assert target.read_bytes() == b'old'
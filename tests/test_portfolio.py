@@ -0,0 +1,34 @@
+import pytest
+
+from grid import Grid
+from search.bfs import bfs
+from search.portfolio import portfolio, race
+from conftest import MAPS
+
+FIVE_GOALS = next(path for path in MAPS if path.endswith('5goals.txt'))
+
+
+@pytest.mark.parametrize('candidates', [['bfs'], ['as', 'bfs'], ['as', 'df', 'jps'], ['bi_bfs', 'df']])
+def test_optimal_race_with_several_goals_finds_the_nearest(candidates):
+    grid = Grid(FIVE_GOALS, use_cache=False)
+    expected, _ = bfs(grid)
+    result = race(grid, candidates, optimal=True)
+    assert result.method not in ('as', 'df')
+    assert len(result.path) == len(expected)
+
+
+def test_race_of_first_goal_methods_only_needs_one_goal():
+    grid = Grid(FIVE_GOALS, use_cache=False)
+    with pytest.raises(ValueError):
+        race(grid, ['as', 'df'])
+    result = race(grid, ['as', 'df'], goals=grid.goal_positions[:1])
+    assert result.path[-1] == grid.goal_positions[0]
+
+
+def test_portfolio_passes_options_to_candidates():
+    grid = Grid(FIVE_GOALS, use_cache=False)
+    goals = grid.goal_positions[:1]
+    with pytest.raises(ValueError, match='heuristic'):
+        portfolio(grid, goals=goals, candidates=('as',), heuristic='bogus')
+    path, _ = portfolio(grid, goals=goals, candidates=('as',), heuristic='alt', frontier='heap')
+    assert len(path) == len(bfs(grid, goals=goals)[0])
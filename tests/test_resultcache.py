@@ -0,0 +1,114 @@
+import random
+
+import pytest
+
+import resultcache
+from grid import DIRECTIONS, Grid
+from resultcache import ResultCache, cached_results, pack_moves, unpack_path
+from search.bfs import bfs
+from conftest import MAPS
+
+
+def random_walk(rng, length):
+    x, y = rng.randrange(-5, 5), rng.randrange(-5, 5)
+    path = [(x, y)]
+    for _ in range(length):
+        dx, dy = rng.choice(DIRECTIONS)
+        x, y = x + dx, y + dy
+        path.append((x, y))
+    return path
+
+
+@pytest.mark.parametrize('length', [0, 1, 2, 3, 4, 5, 8, 63, 64, 65, 500])
+def test_pack_and_unpack_round_trip(length):
+    path = random_walk(random.Random(length), length)
+    packed = pack_moves(path)
+    assert len(packed) == (length + 3) // 4
+    assert unpack_path(path[0], packed, length) == path
+
+
+def test_pack_rejects_other_steps():
+    with pytest.raises(KeyError):
+        pack_moves([(0, 0), (1, 1)])
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / 'results.sqlite3'))
+
+
+def test_store_and_fetch(cache):
+    grid = Grid(MAPS[0], use_cache=False)
+    start = grid.start_position
+    for goal in grid.goal_positions:
+        path, nodes = bfs(grid, goals=[goal])
+        cache.put(grid, 'bfs', start, goal, {}, path, nodes)
+        assert cache.get(grid, 'bfs', start, goal, {}) == (path, nodes)
+    # No path, and a path of one cell
+    cache.put(grid, 'bfs', start, (99, 99), {}, [], 7)
+    assert cache.get(grid, 'bfs', start, (99, 99), {}) == ([], 7)
+    cache.put(grid, 'bfs', start, start, {}, [start], 1)
+    assert cache.get(grid, 'bfs', start, start, {}) == ([start], 1)
+    # Options are part of the key
+    assert cache.get(grid, 'bfs', start, grid.goal_positions[0], {'frontier': 'heap'}) is None
+
+
+def test_edited_walls_miss(cache, random_grid):
+    grid = random_grid(1)
+    goal = grid.goal_positions[0]
+    cache.put(grid, 'bfs', grid.start_position, goal, {}, *bfs(grid))
+    assert cache.get(grid, 'bfs', grid.start_position, goal) is not None
+    wall = next(cell for cell in range(grid.width * grid.height) if not grid.walls[cell]
+                and grid.cell_position(cell) not in (grid.start_position, goal))
+    grid.set_wall(grid.cell_position(wall))
+    assert cache.get(grid, 'bfs', grid.start_position, goal) is None
+
+
+def test_results_version_is_part_of_the_key(cache, random_grid, monkeypatch):
+    grid = random_grid(2)
+    goal = grid.goal_positions[0]
+    cache.put(grid, 'bfs', grid.start_position, goal, {}, *bfs(grid))
+    monkeypatch.setattr(resultcache, 'RESULTS_VERSION', resultcache.RESULTS_VERSION + 1)
+    assert cache.get(grid, 'bfs', grid.start_position, goal) is None
+
+
+def fill(cache, grid, count, clock, monkeypatch):
+    for i in range(count):
+        monkeypatch.setattr(resultcache.time, 'time', lambda: clock + i)
+        cache.put(grid, 'bfs', (0, i), (1, i), {}, [(0, i), (1, i)], 2)
+
+
+def test_evict_keeps_the_newest_max_entries(cache, random_grid, monkeypatch):
+    grid = random_grid(3)
+    fill(cache, grid, 10, 1000.0, monkeypatch)
+    cache.max_entries = 4
+    cache.evict()
+    assert cache.stats()['entries'] == 4
+    kept = [i for i in range(10) if cache.get(grid, 'bfs', (0, i), (1, i)) is not None]
+    assert kept == [6, 7, 8, 9]
+
+
+def test_evict_drops_entries_older_than_max_age(cache, random_grid, monkeypatch):
+    grid = random_grid(4)
+    now = 1_000_000.0
+    fill(cache, grid, 10, now - 100, monkeypatch)  # Created 100 to 91 seconds ago
+    monkeypatch.setattr(resultcache.time, 'time', lambda: now)
+    cache.max_age = 95
+    cache.evict()
+    kept = [i for i in range(10) if cache.get(grid, 'bfs', (0, i), (1, i)) is not None]
+    assert kept == [5, 6, 7, 8, 9]
+
+
+def test_cached_results_only_searches_missing_goals(cache):
+    grid = Grid(MAPS[0], use_cache=False)
+    start, goals = grid.start_position, list(grid.goal_positions)
+    searched = []
+
+    def solve(missing):
+        searched.append(list(missing))
+        return [bfs(grid, goals=[goal]) for goal in missing]
+
+    first = list(cached_results(cache, grid, 'bfs', start, goals, {}, solve))
+    second = list(cached_results(cache, grid, 'bfs', start, goals, {}, solve))
+    assert first == second
+    assert searched == [goals]
@@ -0,0 +1,80 @@
+"""
+Each method's lean _X_search must give exactly the path and node count of
+running its _X_generator to completion, which is what the GUI shows.
+"""
+import pytest
+
+from grid import Grid
+from search.astar import _astar_search, _astar_generator
+from search.bfs import _bfs_search, _bfs_generator
+from search.bidirectional import (_bidirectional_bfs_search, _bidirectional_bfs_generator,
+                                  _bidirectional_astar_search, _bidirectional_astar_generator)
+from search.dfs import _dfs_search, _dfs_generator
+from search.events import run_to_completion
+from search.gbfs import _gbfs_search, _gbfs_generator
+from search.ida_star import ida_star_search, ida_star_generator
+from search.ids import _ids_search, _ids_generator
+from search.jps import _jps_search, _jps_generator
+from search.weighted_astar import _ara_search, _ara_generator, _weight_schedule
+from conftest import MAPS
+
+PAIRS = {
+    'bfs': (_bfs_search, _bfs_generator),
+    'dfs': (_dfs_search, _dfs_generator),
+    'gbfs': (_gbfs_search, _gbfs_generator),
+    'as': (_astar_search, _astar_generator),
+    'ids': (_ids_search, _ids_generator),
+    'ida_star': (ida_star_search, ida_star_generator),
+    'bi_bfs': (_bidirectional_bfs_search, _bidirectional_bfs_generator),
+    'bi_as': (_bidirectional_astar_search, _bidirectional_astar_generator),
+    'jps': (_jps_search, _jps_generator),
+}
+
+# Iterative deepening takes seconds on the larger maps (see test_ids.py for those)
+SLOW_METHODS = ('ids',)
+SLOW_MAX_CELLS = 2500
+
+
+def assert_equivalent(method, grid, goals, **options):
+    search, generator = PAIRS[method]
+    start = grid.start_position
+    if method in SLOW_METHODS and grid.width * grid.height > SLOW_MAX_CELLS:
+        pytest.skip("too slow on this map")
+    assert search(grid, start, goals, **options) == run_to_completion(generator(grid, start, goals, **options))
+
+
+@pytest.mark.parametrize('method', PAIRS)
+@pytest.mark.parametrize('map_path', MAPS)
+def test_maps(method, map_path):
+    grid = Grid(map_path, use_cache=False)
+    for goal in grid.goal_positions:
+        assert_equivalent(method, grid, [goal])
+    assert_equivalent(method, grid, list(grid.goal_positions))
+
+
+@pytest.mark.parametrize('method', PAIRS)
+@pytest.mark.parametrize('seed', range(8))
+def test_random_grids(method, random_grid, seed):
+    grid = random_grid(seed, width=25, height=18, density=0.25 + seed * 0.03, goals=1 + seed % 3)
+    for goal in grid.goal_positions:
+        assert_equivalent(method, grid, [goal])
+    assert_equivalent(method, grid, list(grid.goal_positions))
+
+
+@pytest.mark.parametrize('frontier', ['heap', 'indexed', 'bucket'])
+@pytest.mark.parametrize('method', ['gbfs', 'as'])
+@pytest.mark.parametrize('seed', range(4))
+def test_frontier_options(method, frontier, random_grid, seed):
+    grid = random_grid(seed, width=30, height=30, density=0.2)
+    assert_equivalent(method, grid, list(grid.goal_positions), frontier=frontier)
+
+
+@pytest.mark.parametrize('weight, weight_step', [(1, 0.5), (2, 0.5), (3.5, 1.25)])
+@pytest.mark.parametrize('map_path', MAPS)
+def test_ara(map_path, weight, weight_step):
+    grid = Grid(map_path, use_cache=False)
+    weights = _weight_schedule(weight, weight_step)
+    for goal in grid.goal_positions:
+        start = grid.start_position
+        assert (_ara_search(grid, start, [goal], weights) ==
+                run_to_completion(_ara_generator(grid, start, [goal], weights)))
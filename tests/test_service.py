@@ -0,0 +1,76 @@
+import gc
+import os
+import weakref
+
+import pytest
+
+from service import GridCache, parse_query
+from search.artifacts import artifact_cache
+from search.distance_field import distance_field_search
+from search.hpa import hpa
+from conftest import MAPS, ROOT
+
+
+def cached_hashes(cache):
+    return {grid.content_hash() for _, grid, _ in cache._grids.values()}
+
+
+def test_grid_cache_counts_and_evicts_artifacts():
+    artifact_cache.clear()
+    cache = GridCache(max_bytes=60_000)
+    refs = []
+    for map_path in MAPS:
+        grid, _ = cache.get(map_path)
+        hpa(grid)
+        distance_field_search(grid)
+        cache.trim()
+        refs.append(weakref.ref(grid))
+        # Everything the searches built is counted, and goes with its grid
+        assert cache.stats()['artifact_bytes'] == artifact_cache.bytes > 0
+        assert {key[1] for key, _ in artifact_cache.entries('hpa')} == cached_hashes(cache)
+        assert cache.bytes <= cache.max_bytes or len(cache._grids) == 1
+    del grid
+    gc.collect()
+
+    alive = [ref() for ref in refs if ref() is not None]
+    assert len(alive) == len(cache._grids)
+
+
+MAP_DIRS = (os.path.join(ROOT, 'map'),)
+
+
+@pytest.mark.parametrize('options', [
+    {'deadline': 'x'},
+    {'deadline': True},
+    {'weight': [2]},
+    {'max_nodes': 1.5},
+    {'frontier': 3},
+])
+def test_options_of_the_wrong_type_are_bad_requests(options):
+    with pytest.raises(ValueError):
+        parse_query({'map': 'small.txt', 'method': 'ara', 'options': options}, MAP_DIRS)
+
+
+def test_options_of_the_right_type_are_passed_on():
+    query = parse_query({'map': 'small.txt', 'method': 'ara',
+                         'options': {'deadline': 250, 'weight': 1.5, 'max_nodes': 10, 'frontier': 'heap'}},
+                        MAP_DIRS)
+    assert query[5] == {'deadline': 0.25, 'weight': 1.5, 'max_nodes': 10, 'frontier': 'heap'}
+    with pytest.raises(ValueError):
+        parse_query({'map': 'small.txt', 'method': 'portfolio', 'options': {'candidates': ['bfs', 1]}}, MAP_DIRS)
+
+
+def test_maps_outside_the_map_directories_are_not_found(tmp_path):
+    outside = tmp_path / 'outside.txt'
+    outside.write_text("2x2\n0,0\n1,1\n")
+    maps = tmp_path / 'maps'
+    maps.mkdir()
+    (maps / 'link.txt').symlink_to(outside)
+    inside = os.path.join(MAP_DIRS[0], 'small.txt')
+    for name in [str(outside), '../tests/conftest.py', os.path.relpath(outside, MAP_DIRS[0]), '/etc/passwd']:
+        with pytest.raises(LookupError):
+            parse_query({'map': name, 'method': 'bfs'}, MAP_DIRS)
+    with pytest.raises(LookupError):
+        parse_query({'map': 'link.txt', 'method': 'bfs'}, (str(maps),))
+    assert parse_query({'map': 'small.txt', 'method': 'bfs'}, MAP_DIRS)[0] == inside
+    assert parse_query({'map': inside, 'method': 'bfs'}, MAP_DIRS)[0] == inside
@@ -0,0 +1,55 @@
+import pytest
+
+from grid import Grid
+from search.bfs import bfs
+from search.cells import goal_cells
+from search.wavefront import _numpy_layers, _python_layers, wavefront_bfs
+from conftest import MAPS
+
+
+def assert_same_engines(grid, goals):
+    pytest.importorskip('numpy')
+    start = grid.cell_id(grid.start_position)
+    cells = goal_cells(grid, goals)
+    if start in cells:
+        return
+    python_distances, python_goal, python_expanded = _python_layers(grid, start, cells)
+    numpy_distances, numpy_goal, numpy_expanded = _numpy_layers(grid, start, cells)
+    assert list(python_distances) == numpy_distances.tolist()
+    assert (python_goal, python_expanded) == (numpy_goal, numpy_expanded)
+    assert (wavefront_bfs(grid, goals=goals, engine='numpy') ==
+            wavefront_bfs(grid, goals=goals, engine='python'))
+
+
+def assert_shortest(grid, goals):
+    path, _ = wavefront_bfs(grid, goals=goals, engine='python')
+    assert len(path) == len(bfs(grid, goals=goals)[0])
+
+
+@pytest.mark.parametrize('use_cache', [False, True])
+@pytest.mark.parametrize('map_path', MAPS)
+def test_engines_agree_on_maps(map_path, use_cache):
+    grid = Grid(map_path, use_cache=use_cache)
+    for goal in grid.goal_positions:
+        assert_same_engines(grid, [goal])
+    assert_same_engines(grid, list(grid.goal_positions))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_engines_agree_on_random_grids(random_grid, seed):
+    grid = random_grid(seed, width=37, height=23, density=0.2 + seed * 0.03, goals=1 + seed % 4)
+    assert_same_engines(grid, list(grid.goal_positions))
+
+
+@pytest.mark.parametrize('map_path', MAPS)
+def test_python_engine_is_shortest_on_maps(map_path):
+    grid = Grid(map_path, use_cache=False)
+    for goal in grid.goal_positions:
+        assert_shortest(grid, [goal])
+    assert_shortest(grid, list(grid.goal_positions))
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_python_engine_is_shortest_on_random_grids(random_grid, seed):
+    grid = random_grid(seed, width=37, height=23, density=0.2 + seed * 0.03, goals=1 + seed % 4)
+    assert_shortest(grid, list(grid.goal_positions))